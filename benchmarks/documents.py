@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Синтетические XML документы BILLmanager для бенчмарков
+"""
+
+from typing import Any, Dict, List
+
+
+def form_document(fields_count: int = 200, list_rows_count: int = 0) -> str:
+    """Форма с полями ввода, select, textdata и встроенным списком"""
+    fields = []
+    messages = []
+    values = []
+    for i in range(fields_count):
+        fields.append(
+            f'<field name="group_{i}">'
+            f'<input type="text" name="field_{i}" required="yes" maxlength="64">'
+            f'<if value="off" hide="field_{i + 1}"/>'
+            "</input></field>"
+        )
+        messages.append(f'<msg name="field_{i}">Field {i}</msg>')
+        values.append(f"<field_{i}>value {i}</field_{i}>")
+
+    fields.append('<field name="tariff"><select name="tariff" required="yes"/></field>')
+    fields.append('<field name="note"><textdata name="note" type="msg"/></field>')
+    fields.append(
+        '<field name="items"><list name="items" type="block">'
+        '<col name="id" type="data"/>'
+        '<col name="status" type="msg"/>'
+        '<col name="cost" type="price"/>'
+        "</list></field>"
+    )
+
+    rows = "".join(
+        f"<elem><id>{i}</id><status>active</status>"
+        f"<cost><price><cost>{i}.50</cost><currency>RUB</currency></price></cost></elem>"
+        for i in range(list_rows_count)
+    )
+
+    return (
+        '<doc lang="ru" func="bench.edit">'
+        '<metadata name="bench.edit" type="form">'
+        f'<form title="name">{"".join(fields)}</form>'
+        "</metadata>"
+        f'<messages name="bench.edit">{"".join(messages)}</messages>'
+        f'{"".join(values)}'
+        '<slist name="tariff"><val key="1">Basic</val><val key="2">Pro</val></slist>'
+        f'<list name="items">{rows}</list>'
+        "</doc>"
+    )
+
+
+def list_document() -> str:
+    """Пустой список с тулбаром и колонками, как его присылает BILLmanager"""
+    return (
+        '<doc lang="ru" func="bench.list">'
+        '<metadata name="bench.list" type="list" key="id" keyname="name">'
+        "<toolbar>"
+        '<toolgrp name="new">'
+        '<toolbtn func="bench.edit" name="new" type="new" img="t-new"/>'
+        '<toolbtn func="bench.delete" name="delete" type="group" img="t-delete">'
+        '<hide name="status" value="deleted"/>'
+        "</toolbtn>"
+        "</toolgrp>"
+        "</toolbar>"
+        "<coldata>"
+        '<col name="id" type="data" hidden="yes"/>'
+        '<col name="name" type="data"/>'
+        '<col name="status" type="msg"/>'
+        '<col name="cost" type="data"/>'
+        "</coldata>"
+        "</metadata>"
+        '<messages name="bench.list" key="id" keyname="name">'
+        '<msg name="title">Items</msg>'
+        "</messages>"
+        "</doc>"
+    )
+
+
+def list_rows(rows_count: int = 5000) -> List[Dict[str, Any]]:
+    return [
+        {"id": i, "name": f"item-{i}", "status": "active", "cost": f"{i}.50"}
+        for i in range(rows_count)
+    ]
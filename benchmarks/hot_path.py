@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк горячего пути запроса: MgrRouter.main_handler для списка, формы,
+setvalues и CGI запроса
+
+Для каждого сценария измеряются время обработки (min/median/p95) и память
+(пик tracemalloc за запрос). Результаты можно сохранить и сравнить с прошлым
+запуском, код возврата 1 означает регрессию медианы больше допуска.
+
+Запуск:
+    python -m benchmarks.hot_path
+    python -m benchmarks.hot_path --save baseline.json
+    python -m benchmarks.hot_path --compare baseline.json --tolerance 0.2
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from flask import Flask
+
+from billmgr_addon.core.router import MgrRouter
+
+from .plugin import create_app, get_scenarios, run_request
+
+EnvironFactory = Callable[[], Dict[str, Any]]
+
+
+def measure_latency(
+    app: Flask,
+    router: MgrRouter,
+    make_environ: EnvironFactory,
+    loop: asyncio.AbstractEventLoop,
+    iterations: int,
+    warmup: int,
+) -> Dict[str, float]:
+    for _ in range(warmup):
+        run_request(app, router, make_environ(), loop)
+
+    timings = []
+    for _ in range(iterations):
+        environ = make_environ()
+        started_at = time.perf_counter()
+        run_request(app, router, environ, loop)
+        timings.append(time.perf_counter() - started_at)
+
+    timings.sort()
+    return {
+        "min_ms": timings[0] * 1000,
+        "median_ms": statistics.median(timings) * 1000,
+        "p95_ms": timings[int(len(timings) * 0.95) - 1] * 1000,
+    }
+
+
+def measure_memory(
+    app: Flask, router: MgrRouter, make_environ: EnvironFactory, loop: asyncio.AbstractEventLoop
+) -> Dict[str, float]:
+    environ = make_environ()
+    gc.collect()
+    tracemalloc.start()
+    run_request(app, router, environ, loop)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"peak_kib": peak / 1024}
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float,
+) -> List[str]:
+    regressions = []
+    for name, result in results.items():
+        baseline_result = baseline.get(name)
+        if baseline_result is None:
+            continue
+        ratio = result["median_ms"] / baseline_result["median_ms"]
+        print(f"{name:<12} median {ratio:>6.2f}x of baseline")
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=str(__doc__).splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--scenario", action="append", help="run only the given scenarios")
+    parser.add_argument("--save", help="save results to a JSON file")
+    parser.add_argument("--compare", help="compare with results saved by --save")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    app, router = create_app()
+    loop = asyncio.new_event_loop()
+    scenarios = get_scenarios()
+    if args.scenario:
+        scenarios = {name: scenarios[name] for name in args.scenario}
+
+    results: Dict[str, Dict[str, float]] = {}
+    for name, make_environ in scenarios.items():
+        result = measure_latency(app, router, make_environ, loop, args.iterations, args.warmup)
+        result.update(measure_memory(app, router, make_environ, loop))
+        results[name] = result
+        print(
+            f"{name:<12} min {result['min_ms']:>8.2f} ms   median {result['median_ms']:>8.2f} ms"
+            f"   p95 {result['p95_ms']:>8.2f} ms   peak {result['peak_kib']:>9.1f} KiB"
+        )
+
+    loop.close()
+
+    if args.save:
+        with Path(args.save).open("w") as fh:
+            json.dump(results, fh, indent=2)
+
+    if args.compare:
+        with Path(args.compare).open() as fh:
+            baseline = json.load(fh)
+        print()
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"Regression over {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Время холодного старта: запуск интерпретатора и импорт модулей плагина
+
+Каждый замер выполняется в новом процессе. Дополнительно выводятся самые
+медленные импорты по данным python -X importtime.
+
+Запуск: python -m benchmarks.import_time
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Tuple
+
+from billmgr_addon.cli.startup import _parse_importtime
+
+MODULES = [
+    "billmgr_addon",
+    "billmgr_addon.core.router",
+    "billmgr_addon.cgi",
+]
+
+
+def run_python(code: str, cwd: str, *options: str) -> "subprocess.CompletedProcess[str]":
+    return subprocess.run(  # noqa: S603
+        [sys.executable, *options, "-c", code], cwd=cwd, capture_output=True, text=True, check=True
+    )
+
+
+def measure_startup(code: str, cwd: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        run_python(code, cwd)
+        timings.append(time.perf_counter() - started_at)
+    return statistics.median(timings)
+
+
+def get_slowest_imports(module: str, cwd: str, count: int) -> List[Tuple[str, int, int]]:
+    stderr = run_python(f"import {module}", cwd, "-X", "importtime").stderr
+    imports = _parse_importtime(stderr)
+    imports.sort(key=lambda item: item[2], reverse=True)
+    return imports[:count]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    # importing the package may create logs/ in the working directory
+    with tempfile.TemporaryDirectory() as cwd:
+        interpreter = measure_startup("pass", cwd, args.repeat)
+        print(f"{'python -c pass':<32} {interpreter * 1000:>8.1f} ms")
+        for module in MODULES:
+            startup = measure_startup(f"import {module}", cwd, args.repeat)
+            print(
+                f"{'import ' + module:<32} {startup * 1000:>8.1f} ms"
+                f"   (+{(startup - interpreter) * 1000:.1f} ms)"
+            )
+
+        print()
+        print(f"{'cumulative us':>14} {'self us':>10}  module")
+        for name, self_us, cumulative_us in get_slowest_imports(MODULES[0], cwd, args.top):
+            print(f"{cumulative_us:>14} {self_us:>10}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Накладные расходы логирования на горячем пути запроса: INFO против DEBUG
+
+Логгер пакета пишет в os.devnull, чтобы измерялись форматирование и обработка
+записей, а не файловая система. На уровне DEBUG дополнительно проверяется
+выборка (--sample-rate) и длина превью данных (--preview-length).
+
+Запуск: python -m benchmarks.logging_overhead
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+from pathlib import Path
+from typing import Dict
+
+from billmgr_addon.utils.logging import LOGGER, configure_payload_logging
+
+from .hot_path import measure_latency
+from .plugin import create_app, get_scenarios
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=str(__doc__).splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--scenario", action="append", help="run only the given scenarios")
+    parser.add_argument("--preview-length", type=int, default=2048)
+    parser.add_argument("--sample-rate", type=float, default=1.0)
+    args = parser.parse_args()
+
+    app, router = create_app()
+    loop = asyncio.new_event_loop()
+    scenarios = get_scenarios()
+    if args.scenario:
+        scenarios = {name: scenarios[name] for name in args.scenario}
+
+    previous_level = LOGGER.level
+    with Path(os.devnull).open("w") as devnull:
+        handler = logging.StreamHandler(devnull)
+        handler.setFormatter(
+            logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+        )
+        LOGGER.addHandler(handler)
+        configure_payload_logging(max_length=args.preview_length, sample_rate=args.sample_rate)
+
+        try:
+            for name, make_environ in scenarios.items():
+                medians: Dict[int, float] = {}
+                for level in (logging.INFO, logging.DEBUG):
+                    LOGGER.setLevel(level)
+                    result = measure_latency(
+                        app, router, make_environ, loop, args.iterations, args.warmup
+                    )
+                    medians[level] = result["median_ms"]
+
+                overhead = medians[logging.DEBUG] - medians[logging.INFO]
+                print(
+                    f"{name:<12} INFO {medians[logging.INFO]:>8.2f} ms"
+                    f"   DEBUG {medians[logging.DEBUG]:>8.2f} ms   overhead {overhead:>+7.2f} ms"
+                )
+        finally:
+            LOGGER.removeHandler(handler)
+            LOGGER.setLevel(previous_level)
+            loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Форматирование колонок сумм и дат: MoneyTransformer/DateTimeTransformer против format_many
+
+Для каждого значения колонки сравнивается создание transformer + format(locale)
+с закэшированными MoneyFormat/DateTimeFormat. Результаты обоих путей проверяются
+на совпадение.
+
+Запуск: python -m benchmarks.money_date_format
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Callable, List, Tuple
+
+import babel
+
+from billmgr_addon.fluentbillmgr import (
+    DateTimeTransformer,
+    MoneyTransformer,
+    get_datetime_format,
+    get_money_format,
+)
+
+
+def make_amounts(count: int, distinct: int) -> List[Decimal]:
+    rnd = random.Random(42)
+    pool = [Decimal(rnd.randint(-10**7, 10**7)) / 100 for _ in range(distinct)]
+    return [rnd.choice(pool) for _ in range(count)]
+
+
+def make_dates(count: int, distinct: int) -> List[datetime]:
+    rnd = random.Random(42)
+    start = datetime(2024, 1, 1)
+    pool = [start + timedelta(minutes=rnd.randint(0, 10**6)) for _ in range(distinct)]
+    return [rnd.choice(pool) for _ in range(count)]
+
+
+def measure(func: Callable[[], List[str]], repeat: int) -> Tuple[float, List[str]]:
+    best = float("inf")
+    result: List[str] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def report(
+    name: str, count: int, baseline: Tuple[float, List[str]], fast: Tuple[float, List[str]]
+) -> None:
+    base_time, base_result = baseline
+    fast_time, fast_result = fast
+    assert base_result == fast_result, f"{name}: results differ"
+    print(
+        f"{name:<8} transformer {base_time * 1e6 / count:>7.2f} us/value"
+        f"   format_many {fast_time * 1e6 / count:>7.2f} us/value"
+        f"   x{base_time / fast_time:.1f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--distinct", type=int, default=1000, help="distinct values per column")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--locale", default="ru")
+    parser.add_argument("--currency", default="RUB")
+    args = parser.parse_args()
+
+    babel_locale = babel.Locale.parse(args.locale)
+
+    amounts = make_amounts(args.rows, args.distinct)
+    money_baseline = measure(
+        lambda: [
+            MoneyTransformer(value, args.currency, use_grouping=True).format(babel_locale)  # type: ignore[attr-defined]
+            for value in amounts
+        ],
+        args.repeat,
+    )
+    money_fast = measure(
+        lambda: get_money_format(args.locale, args.currency, use_grouping=True).format_many(
+            amounts
+        ),
+        args.repeat,
+    )
+    report("money", args.rows, money_baseline, money_fast)
+
+    dates = make_dates(args.rows, args.distinct)
+    date_options = {"dateStyle": "short", "timeStyle": "short", "timeZone": "Europe/Moscow"}
+    dates_baseline = measure(
+        lambda: [
+            DateTimeTransformer(value, **date_options).format(babel_locale)  # type: ignore[attr-defined]
+            for value in dates
+        ],
+        args.repeat,
+    )
+    dates_fast = measure(
+        lambda: get_datetime_format(args.locale, "short", "short", "Europe/Moscow").format_many(
+            dates
+        ),
+        args.repeat,
+    )
+    report("dates", args.rows, dates_baseline, dates_fast)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+Тестовый плагин для бенчмарков горячего пути запроса
+
+Flask приложение с MgrRouter и эндпоинтами списка, формы и CGI. Вместо MySQL
+используется SQLite в памяти с тем же интерфейсом, что у DB, вместо BILLmanager
+API - BillmgrAPI с httpx.MockTransport. Запросы подаются в MgrRouter.main_handler
+с окружением, которое BILLmanager передает плагину.
+"""
+
+import asyncio
+import io
+import re
+import sqlite3
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from flask import Flask, Response, appcontext_pushed, g, jsonify
+from flask_login import LoginManager
+
+from billmgr_addon.auth.auth import User
+from billmgr_addon.core.request_types import CgiRequest, MgrRequest
+from billmgr_addon.core.response import MgrOkResponse
+from billmgr_addon.core.router import CgiEndpoint, FormEndpoint, ListEndpoint, MgrRouter
+from billmgr_addon.core.ui import MgrForm, MgrList
+from billmgr_addon.core.ui.formatters import EnumMessageFormatter, MoneyFormatter
+from billmgr_addon.db import DBResult, get_db
+from billmgr_addon.utils import BillmgrAPI, KeepAliveRequest
+
+from .documents import form_document, list_document
+
+ITEMS_COUNT = 500
+TARIFFS_COUNT = 20
+API_URL = "https://billmgr.local/billmgr"
+
+
+class SqliteDB:
+    """SQLite с интерфейсом billmgr_addon.db.DB, параметры в стиле %(name)s"""
+
+    _param_pattern = re.compile(r"%\((\w+)\)s")
+
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self.connection = connection
+
+    def _execute(self, sql: str, values: Optional[Dict[str, Any]] = None) -> sqlite3.Cursor:
+        cursor = self.connection.cursor()
+        cursor.execute(self._param_pattern.sub(r":\1", sql), values or {})
+        return cursor
+
+    def select_query(self, sql: str, values: Optional[Dict[str, Any]] = None) -> DBResult:
+        return DBResult(self._execute(sql, values))
+
+    def insert_query(self, sql: str, values: Optional[Dict[str, Any]] = None) -> Optional[int]:
+        return self._execute(sql, values).lastrowid
+
+    def update_query(self, sql: str, values: Optional[Dict[str, Any]] = None) -> int:
+        return self._execute(sql, values).rowcount
+
+    delete_query = update_query
+
+    def close(self) -> None:
+        # the in-memory database is shared between requests
+        pass
+
+
+def create_database() -> sqlite3.Connection:
+    connection = sqlite3.connect(":memory:", check_same_thread=False)
+    connection.row_factory = lambda cursor, row: {
+        column[0]: value for column, value in zip(cursor.description, row)
+    }
+    connection.executescript(
+        """
+        CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, status TEXT, cost TEXT);
+        CREATE TABLE tariffs (id INTEGER PRIMARY KEY, name TEXT);
+        """
+    )
+    connection.executemany(
+        "INSERT INTO items VALUES (?, ?, ?, ?)",
+        [
+            (i, f"item-{i}", "active" if i % 3 else "suspended", f"{i}.50")
+            for i in range(ITEMS_COUNT)
+        ],
+    )
+    connection.executemany(
+        "INSERT INTO tariffs VALUES (?, ?)", [(i, f"Tariff {i}") for i in range(TARIFFS_COUNT)]
+    )
+    return connection
+
+
+def create_fake_api() -> BillmgrAPI:
+    """BillmgrAPI, отвечающий локально без сети"""
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"doc": {"ok": {"$": "ok"}}})
+
+    api = BillmgrAPI(url=API_URL)
+    api.async_request_session = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+    return api
+
+
+FAKE_API = create_fake_api()
+
+
+class BenchListEndpoint(ListEndpoint):
+    column_formatters = {
+        "status": EnumMessageFormatter(prefix="status_"),
+        "cost": MoneyFormatter(),
+    }
+
+    async def get(  # type: ignore[override]
+        self, mgr_list: MgrList, mgr_request: MgrRequest
+    ) -> MgrList:
+        rows = get_db().select_query("SELECT id, name, status, cost FROM items ORDER BY id").all()
+        mgr_list.set_data_rows(rows)
+        return mgr_list
+
+
+async def load_tariffs(form: MgrForm, mgr_request: MgrRequest) -> List[Dict[str, str]]:
+    await KeepAliveRequest().send_async(FAKE_API)
+    rows = get_db().select_query("SELECT id, name FROM tariffs ORDER BY id").all()
+    return [{"key": str(row["id"]), "label": row["name"]} for row in rows]
+
+
+class BenchFormEndpoint(FormEndpoint):
+    option_presets = {"tariff": FormEndpoint.OptionPreset(load_tariffs, depends_on=("tariff",))}
+    incremental_setvalues = True
+
+    async def get(  # type: ignore[override]
+        self, form: MgrForm, mgr_request: MgrRequest
+    ) -> MgrForm:
+        return form
+
+    async def setvalues(self, form: MgrForm, mgr_request: MgrRequest) -> MgrForm:
+        return form
+
+    async def new(self, mgr_request: MgrRequest) -> MgrOkResponse:
+        return MgrOkResponse()
+
+    async def edit(self, mgr_request: MgrRequest) -> MgrOkResponse:
+        return MgrOkResponse()
+
+
+class BenchCgiEndpoint(CgiEndpoint):
+    async def _handle_request(self, cgi_request: CgiRequest) -> Response:
+        rows = get_db().select_query("SELECT id, name FROM tariffs ORDER BY id").all()
+        return jsonify(rows)
+
+
+def create_app() -> Tuple[Flask, MgrRouter]:
+    """
+    Returns:
+        Flask приложение и его MgrRouter
+    """
+    app = Flask("benchmarks")
+    # the API is served by httpx.MockTransport, the secret is never sent anywhere
+    app.config.update(BILLMGR_API_URL=API_URL, FORWARDED_SECRET="secret")  # noqa: S106
+
+    connection = create_database()
+
+    def appcontext_pushed_handler(sender: Flask) -> None:
+        for namespace_id in ("_db", "_db_billmgr"):
+            setattr(g, namespace_id, SimpleNamespace(config=None, instance=SqliteDB(connection)))
+
+    appcontext_pushed.connect(appcontext_pushed_handler, app, weak=False)
+
+    login_manager = LoginManager()
+    login_manager.init_app(app)
+    login_manager.request_loader(
+        lambda request: User(id=1, name="admin", realname="Admin", session_id="1", auth_level=16)
+    )
+
+    router = MgrRouter(
+        app,
+        [
+            BenchListEndpoint("bench.list"),
+            BenchFormEndpoint("bench.edit"),
+            BenchCgiEndpoint("bench.tariffs"),
+        ],
+    )
+    return app, router
+
+
+def make_environ(
+    xml: str = "", params: Optional[Dict[str, str]] = None, **extra: Any
+) -> Dict[str, Any]:
+    """WSGI окружение запроса, как его передает BILLmanager"""
+    body = xml.encode("utf-8")
+    environ: Dict[str, Any] = {
+        "REQUEST_METHOD": "POST",
+        "PATH_INFO": "/",
+        "QUERY_STRING": "",
+        "SERVER_NAME": "localhost",
+        "SERVER_PORT": "443",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "REMOTE_ADDR": "127.0.0.1",
+        "CONTENT_LENGTH": str(len(body)),
+        "HTTP_COOKIE": "billmgrlang5=billmgr:ru; billmgrses5=session",
+        "AUTH_USER": "admin",
+        "AUTH_LEVEL": "16",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": "https",
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": io.StringIO(),
+        "wsgi.multithread": False,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": True,
+    }
+    for name, value in (params or {}).items():
+        environ[f"PARAM_{name}"] = value
+    environ.update(extra)
+    return environ
+
+
+def get_scenarios() -> Dict[str, Callable[[], Dict[str, Any]]]:
+    """{имя сценария: функция, создающая окружение запроса}"""
+    list_xml = list_document()
+    form_xml = form_document(fields_count=50)
+
+    return {
+        "list": lambda: make_environ(list_xml, EVENT_TYPE="action", ACTION_NAME="bench.list"),
+        "form": lambda: make_environ(form_xml, EVENT_TYPE="action", ACTION_NAME="bench.edit"),
+        "setvalues": lambda: make_environ(
+            form_xml,
+            {"sv_field": "tariff", "tariff": "2"},
+            EVENT_TYPE="action",
+            ACTION_NAME="bench.edit",
+        ),
+        "cgi": lambda: make_environ(
+            REQUEST_METHOD="GET", QUERY_STRING="func=bench.tariffs", CONTENT_LENGTH="0"
+        ),
+    }
+
+
+def run_request(
+    app: Flask, router: MgrRouter, environ: Dict[str, Any], loop: asyncio.AbstractEventLoop
+) -> Any:
+    with app.request_context(environ):
+        return loop.run_until_complete(router.main_handler())
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк памяти UI объектов форм и списков
+
+Запуск: python -m benchmarks.ui_memory
+"""
+
+import gc
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from billmgr_addon.core.ui import MgrForm, MgrList
+
+from .documents import form_document, list_document, list_rows
+
+
+def measure(name: str, func: Callable[[], object]) -> None:
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    print(f"{name:<40} retained {retained / 1024:>10.1f} KiB   peak {peak / 1024:>10.1f} KiB")
+
+
+def build_form(xml: str) -> MgrForm:
+    return MgrForm(xml)
+
+
+def render_form(xml: str) -> str:
+    form = MgrForm(xml)
+    form.patch_xml()
+    return str(form)
+
+
+def render_list(xml: str, rows: List[Dict[str, Any]]) -> str:
+    mgr_list = MgrList(xml)
+    mgr_list.set_data_rows(rows)
+    mgr_list.patch_xml()
+    return str(mgr_list)
+
+
+def load_list(
+    xml: str, rows: List[Tuple[Any, ...]], column_names: List[str], *, columnar: bool
+) -> MgrList:
+    mgr_list = MgrList(xml)
+    mgr_list.set_data_rows(rows, column_names=column_names, columnar=columnar)
+    return mgr_list
+
+
+def render_columnar_list(xml: str, rows: List[Tuple[Any, ...]], column_names: List[str]) -> str:
+    mgr_list = MgrList(xml)
+    mgr_list.set_data_rows(rows, column_names=column_names, columnar=True)
+    mgr_list.patch_xml()
+    return str(mgr_list)
+
+
+def main() -> None:
+    large_form = form_document(fields_count=1000)
+    embedded_list_form = form_document(fields_count=20, list_rows_count=5000)
+    list_xml = list_document()
+    rows = list_rows(5000)
+
+    measure("form: 1000 fields, parse", lambda: build_form(large_form))
+    measure("form: 1000 fields, parse + render", lambda: render_form(large_form))
+    measure("form: 5000-row embedded list, parse", lambda: build_form(embedded_list_form))
+    measure(
+        "form: 5000-row embedded list, render",
+        lambda: render_form(embedded_list_form),
+    )
+    column_names = list(rows[0])
+    row_tuples = [tuple(row.values()) for row in rows]
+
+    # rows as a DB cursor returns them, held until patch_xml
+    measure(
+        "list: 5000 cursor tuples, rows",
+        lambda: load_list(list_xml, row_tuples, column_names, columnar=False),
+    )
+    measure(
+        "list: 5000 cursor tuples, columnar",
+        lambda: load_list(list_xml, row_tuples, column_names, columnar=True),
+    )
+    measure("list: 5000 rows, render", lambda: render_list(list_xml, rows))
+    measure(
+        "list: 5000 rows, columnar render",
+        lambda: render_columnar_list(list_xml, row_tuples, column_names),
+    )
+
+
+if __name__ == "__main__":
+    main()
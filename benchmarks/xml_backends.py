@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Сравнение XML бэкендов UI слоя (xml.etree и lxml)
+
+Проверяет, что оба бэкенда дают одинаковый канонический XML для форм, списков и
+ответов, и сравнивает время разбора и сериализации.
+
+Запуск: python -m benchmarks.xml_backends
+"""
+
+import timeit
+from typing import Any, Callable, Dict, List, Tuple
+from xml.etree.ElementTree import canonicalize
+
+from billmgr_addon.core.response import MgrErrorResponse, MgrOkResponse, MgrRedirectResponse
+from billmgr_addon.core.ui import MgrForm, MgrList
+from billmgr_addon.core.xml_backend import LXML_AVAILABLE, set_xml_backend
+
+from .documents import form_document, list_document, list_rows
+
+BACKENDS = ["etree", "lxml"] if LXML_AVAILABLE else ["etree"]
+
+
+def render_form(xml: str) -> str:
+    form = MgrForm(xml)
+    form.patch_xml()
+    return str(form)
+
+
+def render_list(xml: str, rows: List[Dict[str, Any]]) -> str:
+    mgr_list = MgrList(xml)
+    mgr_list.set_data_rows(rows)
+    mgr_list.patch_xml()
+    return str(mgr_list)
+
+
+def render_responses() -> List[str]:
+    responses = [
+        MgrOkResponse(),
+        MgrRedirectResponse("list", "bench.list"),
+        MgrErrorResponse("error"),
+    ]
+    return [str(response) for response in responses]
+
+
+def main() -> None:
+    form_xml = form_document(fields_count=200, list_rows_count=500)
+    list_xml = list_document()
+    rows = list_rows(2000)
+
+    cases: Dict[str, Callable[[], Any]] = {
+        "form: 200 fields, 500-row list": lambda: render_form(form_xml),
+        "list: 2000 rows": lambda: render_list(list_xml, rows),
+        "responses": render_responses,
+    }
+
+    outputs: Dict[str, Dict[str, Tuple[str, ...]]] = {}
+    for backend in BACKENDS:
+        set_xml_backend(backend)
+        for name, func in cases.items():
+            result = func()
+            documents = result if isinstance(result, list) else [result]
+            outputs.setdefault(name, {})[backend] = tuple(map(canonicalize, documents))
+
+    for name, backend_outputs in outputs.items():
+        results = set(backend_outputs.values())
+        status = "ok" if len(results) == 1 else "MISMATCH"
+        print(f"{name:<40} conformance {status}")
+
+    print()
+    for name, func in cases.items():
+        for backend in BACKENDS:
+            set_xml_backend(backend)
+            number = 20
+            elapsed = min(timeit.repeat(func, number=number, repeat=3)) / number
+            print(f"{name:<40} {backend:<6} {elapsed * 1000:>10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ CGI интерфейс для плагинов
 
 import os
 import sys
+from typing import Union
 
 from billmgr_addon.utils.logging import LOGGER
 
@@ -30,21 +31,27 @@ def run_with_cgi(application):
 
     is_plugin_request = environ.get("EVENT_TYPE") in ["action", "before", "after"]
 
-    def write(data):
-        response_str = ""
+    # the body is written as is to the binary stdout and flushed once at exit;
+    # text written before (print, click.echo) must go out first
+    sys.stdout.flush()
+    stdout = sys.stdout.buffer
+
+    def write(data: Union[str, bytes]) -> None:
         if not headers_set:
             raise AssertionError("write() before start_response()")
 
         if not is_plugin_request and not headers_sent:
             # Before the first output, send the stored headers
             status, response_headers = headers_sent[:] = headers_set
-            sys.stdout.write(f"HTTP/1.1 {status}\r\n")
+            header_lines = [f"HTTP/1.1 {status}\r\n"]
             for header in response_headers:
-                sys.stdout.write("{}: {}\r\n".format(header[0], header[1]))
-            sys.stdout.write("\r\n")
+                header_lines.append("{}: {}\r\n".format(header[0], header[1]))
+            header_lines.append("\r\n")
+            stdout.write("".join(header_lines).encode("latin-1"))
 
-        response_body = data.decode("utf-8")
-        sys.stdout.write(response_body)
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        stdout.write(data)
 
     def start_response(status, response_headers, exception=None):
         if exception:
@@ -67,7 +74,8 @@ def run_with_cgi(application):
         headers_set = []
         headers_sent = []
         start_response(500, [])
-        write("Something went wrong".encode("utf-8"))
+        write(b"Something went wrong")
+        stdout.flush()
         quit(0)
 
     # result = application(environ, start_response)
@@ -76,9 +84,10 @@ def run_with_cgi(application):
             if data:  # don't send headers until body appears
                 write(data)
         if not headers_sent:
-            write("")  # send headers now if body was empty
+            write(b"")  # send headers now if body was empty
     finally:
         if hasattr(result, "close"):
             result.close()
 
+    stdout.flush()
     quit(0)
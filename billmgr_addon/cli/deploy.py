@@ -7,6 +7,7 @@
 import glob
 import subprocess
 from pathlib import Path
+from typing import Optional
 
 import click
 import tomlkit
@@ -21,6 +22,38 @@ def deploy():
     pass
 
 
+def _update_xml_cache() -> None:
+    """Обновить мета-кэш и языковой кэш XML BILLmanager"""
+    click.echo("Обновление XML кэша...")
+
+    meta_cache_result = subprocess.run(
+        ["/usr/local/mgr5/sbin/xmlinstall", "-m", "billmgr", "--meta-cache", "--apply"],
+        capture_output=True,
+        text=True,
+    )
+    if meta_cache_result.returncode != 0:
+        click.echo(f"Предупреждение: ошибка обновления мета-кэша: {meta_cache_result.stderr}")
+
+    lang_cache_result = subprocess.run(
+        [
+            "/usr/local/mgr5/sbin/xmlinstall",
+            "-m",
+            "billmgr",
+            "--lang-cache",
+            "ru",
+            "--base",
+            "en",
+            "--apply",
+        ],
+        capture_output=True,
+        text=True,
+    )
+    if lang_cache_result.returncode != 0:
+        click.echo(f"Предупреждение: ошибка обновления языкового кэша: {lang_cache_result.stderr}")
+    else:
+        click.echo("  XML кэш обновлен")
+
+
 @deploy.command()
 @click.option("--plugin-name", required=True, help="Имя плагина")
 @click.option("--force", is_flag=True, help="Принудительная перезапись существующих файлов")
@@ -43,7 +76,23 @@ def deploy():
     default=True,
     help="Устанавливать ли processing module script (по умолчанию да, если processing_module_cli.py существует)",
 )
-def install(plugin_name, force, xml_path, server_app_folder, update_xml_cache, install_processing_module):
+@click.option(
+    "--processing-module-server/--no-processing-module-server",
+    default=False,
+    help=(
+        "Выполнять команды processing module резидентным сервером "
+        "вместо запуска процесса на каждую команду"
+    ),
+)
+def install(
+    plugin_name: str,
+    force: bool,
+    xml_path: Optional[Path],
+    server_app_folder: Optional[str],
+    update_xml_cache: bool,
+    install_processing_module: bool,
+    processing_module_server: bool,
+) -> None:
     """Установить плагин в BILLmanager"""
     try:
         click.echo(f"Установка плагина {plugin_name}...")
@@ -68,44 +117,18 @@ def install(plugin_name, force, xml_path, server_app_folder, update_xml_cache, i
             builder.build()
 
         click.echo("Создание ссылок...")
-        links = create_plugin_symlinks(plugin_name, server_app_folder, install_processing_module)
+        links = create_plugin_symlinks(
+            plugin_name,
+            server_app_folder,
+            install_processing_module,
+            processing_module_server=processing_module_server,
+        )
 
         for link_type, link_path in links.items():
             click.echo(f"  {link_type}: {link_path}")
 
         if server_app_folder and update_xml_cache:
-            click.echo("Обновление XML кэша...")
-
-            meta_cache_result = subprocess.run(
-                ["/usr/local/mgr5/sbin/xmlinstall", "-m", "billmgr", "--meta-cache", "--apply"],
-                capture_output=True,
-                text=True,
-            )
-            if meta_cache_result.returncode != 0:
-                click.echo(
-                    f"Предупреждение: ошибка обновления мета-кэша: {meta_cache_result.stderr}"
-                )
-
-            lang_cache_result = subprocess.run(
-                [
-                    "/usr/local/mgr5/sbin/xmlinstall",
-                    "-m",
-                    "billmgr",
-                    "--lang-cache",
-                    "ru",
-                    "--base",
-                    "en",
-                    "--apply",
-                ],
-                capture_output=True,
-                text=True,
-            )
-            if lang_cache_result.returncode != 0:
-                click.echo(
-                    f"Предупреждение: ошибка обновления языкового кэша: {lang_cache_result.stderr}"
-                )
-            else:
-                click.echo("  XML кэш обновлен")
+            _update_xml_cache()
 
         if not server_app_folder:
             click.echo("Перезагрузка BILLmanager...")
@@ -252,8 +275,25 @@ def build_xml(xml_path):
     default=True,
     help="Устанавливать ли processing module script (по умолчанию да, если processing_module_cli.py существует)",
 )
+@click.option(
+    "--processing-module-server/--no-processing-module-server",
+    default=False,
+    help=(
+        "Выполнять команды processing module резидентным сервером "
+        "вместо запуска процесса на каждую команду"
+    ),
+)
 def remote_deploy(
-    environment, plugin_name, config, backup, install, restart_billmgr, dry_run, xml_path, install_processing_module
+    environment,
+    plugin_name,
+    config,
+    backup,
+    install,
+    restart_billmgr,
+    dry_run,
+    xml_path,
+    install_processing_module,
+    processing_module_server,
 ):
     """Деплой плагина на удаленный сервер"""
     try:
@@ -427,6 +467,8 @@ def remote_deploy(
             click.echo("Установка плагина...")
             
             processing_module_flag = "--install-processing-module" if install_processing_module else "--no-install-processing-module"
+            if processing_module_server:
+                processing_module_flag += " --processing-module-server"
             
             install_cmd = f"""ssh {ssh_options} {server} "cd {app_folder} && \\
                 source venv/bin/activate && \\
@@ -461,6 +503,8 @@ def remote_deploy(
         if not install:
             click.echo("Для установки плагина выполните:")
             processing_module_flag = "--install-processing-module" if install_processing_module else "--no-install-processing-module"
+            if processing_module_server:
+                processing_module_flag += " --processing-module-server"
             click.echo(
                 f"   ssh {server} 'cd {app_folder} && source venv/bin/activate && sudo billmgr-addon deploy install --plugin-name {plugin_name} --server-app-folder {app_folder} {processing_module_flag}'"
             )
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+
+"""
+Сверка ключей переводов из кода плагина с сообщениями локалей
+
+В исходниках ищутся цепочки атрибутов от i18n: mgr_request.i18n.error.not_found()
+-> "error-not_found", переменные, которым присвоен mgr_request.i18n, и параметры с
+аннотацией TranslatorRunner. i18n.get("key") дает ключ из строки, f-строки и
+выражения считаются динамическими ключами, их постоянный префикс помечает сообщения
+как используемые.
+"""
+
+import ast
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+# attributes of TranslatorRunner, not parts of translation keys
+RUNNER_ATTRIBUTES = {"get", "format_many", "locale", "separator", "translators", "key_map"}
+RUNNER_ANNOTATIONS = {"TranslatorRunner"}
+I18N_NAMES = {"i18n"}
+
+
+class _KeyCollector(ast.NodeVisitor):
+    def __init__(self, file_name: str, separator: str) -> None:
+        self.file_name = file_name
+        self.separator = separator
+        self.i18n_names = set(I18N_NAMES)
+        # key -> [(file:line, called)]
+        self.keys: Dict[str, List[Tuple[str, bool]]] = defaultdict(list)
+        # constant prefix of a dynamic key -> [file:line]
+        self.dynamic: Dict[str, List[str]] = defaultdict(list)
+        self._called: Set[int] = set()
+
+    def _where(self, node: ast.expr) -> str:
+        return f"{self.file_name}:{node.lineno}"
+
+    def _is_root(self, node: ast.AST) -> bool:
+        if isinstance(node, ast.Name):
+            return node.id in self.i18n_names
+        if isinstance(node, ast.Attribute):
+            return node.attr == "i18n"
+        if isinstance(node, ast.Call):
+            func = node.func
+            name = func.id if isinstance(func, ast.Name) else getattr(func, "attr", None)
+            return name == "get_i18n"
+        return False
+
+    def _add_names(self, target: ast.AST) -> None:
+        if isinstance(target, ast.Name):
+            self.i18n_names.add(target.id)
+
+    def visit_Assign(self, node: ast.Assign) -> None:
+        if self._is_root(node.value):
+            for target in node.targets:
+                self._add_names(target)
+        self.generic_visit(node)
+
+    def visit_AnnAssign(self, node: ast.AnnAssign) -> None:
+        if (node.value is not None and self._is_root(node.value)) or self._is_runner(
+            node.annotation
+        ):
+            self._add_names(node.target)
+        self.generic_visit(node)
+
+    def visit_arg(self, node: ast.arg) -> None:
+        if node.annotation is not None and self._is_runner(node.annotation):
+            self.i18n_names.add(node.arg)
+        self.generic_visit(node)
+
+    def _is_runner(self, annotation: ast.AST) -> bool:
+        if isinstance(annotation, ast.Constant) and isinstance(annotation.value, str):
+            return annotation.value.rsplit(".", 1)[-1] in RUNNER_ANNOTATIONS
+        name = getattr(annotation, "attr", None) or getattr(annotation, "id", None)
+        return name in RUNNER_ANNOTATIONS
+
+    def visit_Call(self, node: ast.Call) -> None:
+        func = node.func
+        if isinstance(func, ast.Attribute):
+            self._called.add(id(func))
+            if func.attr in ("get", "format_many") and self._is_root(func.value) and node.args:
+                self._add_key_argument(node.args[0])
+        self.generic_visit(node)
+
+    def _add_key_argument(self, arg: ast.expr) -> None:
+        if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+            self.keys[arg.value].append((self._where(arg), True))
+        elif isinstance(arg, ast.JoinedStr):
+            prefix = ""
+            for value in arg.values:
+                if not (isinstance(value, ast.Constant) and isinstance(value.value, str)):
+                    break
+                prefix += value.value
+            self.dynamic[prefix].append(self._where(arg))
+        elif not isinstance(arg, ast.Attribute):
+            self.dynamic[""].append(self._where(arg))
+
+    def visit_Attribute(self, node: ast.Attribute) -> None:
+        parts: List[str] = []
+        current: ast.expr = node
+        while isinstance(current, ast.Attribute) and not self._is_root(current):
+            parts.append(current.attr)
+            current = current.value
+        if not parts or not self._is_root(current):
+            self.generic_visit(node)
+            return
+
+        parts.reverse()
+        if parts[0] not in RUNNER_ATTRIBUTES:
+            key = self.separator.join(parts)
+            self.keys[key].append((self._where(node), id(node) in self._called))
+        # the chain is recorded once, only the root may contain more keys (get_i18n(...))
+        self.visit(current)
+
+
+def collect_used_keys(paths: Iterable[Path], separator: str = "-") -> Dict[str, Any]:
+    """
+    Ключи переводов, используемые в .py файлах
+
+    Returns:
+        {"keys": {key: [(file:line, called)]}, "dynamic": {prefix: [file:line]},
+        "errors": [file: error]}
+    """
+    keys: Dict[str, List[Tuple[str, bool]]] = defaultdict(list)
+    dynamic: Dict[str, List[str]] = defaultdict(list)
+    errors: List[str] = []
+    for path in paths:
+        files = sorted(path.rglob("*.py")) if path.is_dir() else [path]
+        for file in files:
+            try:
+                tree = ast.parse(file.read_text(encoding="utf-8"), filename=str(file))
+            except (SyntaxError, UnicodeDecodeError) as e:
+                errors.append(f"{file}: {e}")
+                continue
+            collector = _KeyCollector(str(file), separator)
+            collector.visit(tree)
+            for key, usages in collector.keys.items():
+                keys[key].extend(usages)
+            for prefix, locations in collector.dynamic.items():
+                dynamic[prefix].extend(locations)
+    return {"keys": dict(keys), "dynamic": dict(dynamic), "errors": errors}
+
+
+def build_report(
+    used: Dict[str, Any],
+    language_keys: Dict[str, Set[str]],
+    locale_keys: Dict[str, Set[str]],
+    separator: str = "-",
+) -> Dict[str, Any]:
+    """
+    Недостающие и неиспользуемые ключи
+
+    Args:
+        used: Результат collect_used_keys
+        language_keys: Язык -> ключи, доступные в его цепочке локалей
+        locale_keys: Локаль -> ключи ее .ftl файлов
+        separator: Разделитель частей ключа
+
+    Returns:
+        {"missing": {lang: {key: [file:line]}}, "unused": {locale: [key]}, ...}
+    """
+    missing: Dict[str, Dict[str, List[str]]] = {}
+    for lang, available in language_keys.items():
+        prefixes: Set[str] = set()
+        for key in available:
+            parts = key.split(separator)
+            prefixes.update(separator.join(parts[:i]) for i in range(1, len(parts)))
+        lang_missing: Dict[str, List[str]] = {}
+        for key, usages in used["keys"].items():
+            if key in available:
+                continue
+            # an attribute chain that is not called may be a prefix: labels = i18n.status
+            if not any(called for _, called in usages) and key in prefixes:
+                continue
+            lang_missing[key] = [where for where, _ in usages]
+        if lang_missing:
+            missing[lang] = dict(sorted(lang_missing.items()))
+
+    used_keys = set(used["keys"])
+    dynamic_prefixes = tuple(prefix for prefix in used["dynamic"] if prefix)
+    unused: Dict[str, List[str]] = {}
+    for locale, keys in locale_keys.items():
+        locale_unused = sorted(
+            key
+            for key in keys
+            if key not in used_keys and not (dynamic_prefixes and key.startswith(dynamic_prefixes))
+        )
+        if locale_unused:
+            unused[locale] = locale_unused
+
+    return {
+        "used": len(used["keys"]),
+        "dynamic": dict(sorted(used["dynamic"].items())),
+        "missing": missing,
+        "unused": unused,
+        "errors": used["errors"],
+    }
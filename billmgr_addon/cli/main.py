@@ -2,6 +2,7 @@
 
 import os
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
 
 import click
 
@@ -9,6 +10,9 @@ from ..scaffold import ProjectScaffold
 from ..utils.files import create_plugin_symlinks
 from .deploy import deploy as deploy_commands
 
+if TYPE_CHECKING:
+    from ..fluentbillmgr import TranslationKeyIndex, TranslatorHub
+
 
 @click.group()
 @click.version_option()
@@ -74,7 +78,17 @@ def create_project(name: str, path: str, template: str):
     default=True,
     help="Устанавливать ли processing module script (по умолчанию да, если processing_module_cli.py существует)",
 )
-def install(plugin_name: str, install_processing_module: bool):
+@click.option(
+    "--processing-module-server/--no-processing-module-server",
+    default=False,
+    help=(
+        "Выполнять команды processing module резидентным сервером "
+        "вместо запуска процесса на каждую команду"
+    ),
+)
+def install(
+    plugin_name: str, install_processing_module: bool, processing_module_server: bool
+) -> None:
     """Установить плагин в BILLmanager"""
     click.echo(f"Установка плагина '{plugin_name}' в BILLmanager...")
 
@@ -86,7 +100,11 @@ def install(plugin_name: str, install_processing_module: bool):
         if not os.access(mgr_path, os.W_OK):
             raise click.ClickException("Недостаточно прав для установки. Запустите с sudo.")
 
-        links = create_plugin_symlinks(plugin_name, install_processing_module=install_processing_module)
+        links = create_plugin_symlinks(
+            plugin_name,
+            install_processing_module=install_processing_module,
+            processing_module_server=processing_module_server,
+        )
 
         click.echo("Ссылки созданы:")
         for link_type, link_path in links.items():
@@ -132,6 +150,277 @@ def build_xml(xml_path):
         raise click.Abort()
 
 
+def _load_i18n_hub(project_path: Path, factory: str, error_message: str) -> "TranslatorHub":
+    """Создать TranslatorHub фабрикой проекта и загрузить переводчики всех языков"""
+    import importlib
+    import sys
+
+    module_name, _, factory_name = factory.partition(":")
+    sys.path.insert(0, str(project_path))
+    try:
+        i18n_factory = getattr(importlib.import_module(module_name), factory_name)
+        hub: "TranslatorHub" = i18n_factory(str(project_path))
+        # translators created by factories are loaded on the first request in a locale
+        for locale in hub.locales_map:
+            hub.get_translator_by_locale(locale)
+    # the factory is project code and may fail in any way
+    except Exception as e:  # noqa: BLE001
+        click.echo(f"{error_message}: {e}")
+        raise click.Abort() from e
+    finally:
+        sys.path.remove(str(project_path))
+    return hub
+
+
+@main.command()
+@click.option(
+    "--project-path",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    default=".",
+    help="Корень проекта плагина (по умолчанию текущая директория)",
+)
+@click.option(
+    "--factory",
+    default="app.i18n.factory:i18n_factory",
+    show_default=True,
+    help="i18n фабрика проекта (модуль:функция)",
+)
+@click.option(
+    "--cache-path",
+    default="app/i18n/.cache",
+    show_default=True,
+    help="Папка кэша относительно корня проекта",
+)
+@click.option("--clear", is_flag=True, help="Удалить существующий кэш перед сборкой")
+def build_i18n_cache(project_path: Path, factory: str, cache_path: str, clear: bool) -> None:
+    """Скомпилировать переводы в кэш FluentBundleCache"""
+    from ..fluentbillmgr import FluentBundleCache
+
+    project_path = project_path.resolve()
+    cache = FluentBundleCache(project_path / cache_path)
+    if clear:
+        click.echo(f"Удалено файлов кэша: {cache.clear()}")
+
+    _load_i18n_hub(project_path, factory, "Ошибка сборки кэша переводов")
+
+    cache_files = sorted(cache.path.glob("*.cache"))
+    if not cache_files:
+        raise click.ClickException(
+            f"Кэш в {cache.path} пуст, фабрика должна создавать бандлы через FluentBundleCache"
+        )
+    click.echo(f"Кэш переводов собран: {cache.path}")
+    for cache_file in cache_files:
+        click.echo(f"  {cache_file.name}")
+
+
+def _echo_i18n_report(
+    report: Dict[str, Any], index: "TranslationKeyIndex", index_file: Path
+) -> None:
+    click.echo(f"Ключей в коде: {report['used']}, индекс: {index_file}")
+    unverified = sorted(locale for locale, value in index.sources.items() if value is None)
+    if unverified:
+        click.echo(
+            f"Индекс не будет использоваться для локалей {', '.join(unverified)}: "
+            "бандлы созданы не FluentBundleCache"
+        )
+    for error in report["errors"]:
+        click.echo(f"Ошибка разбора {error}")
+    for lang, keys in report["missing"].items():
+        click.echo(f"Нет в языке {lang} ({len(keys)}):")
+        for key, usages in keys.items():
+            click.echo(f"  {key:<40} {', '.join(usages)}")
+    for locale, keys in report["unused"].items():
+        click.echo(f"Не используются в коде, {locale} ({len(keys)}):")
+        for key in keys:
+            click.echo(f"  {key}")
+    if report["dynamic"]:
+        click.echo("Динамические ключи (проверяются только во время выполнения):")
+        for prefix, usages in report["dynamic"].items():
+            click.echo(f"  {prefix or '<выражение>'}*  {', '.join(usages)}")
+
+
+@main.command()
+@click.option(
+    "--project-path",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    default=".",
+    help="Корень проекта плагина (по умолчанию текущая директория)",
+)
+@click.option(
+    "--factory",
+    default="app.i18n.factory:i18n_factory",
+    show_default=True,
+    help="i18n фабрика проекта (модуль:функция)",
+)
+@click.option(
+    "--source",
+    multiple=True,
+    default=["app"],
+    show_default=True,
+    help="Файлы или папки с кодом относительно корня проекта, можно указать несколько раз",
+)
+@click.option(
+    "--index-path",
+    default="app/i18n/.cache/keys.json",
+    show_default=True,
+    help="Файл индекса ключей относительно корня проекта",
+)
+@click.option("--strict", is_flag=True, help="Завершиться с ошибкой, если есть недостающие ключи")
+@click.option("--json", "as_json", is_flag=True, help="Вывести отчет в JSON")
+def build_i18n_index(
+    project_path: Path,
+    factory: str,
+    source: Tuple[str, ...],
+    index_path: str,
+    strict: bool,
+    as_json: bool,
+) -> None:
+    """Сверить ключи переводов в коде с .ftl файлами и собрать индекс ключей"""
+    import json
+
+    from ..fluentbillmgr import TranslationKeyIndex
+    from .i18n_index import build_report, collect_used_keys
+
+    project_path = project_path.resolve()
+    hub = _load_i18n_hub(project_path, factory, "Ошибка загрузки переводов")
+
+    index = TranslationKeyIndex.build(hub)
+    language_keys = {lang: set(index.keys(lang)) for lang in index.languages}
+    locale_keys = {}
+    for lang in hub.locales_map:
+        for translator in hub.get_translator_by_locale(lang).translators:
+            if hasattr(translator, "message_ids"):
+                locale_keys[translator.locale] = set(translator.message_ids())
+
+    used = collect_used_keys([project_path / path for path in source], hub.separator)
+    report = build_report(used, language_keys, locale_keys, hub.separator)
+    index.save(project_path / index_path)
+
+    if as_json:
+        click.echo(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        _echo_i18n_report(report, index, project_path / index_path)
+
+    if strict and report["missing"]:
+        raise click.ClickException("В коде есть ключи, которых нет в переводах")
+
+
+@main.command()
+@click.option(
+    "--project-path",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    default=".",
+    help="Корень проекта плагина (по умолчанию текущая директория)",
+)
+@click.option("--app-module", default="app.app", help="Модуль приложения, как в cgi.py")
+@click.option("--factory", default="create_cgi_app", help="Функция создания CGI приложения")
+@click.option("--repeat", default=5, show_default=True, help="Количество запусков")
+@click.option("--top", default=15, show_default=True, help="Количество строк в рейтингах")
+@click.option("--json", "as_json", is_flag=True, help="Вывести отчет в JSON")
+def profile_startup(
+    project_path: Path, app_module: str, factory: str, repeat: int, top: int, as_json: bool
+) -> None:
+    """Профилировать холодный старт CGI скрипта плагина"""
+    import json
+
+    from .startup import StartupProbeError, build_report, run_probe
+
+    project_path = project_path.resolve()
+    runs = []
+    try:
+        for _ in range(repeat):
+            runs.append(run_probe(project_path, app_module, factory))
+    except StartupProbeError as e:
+        click.echo(f"Ошибка запуска {app_module}.{factory}:\n{e}", err=True)
+        raise click.Abort() from e
+
+    report = build_report(runs, top=top)
+    if as_json:
+        click.echo(json.dumps(report, indent=2))
+        return
+
+    click.echo(
+        f"Запусков: {report['runs']}, медиана времени процесса: {report['wall'] * 1000:.1f} ms"
+    )
+    click.echo()
+    click.echo("Фазы:")
+    for name, seconds in report["phases"].items():
+        error = report["errors"].get(name)
+        suffix = f"  ({error})" if error else ""
+        click.echo(f"  {name:<24} {seconds * 1000:>10.1f} ms{suffix}")
+
+    click.echo()
+    click.echo(f"Импорт по пакетам (всего {report['import_total_us'] / 1000:.1f} ms):")
+    for name, self_us in report["packages"]:
+        click.echo(f"  {name:<40} {self_us / 1000:>10.1f} ms")
+
+    click.echo()
+    click.echo("Самые медленные модули (cumulative):")
+    for name, cumulative_us in report["modules"]:
+        click.echo(f"  {name:<56} {cumulative_us / 1000:>10.1f} ms")
+
+
+@main.command()
+@click.option(
+    "--factory",
+    default="app.app:create_processing_module_cli_app",
+    show_default=True,
+    help="Функция создания приложения processing module (модуль:функция)",
+)
+@click.option(
+    "--socket",
+    "socket_path",
+    default="processing_module.sock",
+    show_default=True,
+    help="Путь Unix сокета относительно корня проекта",
+)
+@click.option("--command", default="execute", show_default=True, help="Команда processing module")
+@click.option(
+    "--idle-timeout",
+    default=600.0,
+    show_default=True,
+    help="Завершиться после стольких секунд без команд, 0 - не завершаться",
+)
+@click.option("--max-requests", type=int, help="Перезапуск после стольких команд")
+@click.option("--db-pool-size", default=4, show_default=True, help="Свободных подключений к БД")
+@click.option("--stop", is_flag=True, help="Остановить запущенный сервер")
+def processing_module_server(
+    factory: str,
+    socket_path: str,
+    command: str,
+    idle_timeout: float,
+    max_requests: Optional[int],
+    db_pool_size: int,
+    stop: bool,
+) -> None:
+    """Резидентный processing module, запускается из корня проекта"""
+    import importlib
+    import sys
+
+    from ..core.processing_module import serve_processing_module, stop_processing_module_server
+
+    project_path = Path.cwd()
+    socket_path = str(project_path / socket_path)
+    if stop:
+        stopped = stop_processing_module_server(socket_path)
+        click.echo("Сервер остановлен" if stopped else "Сервер не запущен")
+        return
+
+    module_name, _, factory_name = factory.partition(":")
+    sys.path.insert(0, str(project_path))
+    app = getattr(importlib.import_module(module_name), factory_name)()
+    started = serve_processing_module(
+        app,
+        socket_path,
+        command=command,
+        idle_timeout=idle_timeout or None,
+        max_requests=max_requests,
+        db_pool_size=db_pool_size,
+    )
+    if not started:
+        click.echo(f"Сервер на {socket_path} уже запущен")
+
+
 main.add_command(deploy_commands)
 
 
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+"""
+Профилирование холодного старта CGI скрипта плагина
+
+Путь cgi.py (импорт модуля приложения, create_cgi_app, i18n фабрика, подключение
+к БД) выполняется в отдельном процессе с -X importtime. Процесс печатает время
+фаз в stdout, время импортов пишется интерпретатором в stderr.
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# only stdlib modules are imported before the first timer, so the import phase
+# includes everything the application pulls in
+_PROBE_SCRIPT = """
+import importlib, json, os, sys, time
+
+project_path, app_module, factory_name = sys.argv[1:4]
+os.chdir(project_path)
+sys.path.insert(0, project_path)
+os.environ.setdefault("BILLMGR_ADDON_PROJECT_ROOT", project_path)
+
+phases = {}
+errors = {}
+
+started_at = time.perf_counter()
+module = importlib.import_module(app_module)
+phases["import"] = time.perf_counter() - started_at
+
+from billmgr_addon.core import i18n as _i18n
+
+_init_i18n = _i18n.I18nExtension._init_i18n
+
+def _timed_init_i18n(self):
+    started_at = time.perf_counter()
+    try:
+        return _init_i18n(self)
+    finally:
+        phases["i18n"] = phases.get("i18n", 0.0) + time.perf_counter() - started_at
+
+_i18n.I18nExtension._init_i18n = _timed_init_i18n
+
+started_at = time.perf_counter()
+app = getattr(module, factory_name)()
+phases["create_app"] = time.perf_counter() - started_at - phases.get("i18n", 0.0)
+
+from billmgr_addon.db import get_db
+
+with app.app_context():
+    for alias in (None, "billmgr"):
+        phase = "db_connect" if alias is None else f"db_connect_{alias}"
+        started_at = time.perf_counter()
+        try:
+            get_db(alias)
+        except Exception as e:
+            errors[phase] = repr(e)
+        phases[phase] = time.perf_counter() - started_at
+
+sys.stdout.write(json.dumps({"phases": phases, "errors": errors}) + "\\n")
+"""
+
+
+class StartupProbeError(Exception):
+    pass
+
+
+def _parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # import time:       123 |        456 |   module.name
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        imports.append((name.strip(), int(self_us), int(cumulative_us)))
+    return imports
+
+
+def run_probe(project_path: Path, app_module: str, factory: str) -> Dict[str, Any]:
+    """
+    Один запуск холодного старта
+
+    Returns:
+        {"wall": секунды, "phases": {фаза: секунды}, "errors": {фаза: ошибка},
+        "imports": [(модуль, self us, cumulative us)]}
+    """
+    started_at = time.perf_counter()
+    process = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", _PROBE_SCRIPT]
+        + [str(project_path), app_module, factory],
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - started_at
+
+    output_lines = process.stdout.strip().splitlines()
+    if process.returncode != 0 or not output_lines:
+        errors = [
+            line for line in process.stderr.splitlines() if not line.startswith("import time:")
+        ]
+        raise StartupProbeError("\n".join(errors[-20:]))
+
+    result: Dict[str, Any] = json.loads(output_lines[-1])
+    result["wall"] = wall
+    result["imports"] = _parse_importtime(process.stderr)
+    return result
+
+
+def build_report(runs: List[Dict[str, Any]], top: int = 20) -> Dict[str, Any]:
+    """
+    Медианы по нескольким запускам: фазы, время импорта по пакетам верхнего уровня
+    и самые медленные модули
+    """
+    phases: Dict[str, List[float]] = defaultdict(list)
+    packages: Dict[str, List[int]] = defaultdict(list)
+    modules: Dict[str, List[int]] = defaultdict(list)
+
+    for run in runs:
+        for name, seconds in run["phases"].items():
+            phases[name].append(seconds)
+
+        run_packages: Dict[str, int] = defaultdict(int)
+        for name, self_us, cumulative_us in run["imports"]:
+            # self times of all modules add up to the total import time
+            run_packages[name.split(".")[0]] += self_us
+            modules[name].append(cumulative_us)
+        for name, self_us in run_packages.items():
+            packages[name].append(self_us)
+
+    def ranked(
+        values: Dict[str, List[int]], limit: Optional[int] = None
+    ) -> List[Tuple[str, float]]:
+        medians = [(name, statistics.median(items)) for name, items in values.items()]
+        medians.sort(key=lambda item: item[1], reverse=True)
+        return medians[:limit]
+
+    return {
+        "runs": len(runs),
+        "wall": statistics.median(run["wall"] for run in runs),
+        "phases": {name: statistics.median(items) for name, items in phases.items()},
+        "errors": runs[-1]["errors"],
+        "import_total_us": sum(value for _, value in ranked(packages)),
+        "packages": ranked(packages, top),
+        "modules": ranked(modules, top),
+    }
+
+
+__all__ = ["StartupProbeError", "run_probe", "build_report"]
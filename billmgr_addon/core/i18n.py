@@ -4,6 +4,7 @@ from typing import Callable
 from flask import Flask, current_app
 
 from billmgr_addon.utils.logging import LOGGER
+from billmgr_addon.utils.metrics import count_i18n_lookup
 
 from ..fluentbillmgr import TranslatorHub, TranslatorRunner
 from ..utils.files import cwd_path
@@ -11,7 +12,10 @@ from ..utils.files import cwd_path
 
 def get_i18n(locale: str) -> TranslatorRunner:
     i18n: TranslatorHub = current_app.extensions["i18n"].namespace.instance
-    return i18n.get_translator_by_locale(locale)
+    runner = i18n.get_translator_by_locale(locale)
+    # the locale comes from the request cookie, unknown locales are counted as the root one
+    count_i18n_lookup(runner.locale or locale)
+    return runner
 
 
 class I18nExtension:
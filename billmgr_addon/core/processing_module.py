@@ -4,16 +4,42 @@
 Processing Module для плагинов
 """
 
-import xml.etree.ElementTree as ET
-from abc import ABC, abstractmethod
-from typing import Dict, List, Optional, Any
+import fcntl
+import io
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+from collections import defaultdict
+from collections.abc import MutableMapping
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager, nullcontext, suppress
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    TextIO,
+)
+
 import click
-from flask import Blueprint, current_app
+from flask import Flask, current_app
 
-from ..core.response import MgrResponse, MgrErrorResponse
+from ..core.response import MgrResponse
 from ..db import get_db
-from ..utils.mgrctl import mgrctl_exec
 from ..utils.logging import LOGGER
+from ..utils.mgrctl import mgrctl_exec
+from ..utils.processing_module_client import stop_server as stop_processing_module_server
+from .xml_backend import ET
 
 
 class ProcessingModuleResponse(MgrResponse):
@@ -68,8 +94,628 @@ def create_processing_module_cli_app(processing_module_bp, cli_group=None):
     return app
 
 
+# statuses of item: 2 - active, 3 - suspended
+DEFAULT_ITEM_STATUSES = (2, 3)
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_CONCURRENCY = 4
+
+
+@dataclass
+class ProcessingItem:
+    """Услуга BILLmanager с параметрами (itemparam)"""
+
+    id: int
+    status: int
+    pricelist: int
+    account: int
+    processingmodule: Optional[int]
+    params: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class ItemResult:
+    """Результат обработки одной услуги"""
+
+    item_id: int
+    ok: bool
+    value: Any = None
+    error: Optional[BaseException] = None
+
+
+def _in_clause(prefix: str, values: Iterable[Any], param_dict: Dict[str, Any]) -> str:
+    placeholders = []
+    for i, value in enumerate(values):
+        param_name = f"{prefix}{i}"
+        placeholders.append(f"%({param_name})s")
+        param_dict[param_name] = value
+    return ", ".join(placeholders)
+
+
+def _select_items(where: str, values: Dict[str, Any], db_alias: str) -> List[ProcessingItem]:
+    # where contains only placeholders, the values are bound parameters
+    rows = get_db(db_alias).select_query(
+        f"""
+            SELECT i.id,
+                   i.status,
+                   i.pricelist,
+                   i.account,
+                   i.processingmodule,
+                   ip.intname AS param_name,
+                   ip.value AS param_value
+            FROM item i
+            LEFT JOIN itemparam ip
+                ON ip.item = i.id
+            WHERE {where}
+            ORDER BY i.id
+        """,  # noqa: S608
+        values,
+    ).all()
+
+    items: Dict[int, ProcessingItem] = {}
+    for row in rows:
+        item = items.get(row["id"])
+        if item is None:
+            item = items[row["id"]] = ProcessingItem(
+                id=row["id"],
+                status=row["status"],
+                pricelist=row["pricelist"],
+                account=row["account"],
+                processingmodule=row["processingmodule"],
+            )
+        if row["param_name"] is not None:
+            item.params[row["param_name"]] = row["param_value"]
+    return list(items.values())
+
+
+def load_module_items(
+    module_id: int,
+    statuses: Optional[Sequence[int]] = DEFAULT_ITEM_STATUSES,
+    db_alias: str = "billmgr",
+) -> List[ProcessingItem]:
+    """
+    Загрузить услуги модуля обработки вместе с параметрами одним запросом
+
+    Args:
+        module_id: Id модуля обработки (--module)
+        statuses: Статусы услуг, None - все статусы
+        db_alias: Псевдоним подключения к БД BILLmanager
+
+    Returns:
+        Услуги в порядке id
+    """
+    values: Dict[str, Any] = {"module_id": module_id}
+    where = "i.processingmodule = %(module_id)s"
+    if statuses is not None:
+        if not statuses:
+            return []
+        where += f" AND i.status IN ({_in_clause('status_', statuses, values)})"
+    return _select_items(where, values, db_alias)
+
+
+def load_items(item_ids: Iterable[int], db_alias: str = "billmgr") -> List[ProcessingItem]:
+    """
+    Загрузить услуги по id вместе с параметрами одним запросом
+
+    Returns:
+        Найденные услуги в порядке id
+    """
+    values: Dict[str, Any] = {}
+    in_clause = _in_clause("item_", item_ids, values)
+    if not in_clause:
+        return []
+    return _select_items(f"i.id IN ({in_clause})", values, db_alias)
+
+
+def _make_batches(
+    items: List[ProcessingItem],
+    batch_size: int,
+    group_by: Optional[Callable[[ProcessingItem], Hashable]],
+) -> List[List[ProcessingItem]]:
+    groups: Dict[Hashable, List[ProcessingItem]] = defaultdict(list)
+    for item in items:
+        groups[group_by(item) if group_by is not None else None].append(item)
+    return [
+        group[start : start + batch_size]
+        for group in groups.values()
+        for start in range(0, len(group), batch_size)
+    ]
+
+
+def _run_batch(
+    app: Flask,
+    handler: Callable[[List[ProcessingItem]], Dict[int, Any]],
+    batch: List[ProcessingItem],
+) -> List[ItemResult]:
+    # each batch has its own app context and therefore its own DB connection
+    with app.app_context():
+        try:
+            values = handler(batch) or {}
+        except Exception as e:  # noqa: BLE001
+            LOGGER.exception("Batch of items %s failed", [item.id for item in batch])
+            return [ItemResult(item.id, ok=False, error=e) for item in batch]
+
+    results: List[ItemResult] = []
+    for item in batch:
+        if item.id not in values:
+            error = RuntimeError(f"Handler returned no result for item {item.id}")
+            results.append(ItemResult(item.id, ok=False, error=error))
+            continue
+        value = values[item.id]
+        if isinstance(value, BaseException):
+            results.append(ItemResult(item.id, ok=False, error=value))
+        else:
+            results.append(ItemResult(item.id, ok=True, value=value))
+    return results
+
+
+def _iter_batch_results(
+    app: Flask,
+    handler: Callable[[List[ProcessingItem]], Dict[int, Any]],
+    batches: List[List[ProcessingItem]],
+    concurrency: int,
+) -> Iterator[List[ItemResult]]:
+    # results of batches in the order of completion
+    if concurrency == 1 or len(batches) == 1:
+        for batch in batches:
+            yield _run_batch(app, handler, batch)
+        return
+
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(batches))) as executor:
+        futures = [executor.submit(_run_batch, app, handler, batch) for batch in batches]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def run_batched(
+    items: Iterable[ProcessingItem],
+    handler: Callable[[List[ProcessingItem]], Dict[int, Any]],
+    batch_size: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    group_by: Optional[Callable[[ProcessingItem], Hashable]] = None,
+    report: Optional[Callable[[ItemResult], None]] = None,
+) -> List[ItemResult]:
+    """
+    Обработать услуги пачками, пачки выполняются параллельно
+
+    Услуги группируются по group_by (например, по тарифу или серверу), группы
+    делятся на пачки по batch_size. Обработчик получает пачку и возвращает
+    {item_id: результат}; исключение в качестве результата - ошибка услуги,
+    исключение из обработчика - ошибка всех услуг пачки.
+
+    Args:
+        items: Услуги, например из load_module_items
+        handler: Обработчик пачки, вызывается в своем контексте приложения
+        batch_size: Размер пачки, по умолчанию PROCESSING_MODULE_BATCH_SIZE
+        concurrency: Сколько пачек выполнять одновременно,
+            по умолчанию PROCESSING_MODULE_CONCURRENCY
+        group_by: Ключ группировки услуги
+        report: Вызывается для результата каждой услуги по мере готовности пачек
+
+    Returns:
+        Результаты в порядке items
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    app: Flask = current_app._get_current_object()  # type: ignore[attr-defined]
+    if batch_size is None:
+        batch_size = app.config.get("PROCESSING_MODULE_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+    if concurrency is None:
+        concurrency = app.config.get("PROCESSING_MODULE_CONCURRENCY", DEFAULT_CONCURRENCY)
+    if batch_size < 1 or concurrency < 1:
+        raise ValueError("batch_size and concurrency must be positive")
+
+    batches = _make_batches(items, batch_size, group_by)
+    results: Dict[int, ItemResult] = {}
+    # results are reported from this thread, report does not need to be thread safe
+    for batch_results in _iter_batch_results(app, handler, batches, concurrency):
+        for result in batch_results:
+            results[result.item_id] = result
+            if report is not None:
+                try:
+                    report(result)
+                except Exception:  # noqa: BLE001
+                    LOGGER.exception("Reporting result of item %s failed", result.item_id)
+
+    return [results[item.id] for item in items]
+
+
+def report_to_billmgr(operation: str) -> Callable[[ItemResult], None]:
+    """
+    Сообщать BILLmanager о результате каждой услуги
+
+    Успешные услуги подтверждаются функцией service.post<operation>
+    (service.postopen, service.postsuspend, ...), ошибки записываются в лог.
+
+    Args:
+        operation: Операция processing module: open, suspend, resume, close, ...
+    """
+
+    def report(result: ItemResult) -> None:
+        if result.ok:
+            mgrctl_exec([f"service.post{operation}", f"elid={result.item_id}", "sok=ok"])
+        else:
+            LOGGER.error(f"Operation {operation} failed for item {result.item_id}: {result.error}")
+
+    return report
+
+
+def batched_command(
+    handler: Callable[[List[ProcessingItem]], Dict[int, Any]],
+    statuses: Optional[Sequence[int]] = DEFAULT_ITEM_STATUSES,
+    batch_size: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    group_by: Optional[Callable[[ProcessingItem], Hashable]] = None,
+    report: Optional[Callable[[ItemResult], None]] = None,
+    db_alias: str = "billmgr",
+) -> Callable[..., ProcessingModuleResponse]:
+    """
+    Команда processing module из пачечного обработчика
+
+    С --item обрабатывается одна услуга, с --module - все услуги модуля
+    (например, для stat), загруженные одним запросом.
+
+    Example:
+        >>> def collect_stats(items):
+        ...     usage = api.get_usage([item.params["server_id"] for item in items])
+        ...     return {item.id: usage[item.params["server_id"]] for item in items}
+        >>> stat_command = batched_command(collect_stats, concurrency=8)
+
+    Returns:
+        Функция command(item_id=None, module_id=None, **kwargs) для словаря команд
+        execute, возвращает ProcessingModuleResponse("ok") если все услуги обработаны
+    """
+
+    def command(
+        item_id: Optional[int] = None, module_id: Optional[int] = None, **kwargs: Any
+    ) -> ProcessingModuleResponse:
+        if item_id is not None:
+            items = load_items([item_id], db_alias=db_alias)
+        elif module_id is not None:
+            items = load_module_items(module_id, statuses=statuses, db_alias=db_alias)
+        else:
+            raise click.UsageError("Option --item or --module is required")
+
+        results = run_batched(items, handler, batch_size, concurrency, group_by, report)
+        failed = [result.item_id for result in results if not result.ok]
+        LOGGER.info(f"Processed {len(results)} items, failed: {failed}")
+        return ProcessingModuleResponse("error" if failed else "ok")
+
+    return command
+
+
+class _ThreadOutput(io.TextIOBase):
+    """sys.stdout/sys.stderr сервера: вывод потока запроса собирается в его буфер"""
+
+    encoding = "utf-8"
+
+    def __init__(self, fallback: TextIO) -> None:
+        self._fallback = fallback
+        self._local = threading.local()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        buffer = getattr(self._local, "buffer", None)
+        return (buffer if buffer is not None else self._fallback).write(text)
+
+    def flush(self) -> None:
+        if getattr(self._local, "buffer", None) is None:
+            self._fallback.flush()
+
+    @contextmanager
+    def capture(self) -> Iterator[io.StringIO]:
+        self._local.buffer = io.StringIO()
+        try:
+            yield self._local.buffer
+        finally:
+            self._local.buffer = None
+
+
+class _ThreadInput(io.TextIOBase):
+    """sys.stdin сервера: поток запроса читает stdin, переданный клиентом"""
+
+    encoding = "utf-8"
+
+    def __init__(self, fallback: TextIO) -> None:
+        self._fallback = fallback
+        self._local = threading.local()
+
+    def _stream(self) -> TextIO:
+        buffer: Optional[TextIO] = getattr(self._local, "buffer", None)
+        return buffer if buffer is not None else self._fallback
+
+    def readable(self) -> bool:
+        return True
+
+    def isatty(self) -> bool:
+        return False
+
+    def read(self, size: Optional[int] = -1) -> str:
+        return self._stream().read(-1 if size is None else size)
+
+    def readline(self, size: Optional[int] = -1) -> str:  # type: ignore[override]
+        return self._stream().readline(-1 if size is None else size)
+
+    @contextmanager
+    def provide(self, text: str) -> Iterator[None]:
+        self._local.buffer = io.StringIO(text)
+        try:
+            yield
+        finally:
+            self._local.buffer = None
+
+
+class _ThreadEnviron(MutableMapping):  # type: ignore[type-arg]
+    """
+    os.environ сервера: поток запроса видит переменные окружения клиента
+
+    Изменения в потоке запроса не видны другим запросам. Дочерние процессы без
+    явного env получают окружение сервера.
+    """
+
+    def __init__(self, fallback: MutableMapping) -> None:  # type: ignore[type-arg]
+        self._fallback = fallback
+        self._local = threading.local()
+
+    def _mapping(self) -> MutableMapping:  # type: ignore[type-arg]
+        mapping = getattr(self._local, "mapping", None)
+        return mapping if mapping is not None else self._fallback
+
+    def __getitem__(self, key: str) -> str:
+        value: str = self._mapping()[key]
+        return value
+
+    def __setitem__(self, key: str, value: str) -> None:
+        self._mapping()[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        del self._mapping()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._mapping())
+
+    def __len__(self) -> int:
+        return len(self._mapping())
+
+    def copy(self) -> Dict[str, str]:
+        return dict(self._mapping())
+
+    @contextmanager
+    def provide(self, environ: Dict[str, str]) -> Iterator[None]:
+        self._local.mapping = dict(environ)
+        try:
+            yield
+        finally:
+            self._local.mapping = None
+
+
+class _ProcessingModuleRequestHandler(socketserver.StreamRequestHandler):
+    server: "ProcessingModuleServer"
+
+    def handle(self) -> None:
+        server = self.server
+        # the client always gets a response, otherwise it can't tell what happened
+        response: Dict[str, Any] = {
+            "code": 1,
+            "stdout": "",
+            "stderr": "Processing module server error\n",
+        }
+        try:
+            request = json.loads(self.rfile.readline() or b"{}")
+            if request.get("stop"):
+                response = {"code": 0, "stdout": "", "stderr": ""}
+                server.request_stop()
+            else:
+                response = server.execute(
+                    request.get("argv", []), env=request.get("env"), stdin=request.get("stdin")
+                )
+        except Exception:  # noqa: BLE001
+            LOGGER.exception("Processing module server request failed")
+        finally:
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+class ProcessingModuleServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Резидентный processing module
+
+    Приложение создается один раз, команды от клиента (processing_module_client.py)
+    выполняются в потоках прогретого процесса. Вывод команды и код возврата
+    передаются клиенту, подключения к БД и сессия API переиспользуются.
+
+    Переменные окружения и stdin клиента подменяются для потока команды (os.environ,
+    os.getenv, sys.stdin). Дочерние процессы, запущенные без явного env, получают
+    окружение сервера.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        app: Flask,
+        socket_path: str,
+        command: str = "execute",
+        idle_timeout: Optional[float] = 600,
+        max_requests: Optional[int] = None,
+    ) -> None:
+        """
+        Args:
+            app: Приложение processing module
+            socket_path: Путь Unix сокета
+            command: Команда app.cli, которую вызывает BILLmanager
+            idle_timeout: Завершиться после стольких секунд без запросов, None - никогда
+            max_requests: Завершиться после стольких запросов (перезапуск против утечек)
+        """
+        self.app = app
+        self.socket_path = socket_path
+        self.command = app.cli.commands[command]
+        self.idle_timeout = idle_timeout
+        self.max_requests = max_requests
+        self.requests = 0
+        self.active = 0
+        self.last_activity = time.monotonic()
+        self._state_lock = threading.Lock()
+        self._stopping = False
+        self._stdin = _ThreadInput(sys.stdin)
+        self._stdout = _ThreadOutput(sys.stdout)
+        self._stderr = _ThreadOutput(sys.stderr)
+        self._environ = _ThreadEnviron(os.environ)
+
+        Path(socket_path).unlink(missing_ok=True)
+        # commands run with the privileges of the server, the socket is created with mode 0600
+        umask = os.umask(0o177)
+        try:
+            super().__init__(socket_path, _ProcessingModuleRequestHandler)
+        finally:
+            os.umask(umask)
+
+    def execute(
+        self,
+        argv: List[str],
+        env: Optional[Dict[str, str]] = None,
+        stdin: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Выполнить команду в текущем потоке
+
+        Args:
+            argv: Аргументы команды
+            env: Переменные окружения клиента, None - окружение сервера
+            stdin: Содержимое stdin клиента
+        """
+        with self._state_lock:
+            self.active += 1
+            self.requests += 1
+        code: Any = 0
+        environ = self._environ.provide(env) if env is not None else nullcontext()
+        try:
+            with self.app.app_context(), environ, self._stdin.provide(stdin or ""), \
+                    self._stdout.capture() as stdout, self._stderr.capture() as stderr:
+                try:
+                    self.command.main(
+                        args=argv, prog_name=self.command.name, standalone_mode=False
+                    )
+                except click.exceptions.Exit as e:
+                    code = e.exit_code
+                except click.ClickException as e:
+                    e.show()
+                    code = e.exit_code
+                except click.Abort:
+                    click.echo("Aborted!", err=True)
+                    code = 1
+                except SystemExit as e:
+                    # the same exit code as sys.exit() in a separate process
+                    if e.code is None or isinstance(e.code, int):
+                        code = e.code or 0
+                    else:
+                        click.echo(e.code, err=True)
+                        code = 1
+                except Exception:  # noqa: BLE001
+                    LOGGER.exception("Processing module command %s failed", argv)
+                    code = 1
+            return {"code": code, "stdout": stdout.getvalue(), "stderr": stderr.getvalue()}
+        finally:
+            with self._state_lock:
+                self.active -= 1
+                self.last_activity = time.monotonic()
+                if self.max_requests is not None and self.requests >= self.max_requests:
+                    self.request_stop()
+
+    def serve_forever(self, poll_interval: float = 0.5) -> None:
+        stdin, stdout, stderr, environ = sys.stdin, sys.stdout, sys.stderr, os.environ
+        sys.stdin, sys.stdout, sys.stderr = self._stdin, self._stdout, self._stderr
+        os.environ = self._environ  # type: ignore[assignment]  # noqa: B003
+        try:
+            super().serve_forever(poll_interval)
+        finally:
+            sys.stdin, sys.stdout, sys.stderr, os.environ = stdin, stdout, stderr, environ
+
+    def request_stop(self) -> None:
+        if not self._stopping:
+            self._stopping = True
+            # shutdown() waits for serve_forever, it can't be called from its thread
+            threading.Thread(target=self.shutdown, daemon=True).start()
+
+    def service_actions(self) -> None:
+        if self.idle_timeout is None or self.active:
+            return
+        if time.monotonic() - self.last_activity > self.idle_timeout:
+            LOGGER.info("Processing module server is idle, stopping")
+            self.request_stop()
+
+    def server_close(self) -> None:
+        super().server_close()
+        with suppress(OSError):
+            Path(self.socket_path).unlink()
+
+
+def serve_processing_module(
+    app: Flask,
+    socket_path: str,
+    command: str = "execute",
+    idle_timeout: Optional[float] = 600,
+    max_requests: Optional[int] = None,
+    db_pool_size: int = 4,
+) -> bool:
+    """
+    Запустить резидентный processing module и обслуживать запросы до остановки
+
+    Одновременно работает один сервер на сокет, остальные сразу завершаются.
+
+    Args:
+        app: Приложение processing module
+        socket_path: Путь Unix сокета
+        command: Команда app.cli, которую вызывает BILLmanager
+        idle_timeout: Завершиться после стольких секунд без запросов
+        max_requests: Завершиться после стольких запросов
+        db_pool_size: Сколько свободных подключений к каждой БД держать открытыми
+
+    Returns:
+        False, если сервер на этом сокете уже запущен
+    """
+    lock_file = Path(f"{socket_path}.lock").open("w")  # noqa: SIM115
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return False
+
+    app.config["BILLMGR_API_KEEP_SESSION"] = True
+    db_extensions = app.extensions.get("billmgr_db", {}).values()
+    for db_extension in db_extensions:
+        db_extension.enable_pool(db_pool_size)
+
+    try:
+        server = ProcessingModuleServer(app, socket_path, command, idle_timeout, max_requests)
+        LOGGER.info("Processing module server listening on %s", socket_path)
+        with server:
+            server.serve_forever(poll_interval=1)
+    finally:
+        for db_extension in db_extensions:
+            db_extension.on_extension_close()
+        api = app.extensions.pop("billmgr_api_config_user", None)
+        if api is not None:
+            api.close_session(force=True)
+        lock_file.close()
+    LOGGER.info("Processing module server stopped")
+    return True
+
+
 __all__ = [
     "ProcessingModuleResponse", 
     "FeaturesResponse",
+    "ItemResult",
+    "ProcessingItem",
+    "ProcessingModuleServer",
+    "batched_command",
     "create_processing_module_cli_app",
+    "load_items",
+    "load_module_items",
+    "report_to_billmgr",
+    "run_batched",
+    "serve_processing_module",
+    "stop_processing_module_server",
 ] 
\ No newline at end of file
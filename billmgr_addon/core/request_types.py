@@ -15,7 +15,7 @@ class MgrRequest:
         self.environ = wsgi_environ
         self.params = MgrRequest._parse_environ_params(self.environ)
         self._xml_input = wsgi_environ["wsgi.input"].read()
-        self.user_api = None
+        self.user_api: Optional[BillmgrAPI] = None
         self.cookies = MgrRequest._parse_environ_cookies(self.environ)
 
     @property
@@ -70,8 +70,12 @@ class MgrRequest:
         return mgr_params
 
     def init_user_api(
-        self, url, interface=None, default_remote_address=None, default_forwarded_secret=None
-    ):
+        self,
+        url: str,
+        interface: Optional[str] = None,
+        default_remote_address: Optional[str] = None,
+        default_forwarded_secret: Optional[str] = None,
+    ) -> None:
         ip_address_string = str(self.environ.get("HTTP_X_FORWARDED_FOR", default_remote_address))
         ip_address = ipaddress.ip_address(ip_address_string)
         billmgr_api = BillmgrAPI(
@@ -1,22 +1,123 @@
 # -*- coding: utf-8 -*-
 
-import xml.etree.ElementTree as ET
+"""
+Ответы BILLmanager
+
+Ответы с постоянным содержимым (ok, редирект, ошибка с текстом) не строят дерево
+элементов: их XML рендерится один раз в UTF-8 и берется из LRU кеша. Дерево
+создается только при обращении к root, например когда код плагина дополняет ответ.
+"""
+
 from abc import ABC
-from xml.etree.ElementTree import Element
+from functools import lru_cache
+from typing import Any, Optional
+
+from .xml_backend import ET, XmlElement
+
+RESPONSE_CACHE_SIZE = 512
 
 
 class MgrResponse(ABC):
     def __init__(self) -> None:
-        self.root: Element = ET.Element("doc")
+        self._root: Optional[XmlElement] = None
+        self._rendered: Optional[bytes] = None
+
+    @property
+    def root(self) -> XmlElement:
+        if self._root is None:
+            if self._rendered is not None:
+                self._root = ET.fromstring(self._rendered)
+            else:
+                self._root = ET.Element("doc")
+            # the tree may be changed by the caller from now on
+            self._rendered = None
+        return self._root
+
+    @root.setter
+    def root(self, value: XmlElement) -> None:
+        self._root = value
+        self._rendered = None
 
     def __str__(self) -> str:
-        return ET.tostring(self.root, encoding="unicode", method="xml")
+        if self._rendered is not None:
+            return self._rendered.decode("utf-8")
+        text: str = ET.tostring(self.root, encoding="unicode", method="xml")
+        return text
+
+    def to_bytes(self) -> bytes:
+        """XML ответа в UTF-8 без XML декларации"""
+        if self._rendered is not None:
+            return self._rendered
+        rendered: bytes = ET.tostring(self.root, encoding="utf-8", method="xml")
+        return rendered
+
+
+@lru_cache(maxsize=None)
+def _render_ok(backend_name: str) -> bytes:
+    root = ET.Element("doc")
+    ET.SubElement(root, "ok")
+    rendered: bytes = ET.tostring(root, encoding="utf-8", method="xml")
+    return rendered
+
+
+@lru_cache(maxsize=RESPONSE_CACHE_SIZE)
+def _render_redirect(
+    backend_name: str,
+    redirect_type: str,
+    func: str,
+    *,
+    is_same_tab: bool,
+    is_child_tab: bool,
+    is_parent_tab: bool,
+) -> bytes:
+    root = ET.Element("doc")
+    ok_element = ET.SubElement(root, "ok", attrib={"type": redirect_type})
+    if is_same_tab:
+        ok_element.set("sametab", "yes")
+    if is_child_tab:
+        ok_element.set("child", "yes")
+    if is_parent_tab:
+        ok_element.set("parenttab", "yes")
+    if redirect_type in ["blank", "url"]:
+        ok_element.text = func
+    else:
+        ok_element.text = f"func={func}"
+    rendered: bytes = ET.tostring(root, encoding="utf-8", method="xml")
+    return rendered
+
+
+def _build_error(message: Any) -> XmlElement:
+    root = ET.Element("doc")
+    error_element = ET.SubElement(root, "error")
+    error_element.attrib.update(
+        {
+            "type": "xml",
+            "report": "no",
+            "lang": "en",
+            # 'code': '1'
+        }
+    )
+    ET.SubElement(error_element, "msg").text = message
+    return root
+
+
+@lru_cache(maxsize=RESPONSE_CACHE_SIZE)
+def _render_error(backend_name: str, message: str) -> bytes:
+    rendered: bytes = ET.tostring(_build_error(message), encoding="utf-8", method="xml")
+    return rendered
+
+
+def clear_response_cache() -> None:
+    """Очистить кеш отрендеренных ответов"""
+    _render_ok.cache_clear()
+    _render_redirect.cache_clear()
+    _render_error.cache_clear()
 
 
 class MgrOkResponse(MgrResponse):
     def __init__(self) -> None:
         super().__init__()
-        ET.SubElement(self.root, "ok")
+        self._rendered = _render_ok(ET.name)
 
 
 class MgrRedirectResponse(MgrResponse):
@@ -33,35 +134,21 @@ class MgrRedirectResponse(MgrResponse):
         self, redirect_type, func, is_same_tab=None, is_child_tab=None, is_parent_tab=None
     ) -> None:
         super().__init__()
-        ok_element = ET.SubElement(self.root, "ok", attrib={"type": redirect_type})
-        if is_same_tab:
-            ok_element["sametab"] = "yes"
-        if is_child_tab:
-            ok_element["child"] = "yes"
-        if is_parent_tab:
-            ok_element["parenttab"] = "yes"
-        if redirect_type in ["blank", "url"]:
-            ok_element.text = func
-        else:
-            ok_element.text = f"func={func}"
+        self._rendered = _render_redirect(
+            ET.name,
+            redirect_type,
+            func,
+            is_same_tab=bool(is_same_tab),
+            is_child_tab=bool(is_child_tab),
+            is_parent_tab=bool(is_parent_tab),
+        )
 
 
 class MgrErrorResponse(MgrResponse):
     def __init__(self, message, exception: Exception = None) -> None:
         super().__init__()
-        self._message = message
         self.exception = exception
-        error_element = ET.SubElement(self.root, "error")
-        error_element.attrib.update(
-            {
-                "type": "xml",
-                "report": "no",
-                "lang": "en",
-                # 'code': '1'
-            }
-        )
-        self.message_element = ET.SubElement(error_element, "msg")
-        self.message_element.text = self._message
+        self.message = message
 
     @property
     def message(self):
@@ -70,7 +157,16 @@ class MgrErrorResponse(MgrResponse):
     @message.setter
     def message(self, value):
         self._message = value
-        self.message_element.text = self._message
+        if self._root is not None:
+            self.message_element.text = value
+        elif isinstance(value, str):
+            self._rendered = _render_error(ET.name, value)
+        else:
+            self._root = _build_error(value)
+
+    @property
+    def message_element(self) -> XmlElement:
+        return self.root.find("error/msg")
 
 
 class MgrUnknownErrorResponse(MgrErrorResponse):
@@ -1,30 +1,65 @@
 # -*- coding: utf-8 -*-
 
 import asyncio
+import contextvars
+import functools
+import hmac
 import os
+import time
 from abc import ABC, abstractmethod
-from typing import Iterable, List, Optional
+from typing import Any, Callable, ClassVar, Dict, Iterable, List, Optional, Tuple, Union
 
 from flask import Flask, Response, current_app, request
 from flask_login import current_user
 
-from ..utils.logging import LOGGER
+from ..utils.logging import LOGGER, configure_payload_logging, log_debug_payload
+from ..utils.metrics import (
+    count_error,
+    enable_metrics,
+    get_metrics,
+    render_metrics,
+    request_timer,
+)
+from ..utils.profiling import RequestProfiler, profile_phase
 from .request_types import CgiRequest, MgrRequest
 from .response import MgrErrorResponse, MgrResponse, MgrUnknownErrorResponse
 from .ui import MgrError, MgrForm, MgrList, MgrUI
+from .ui.formatters import ColumnFormatter, compile_formatters
+
+
+async def _run_in_thread(func: Callable[..., Any], *args: Any) -> Any:
+    # run in the default executor keeping context variables (Flask app context)
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(None, functools.partial(context.run, func, *args))
+
+
+def _response_to_bytes(response: object) -> bytes:
+    if isinstance(response, (MgrUI, MgrResponse)):
+        return response.to_bytes()
+    if isinstance(response, bytes):
+        return response
+    return str(response).encode("utf-8")
 
 
 class MgrRouter:
-    def __init__(self, app: Flask, endpoints: List["Endpoint"]):
+    def __init__(self, app: Flask, endpoints: List[Union["MgrEndpoint", "CgiEndpoint"]]):
         self.app = app
         LOGGER.debug("######## MgrRouter __init__")
         app.add_url_rule("/", view_func=self.main_handler, methods=["GET", "POST"])
+        self.profiler = RequestProfiler.from_flask_app(app)
+        configure_payload_logging(
+            max_length=app.config.get("LOG_PAYLOAD_PREVIEW_LENGTH"),
+            sample_rate=app.config.get("LOG_PAYLOAD_SAMPLE_RATE"),
+        )
+        if app.config.get("METRICS_ENABLED", False):
+            enable_metrics(app.config.get("METRICS_MULTIPROC_DIR"))
 
         self.addon_endpoints = {}
         self.cgi_endpoints = {}
         self.setup_endpoints(endpoints)
 
-    def setup_endpoints(self, endpoints: List["Endpoint"]):
+    def setup_endpoints(self, endpoints: List[Union["MgrEndpoint", "CgiEndpoint"]]) -> None:
         for endpoint in endpoints:
             if isinstance(endpoint, MgrEndpoint):
                 mgr_action_name = endpoint.name
@@ -51,27 +86,32 @@ class MgrRouter:
                 endpoint = MgrFallbackEndpoint()
                 LOGGER.error(f"Addon endpoint for func={mgr_action_name} is not found")
 
-            mgr_request = MgrRequest(request.environ)
-            LOGGER.debug(f"request.remote_addr  {request.remote_addr}")
-            if endpoint.__class__.init_user_api:
-                mgr_request.init_user_api(
-                    current_app.config.get("BILLMGR_API_URL"),
-                    interface=current_app.config.get("BILLMGR_API_USE_INTERFACE"),
-                    default_remote_address=request.remote_addr,
-                    default_forwarded_secret=current_app.config.get("FORWARDED_SECRET"),
+            async with self.profiler.profile(mgr_action_name):
+                mgr_request = MgrRequest(request.environ)
+                if endpoint.__class__.init_user_api:
+                    mgr_request.init_user_api(
+                        current_app.config.get("BILLMGR_API_URL", ""),
+                        interface=current_app.config.get("BILLMGR_API_USE_INTERFACE"),
+                        default_remote_address=request.remote_addr,
+                        default_forwarded_secret=current_app.config.get("FORWARDED_SECRET"),
+                    )
+
+                log_debug_payload(
+                    "mgr_request",
+                    action=mgr_action_name,
+                    remote_addr=request.remote_addr,
+                    params=mgr_request.params,
+                    xml_input=mgr_request.xml_input,
+                    environ=mgr_request.environ,
                 )
-
-            LOGGER.debug(f"mgr_request.xml_input {mgr_request.xml_input}")
-            LOGGER.debug(f"mgr_request.params {mgr_request.params}")
-            LOGGER.debug(f"mgr_request.environ {mgr_request.environ}")
-            return await endpoint.handle_request(mgr_request)
+                # the action name comes from the request, only registered names become labels
+                with request_timer(endpoint.name):
+                    return await endpoint.handle_request(mgr_request)
 
         cgi_request = CgiRequest(request=request)
         method = request.method
         func_name = cgi_request.func
-        LOGGER.debug(
-            f"cgi request: func - {func_name}, method - {method}, params - {repr(cgi_request)}"
-        )
+        log_debug_payload("cgi_request", func=func_name, method=method, request=cgi_request)
 
         if func_name:
             endpoint = self.cgi_endpoints.get(func_name, CgiFallbackEndpoint())
@@ -119,6 +159,37 @@ class CgiFallbackEndpoint(CgiEndpoint):
         return Response("Cgi handler not found", status=404)
 
 
+class MetricsEndpoint(CgiEndpoint):
+    """
+    Метрики плагина в формате Prometheus: /?func=metrics
+
+    Если задан METRICS_TOKEN, доступ по заголовку Authorization: Bearer <token>,
+    иначе как у обычного CGI эндпоинта (сессия BILLmanager с auth_level).
+    """
+
+    auth_level = 28
+
+    def __init__(self, function_name: str = "metrics"):
+        super().__init__(function_name)
+
+    async def handle_request(self, cgi_request: CgiRequest) -> Response:
+        token = current_app.config.get("METRICS_TOKEN")
+        if token:
+            authorization = request.headers.get("Authorization", "")
+            if hmac.compare_digest(authorization.encode(), f"Bearer {token}".encode()):
+                return await self._handle_request(cgi_request)
+            return Response("Forbidden", status=403)
+
+        return await super().handle_request(cgi_request)
+
+    async def _handle_request(self, cgi_request: CgiRequest) -> Response:
+        if get_metrics() is None:
+            return Response("Metrics are disabled", status=404)
+
+        data, content_type = render_metrics()
+        return Response(data, content_type=content_type)
+
+
 class HtmlCgiEndpoint(CgiEndpoint):
     html_file_path: Optional[str] = None
 
@@ -166,17 +237,21 @@ class MgrEndpoint(ABC):
     async def handle_request(self, mgr_request: MgrRequest):
         response = None
         LOGGER.debug(
-            f"MgrEndpoint handle_request {self.__class__.auth_level} == {mgr_request.auth_level} -> {self.__class__.auth_level == mgr_request.auth_level}"
+            "MgrEndpoint handle_request auth_level %s, request auth_level %s",
+            self.__class__.auth_level,
+            mgr_request.auth_level,
         )
         if self.__class__.auth_level is None or self.__class__.auth_level == mgr_request.auth_level:
             response = await self._handle_request(mgr_request)
         else:
+            count_error(self.name, "forbidden")
             response = MgrErrorResponse(
                 f"У вас недостаточно прав на выполнение функции {self.name}"
             )
 
-        response = str(response)
-        LOGGER.debug(response)
+        with profile_phase("serialize"):
+            response = _response_to_bytes(response)
+        log_debug_payload("mgr_response", action=self.name, response=response)
         return response
 
     async def _handle_get(self, mgr_request: MgrRequest):
@@ -200,22 +275,26 @@ class MgrEndpoint(ABC):
         try:
             action_type = self._get_action_type(mgr_request)
             handler = self._get_action_handler(action_type)
-            if self.__class__.init_user_api:
-                async with mgr_request.user_api:
+            with profile_phase("handler"):
+                if self.__class__.init_user_api and mgr_request.user_api is not None:
+                    async with mgr_request.user_api:
+                        mgr_response = await handler(mgr_request)
+                else:
                     mgr_response = await handler(mgr_request)
-            else:
-                mgr_response = await handler(mgr_request)
 
             if not isinstance(mgr_response, (MgrUI, MgrResponse)):
                 raise TypeError("Endpoint handler should return MgrUI or MgrResponse instance")
             elif isinstance(mgr_response, MgrUI):
-                mgr_response.patch_xml()
+                with profile_phase("patch_xml"):
+                    mgr_response.patch_xml()
 
         except MgrError as e:
+            count_error(self.name, "mgr_error")
             mgr_response = MgrErrorResponse(e.message)
 
         except Exception as e:
             LOGGER.exception(e)
+            count_error(self.name, "unknown_error")
             if self.fallback_on_error:
                 mgr_response = mgr_request.xml_input
 
@@ -243,6 +322,22 @@ class ActionEndpoint(MgrEndpoint):
 class ListEndpoint(MgrEndpoint):
     use_parent_data_from_request = False
 
+    # {column name: formatter}, see billmgr_addon.core.ui.formatters.compile_formatters
+    column_formatters: Dict[str, Any] = {}
+    _compiled_column_formatters: ClassVar[Dict[str, ColumnFormatter]]
+
+    @classmethod
+    def _get_column_formatters(cls) -> Dict[str, ColumnFormatter]:
+        # compiled once per endpoint class, subclasses get their own cache
+        compiled_formatters: Optional[Dict[str, ColumnFormatter]] = cls.__dict__.get(
+            "_compiled_column_formatters"
+        )
+        if compiled_formatters is None:
+            compiled_formatters = compile_formatters(cls.column_formatters)
+            cls._compiled_column_formatters = compiled_formatters
+
+        return compiled_formatters
+
     @abstractmethod
     async def get(self, mgr_list: MgrList, mgr_request: MgrRequest):
         return MgrErrorResponse(
@@ -251,6 +346,7 @@ class ListEndpoint(MgrEndpoint):
 
     async def _handle_get(self, mgr_request: MgrRequest):
         mgr_list = MgrList.from_request(mgr_request)
+        mgr_list.column_formatters = self.__class__._get_column_formatters()
         if self.__class__.use_parent_data_from_request:
             mgr_list.parent_id = mgr_request.params.get("elid")
             mgr_list.parent_name = mgr_request.params.get("elname")
@@ -272,48 +368,184 @@ class FormEndpoint(MgrEndpoint):
     class PresetTypeError(TypeError):
         pass
 
-    option_presets = {}
+    class OptionPreset:
+        """
+        Пресет опций с объявленными зависимостями, кэшем и таймаутом
+
+        Кэш хранится в памяти процесса, поэтому полезен только для постоянно
+        работающих процессов (gunicorn и т.п.), а не для запуска через CGI.
+
+        Args:
+            source: Список опций, функция или корутина (form, mgr_request) -> options
+            depends_on: Имена полей, при изменении которых (sv_field) пресет нужно
+                пересчитать. None - пересчитывать при любом изменении, пустой
+                кортеж - только при открытии формы
+            ttl: Время жизни кэша опций в секундах. None - не кэшировать
+            cache_inputs: Имена параметров запроса, от которых зависят опции.
+                Входят в ключ кэша вместе с именем пресета. Также поддерживаются
+                свойства запроса lang, auth_user и auth_level
+            timeout: Таймаут вычисления в секундах. По умолчанию
+                FormEndpoint.option_presets_timeout. При таймауте или ошибке
+                используются опции из кэша, даже устаревшие, если они есть.
+                Синхронная функция без run_in_thread блокирует цикл событий и
+                прервана быть не может, для нее таймаут не задается
+            run_in_thread: Выполнять синхронную функцию в пуле потоков, не блокируя
+                цикл событий. Такие пресеты работают одновременно и видят g запроса,
+                поэтому не должны использовать подключение get_db() запроса: оно не
+                потокобезопасно
+
+        Raises:
+            PresetTypeError: source не список и не функция
+            ValueError: timeout задан для синхронной функции без run_in_thread
+        """
+
+        request_attributes = ("lang", "auth_user", "auth_level")
+        max_cache_entries = 256
+
+        def __init__(
+            self,
+            source: Any,
+            *,
+            depends_on: Optional[Iterable[str]] = None,
+            ttl: Optional[float] = None,
+            cache_inputs: Iterable[str] = (),
+            timeout: Optional[float] = None,
+            run_in_thread: bool = False,
+        ) -> None:
+            if not (callable(source) or isinstance(source, list)):
+                raise FormEndpoint.PresetTypeError()
+            if timeout is not None and not run_in_thread and self._is_sync(source):
+                raise ValueError("timeout of a sync option preset requires run_in_thread=True")
+
+            self.source = source
+            self.depends_on = None if depends_on is None else frozenset(depends_on)
+            self.ttl = ttl
+            self.cache_inputs = tuple(cache_inputs)
+            self.timeout = timeout
+            self.run_in_thread = run_in_thread
+            self._cache: Dict[Tuple[Any, ...], Tuple[float, List[Any]]] = {}
+
+        @staticmethod
+        def _is_sync(source: Any) -> bool:
+            return callable(source) and not asyncio.iscoroutinefunction(source)
+
+        def is_affected_by(self, field_name: Optional[str]) -> bool:
+            return self.depends_on is None or field_name in self.depends_on
+
+        def _get_cache_key(self, mgr_request: MgrRequest) -> Tuple[Any, ...]:
+            key = []
+            for name in self.cache_inputs:
+                if name in self.__class__.request_attributes:
+                    key.append(getattr(mgr_request, name))
+                else:
+                    key.append(mgr_request.params.get(name))
+            return tuple(key)
+
+        def _store(self, key: Tuple[Any, ...], ttl: float, options: List[Any]) -> None:
+            if key not in self._cache and len(self._cache) >= self.__class__.max_cache_entries:
+                # drop the oldest entry
+                del self._cache[next(iter(self._cache))]
+            self._cache[key] = (time.monotonic() + ttl, options)
+
+        async def _compute(self, form: MgrForm, mgr_request: MgrRequest) -> Any:
+            source = self.source
+            if asyncio.iscoroutinefunction(source):
+                return await source(form, mgr_request)
+            if callable(source):
+                if self.run_in_thread:
+                    return await _run_in_thread(source, form, mgr_request)
+                return source(form, mgr_request)
+            return source
+
+        async def load(
+            self, name: str, form: MgrForm, mgr_request: MgrRequest, timeout: float
+        ) -> Any:
+            key = None
+            if self.ttl is not None:
+                key = self._get_cache_key(mgr_request)
+                cached = self._cache.get(key)
+                if cached is not None and cached[0] > time.monotonic():
+                    return cached[1]
+
+            if self.timeout is not None:
+                timeout = self.timeout
+            try:
+                options = await asyncio.wait_for(self._compute(form, mgr_request), timeout=timeout)
+            except Exception as e:
+                if key is not None and key in self._cache:
+                    LOGGER.warning(f"Option preset {name} failed, using cached options: {e!r}")
+                    return self._cache[key][1]
+                raise
+
+            if key is not None and self.ttl is not None:
+                self._store(key, self.ttl, options)
+
+            return options
+
+    option_presets: Dict[str, Any] = {}
+
+    # default timeout for a single preset, seconds
+    option_presets_timeout = 30
+
+    # on setvalues recompute only presets affected by sv_field and emit only changed data
+    incremental_setvalues = False
 
     @classmethod
-    async def _apply_option_presets(cls, form: MgrForm, mgr_request: MgrRequest):
-        field_options = {}
-        tasks = []
+    async def _apply_option_presets(
+        cls, form: MgrForm, mgr_request: MgrRequest, updated_field: Optional[str] = None
+    ) -> None:
+        with profile_phase("presets"):
+            await cls._load_option_presets(form, mgr_request, updated_field=updated_field)
+
+    @classmethod
+    async def _load_option_presets(
+        cls, form: MgrForm, mgr_request: MgrRequest, updated_field: Optional[str] = None
+    ) -> None:
+        tasks: Dict[str, "asyncio.Task[Any]"] = {}
+        field_options: Dict[str, Any] = {}
         for name, preset in cls.option_presets.items():
-            if asyncio.iscoroutinefunction(preset):
-                task = asyncio.create_task(preset(form, mgr_request), name=name)
-                tasks.append(task)
-            elif callable(preset):
-                field_options[name] = preset(form, mgr_request)
+            if isinstance(preset, FormEndpoint.OptionPreset):
+                if updated_field is not None and not preset.is_affected_by(updated_field):
+                    continue
             elif isinstance(preset, list):
                 field_options[name] = preset
+                continue
+            elif FormEndpoint.OptionPreset._is_sync(preset):
+                # plain sync callables keep running in the request thread,
+                # their exceptions are raised as is
+                field_options[name] = preset(form, mgr_request)
+                continue
             else:
-                raise FormEndpoint.PresetTypeError()
+                preset = FormEndpoint.OptionPreset(preset)
 
-        if tasks:
-            # wait until tasks are complete or task raised exception or timeout occured
-            done, pending = await asyncio.wait(
-                tasks, timeout=30, return_when=asyncio.FIRST_EXCEPTION
+            tasks[name] = asyncio.create_task(
+                preset.load(name, form, mgr_request, cls.option_presets_timeout), name=name
             )
 
-            if pending:
-                # cancel unfinished tasks
-                for task in pending:
-                    task.cancel()
+        if tasks:
+            field_options.update(await cls._wait_option_preset_tasks(tasks))
 
-                # if any task raised exception, raise error
-                failed_task = next((t for t in done if t.exception() is not None), None)
-                if failed_task:
-                    raise FormEndpoint.PresetTaskError() from failed_task.exception()
+        for name, options in field_options.items():
+            form.set_options(name, options)
 
-                # raise timeout error, because some tasks left unfinished
-                raise FormEndpoint.PresetTimeoutError()
+    @staticmethod
+    async def _wait_option_preset_tasks(tasks: Dict[str, "asyncio.Task[Any]"]) -> Dict[str, Any]:
+        # every preset is bounded by its own timeout, so wait until all of them are
+        # complete or one of them raised exception
+        done, pending = await asyncio.wait(tasks.values(), return_when=asyncio.FIRST_EXCEPTION)
 
-            # get options from finished tasks
-            for task in done:
-                field_options[task.get_name()] = task.result()
+        # cancel unfinished tasks
+        for task in pending:
+            task.cancel()
 
-        for name, options in field_options.items():
-            form.set_options(name, options)
+        failed_task = next((t for t in done if t.exception() is not None), None)
+        if failed_task:
+            exception = failed_task.exception()
+            if isinstance(exception, asyncio.TimeoutError):
+                raise FormEndpoint.PresetTimeoutError() from exception
+            raise FormEndpoint.PresetTaskError() from exception
+
+        return {name: task.result() for name, task in tasks.items()}
 
     @abstractmethod
     async def get(self, form: MgrForm, mgr_request: MgrRequest):
@@ -389,7 +621,14 @@ class FormEndpoint(MgrEndpoint):
 
         form.updated_field = mgr_request.params.get("sv_field")
 
-        await self.__class__._apply_option_presets(form, mgr_request)
+        if self.__class__.incremental_setvalues:
+            form.track_changes()
+            await self.__class__._apply_option_presets(
+                form, mgr_request, updated_field=form.updated_field
+            )
+        else:
+            await self.__class__._apply_option_presets(form, mgr_request)
+
         return await self.setvalues(form, mgr_request)
 
     async def _handle_new(self, mgr_request):  # has sok=ok
@@ -412,5 +651,6 @@ __all__ = [
     "ListEndpoint",
     "FormEndpoint",
     "CgiFallbackEndpoint",
+    "MetricsEndpoint",
     "MgrFallbackEndpoint",
 ]
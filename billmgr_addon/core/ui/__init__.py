@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 
-from ._list import MgrColumn, MgrList, MgrToolbar, MgrToolButton, MgrToolGroup
+from ._list import MgrColumn, MgrList, MgrListColumns, MgrToolbar, MgrToolButton, MgrToolGroup
 from .form import (
     MgrCheckbox,
     MgrField,
@@ -20,11 +20,23 @@ from .form import (
     MgrTextArea,
     MgrTextData,
 )
+from .formatters import (
+    ColumnFormatter,
+    DateTimeFormatter,
+    EnumMessageFormatter,
+    FormatterChain,
+    LocaleDateTimeFormatter,
+    LocaleMoneyFormatter,
+    MoneyFormatter,
+    SwitchFormatter,
+    ValueFormatter,
+)
 from .ui import MgrError, MgrUI, MgrUnknownNode
 
 __all__ = [
     "MgrColumn",
     "MgrList",
+    "MgrListColumns",
     "MgrToolbar",
     "MgrToolButton",
     "MgrToolGroup",
@@ -48,4 +60,13 @@ __all__ = [
     "MgrError",
     "MgrUI",
     "MgrUnknownNode",
+    "ColumnFormatter",
+    "DateTimeFormatter",
+    "EnumMessageFormatter",
+    "FormatterChain",
+    "LocaleDateTimeFormatter",
+    "LocaleMoneyFormatter",
+    "MoneyFormatter",
+    "SwitchFormatter",
+    "ValueFormatter",
 ]
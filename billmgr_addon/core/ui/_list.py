@@ -1,10 +1,132 @@
 # -*- coding: utf-8 -*-
 
-import xml.etree.ElementTree as ET
-from typing import List, Union
-from xml.etree.ElementTree import Element
+import logging
+import time
+from typing import Any, Dict, List, Optional, Set, Union
 
-from .ui import MgrUI
+from billmgr_addon.utils.logging import LOGGER
+
+from ..xml_backend import ET, XmlElement
+from .formatters import ColumnFormatter, compile_formatters
+from .ui import MgrAttributedNode, MgrUI
+
+# a cell of a key that is absent in the source row dict, no element is written for it
+_MISSING = object()
+
+
+class MgrListColumns:
+    """
+    Колоночное хранилище строк списка
+
+    Хранит по одному списку значений на колонку и количество строк. Заполняется
+    напрямую из кортежей курсора БД или из буферов NumPy/Arrow без создания
+    словаря на каждую строку. Колонки sparse_columns содержат пропуски (ключа
+    не было в строке-словаре), для них не выводится элемент.
+    """
+
+    __slots__ = ("columns", "row_count", "sparse_columns")
+
+    def __init__(
+        self,
+        columns: Optional[Dict[str, List[Any]]] = None,
+        row_count: int = 0,
+        sparse_columns: Optional[Set[str]] = None,
+    ) -> None:
+        self.columns: Dict[str, List[Any]] = {}
+        if columns:
+            self.columns = columns
+
+        self.row_count = row_count
+        self.sparse_columns = sparse_columns or set()
+
+    @staticmethod
+    def _to_list(values: Any) -> List[Any]:
+        if isinstance(values, list):
+            return values
+
+        # NumPy arrays have tolist(), Arrow arrays and chunked arrays have to_pylist()
+        for method_name in ("to_pylist", "tolist"):
+            method = getattr(values, method_name, None)
+            if callable(method):
+                result: List[Any] = method()
+                return result
+
+        return list(values)
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, object]) -> "MgrListColumns":
+        data = {name: cls._to_list(values) for name, values in columns.items()}
+        lengths = {len(values) for values in data.values()}
+        if len(lengths) > 1:
+            raise ValueError("All columns must have the same length")
+
+        return cls(data, lengths.pop() if lengths else 0)
+
+    @classmethod
+    def from_rows(cls, rows: Any, column_names: List[str]) -> "MgrListColumns":
+        if not isinstance(rows, (list, tuple)):
+            rows = list(rows)
+
+        if not rows:
+            return cls({name: [] for name in column_names}, 0)
+
+        width = len(column_names)
+        for row in rows:
+            if not isinstance(row, (list, tuple)):
+                raise TypeError("Can not name columns. Data row has to be list or tuple")
+            if len(row) != width:
+                raise TypeError(
+                    f"Can not name columns. Data row has {len(row)} values, expected {width}"
+                )
+
+        columns = dict(zip(column_names, map(list, zip(*rows))))
+        return cls(columns, len(rows))
+
+    @classmethod
+    def from_dicts(cls, rows: Any, keys_map: Optional[Dict[str, str]] = None) -> "MgrListColumns":
+        if not isinstance(rows, (list, tuple)):
+            rows = list(rows)
+
+        if not all(isinstance(row, dict) for row in rows):
+            if keys_map is not None:
+                raise TypeError("Can not name columns. Data row has to be dict")
+            raise TypeError("Unknown type of data row. It has to be dict")
+
+        if keys_map is not None:
+            # renamed keys are always written, as in MgrList._remap_dict
+            columns = {name: [row.get(key) for row in rows] for key, name in keys_map.items()}
+            return cls(columns, len(rows))
+
+        # rows may have different keys, columns are the union in order of appearance
+        names = dict.fromkeys(key for row in rows for key in row)
+        columns = {name: [row.get(name, _MISSING) for row in rows] for name in names}
+        sparse_columns = set()
+        if any(len(row) != len(names) for row in rows):
+            sparse_columns = {
+                name for name, column in columns.items() if any(v is _MISSING for v in column)
+            }
+        return cls(columns, len(rows), sparse_columns)
+
+    def apply(self, name: str, formatter: ColumnFormatter) -> None:
+        column = self.columns.get(name)
+        if column is None:
+            return
+        if name not in self.sparse_columns:
+            self.columns[name] = formatter.format_column(column)
+            return
+
+        formatted = iter(formatter.format_column([v for v in column if v is not _MISSING]))
+        self.columns[name] = [v if v is _MISSING else next(formatted) for v in column]
+
+    def to_rows(self) -> List[Dict[str, Any]]:
+        names = list(self.columns)
+        return [
+            {name: value for name, value in zip(names, values) if value is not _MISSING}
+            for values in zip(*self.columns.values())
+        ]
+
+    def __len__(self) -> int:
+        return self.row_count
 
 
 class MgrList(MgrUI):
@@ -17,13 +139,15 @@ class MgrList(MgrUI):
 
         self.columns = {}
         columns_data_element = self.metadata_element.find("coldata")
-        if columns_data_element:
+        if columns_data_element is not None:
             for column_element in list(columns_data_element):
                 name = column_element.get("name")
                 self.columns[name] = MgrColumn.from_element(column_element, mgr_list=self)
 
     def _init_data(self):
         self.data_rows = []
+        self.data_columns: Optional[MgrListColumns] = None
+        self.column_formatters: Dict[str, ColumnFormatter] = {}
 
         self.parent_id = self._get_root_child_element_text("plid")
         self.parent_name = self._get_root_child_element_text("plname")
@@ -55,17 +179,45 @@ class MgrList(MgrUI):
         rows: list,
         parent_list_id=None,
         column_names: Union[dict, list, None] = None,
-        formatters: dict = None,
-    ):
+        formatters: Optional[Dict[str, Any]] = None,
+        *,
+        columnar: bool = False,
+    ) -> None:
+        """
+        Установить строки списка
+
+        Args:
+            rows: Строки - словари, либо списки/кортежи (например, из курсора БД) при
+                заданном списке column_names
+            parent_list_id: Не используется
+            column_names: Список имен колонок для строк-последовательностей или словарь
+                {ключ в строке: имя колонки} для переименования ключей строк-словарей
+            formatters: Словарь {имя колонки: форматтер} (см. compile_formatters).
+                Дополняет форматтеры из column_formatters
+            columnar: Хранить строки в колоночном виде (MgrListColumns) без создания
+                словаря на каждую строку
+        """
         self.data_rows = []
+        self.data_columns = None
         new_rows = []
+        formatters = self._get_formatters(formatters)
+
+        if columnar:
+            if isinstance(column_names, list):
+                data_columns = MgrListColumns.from_rows(rows, column_names)
+            else:
+                data_columns = MgrListColumns.from_dicts(rows, keys_map=column_names)
+
+            self.data_columns = data_columns
+            self._apply_formatters(formatters)
+            return
 
         if isinstance(column_names, list):
             for row in rows:
-                if isinstance(row, list):
+                if isinstance(row, (list, tuple)):
                     new_rows.append(dict(zip(column_names, row)))
                 else:
-                    raise TypeError("Can not name columns. Data row has to be list")
+                    raise TypeError("Can not name columns. Data row has to be list or tuple")
         elif isinstance(column_names, dict):
             for row in rows:
                 if isinstance(row, dict):
@@ -79,7 +231,60 @@ class MgrList(MgrUI):
                 else:
                     raise TypeError("Unknown type of data row. It has to be dict")
 
+            if formatters:
+                # formatted values are written back, copy only the caller's dicts that change
+                names = formatters.keys()
+                new_rows = [row if names.isdisjoint(row) else {**row} for row in new_rows]
+
         self.data_rows = new_rows
+        self._apply_formatters(formatters)
+
+    def set_data_columns(
+        self, columns: Dict[str, object], formatters: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Установить строки списка из колонок
+
+        Args:
+            columns: Словарь {имя колонки: значения}. Значения - list, tuple,
+                массив NumPy, массив Arrow или любой итерируемый объект
+            formatters: Словарь {имя колонки: форматтер} (см. compile_formatters).
+                Дополняет форматтеры из column_formatters
+        """
+        self.data_rows = []
+        self.data_columns = MgrListColumns.from_columns(columns)
+        self._apply_formatters(self._get_formatters(formatters))
+
+    def _get_formatters(self, formatters: Optional[Dict[str, Any]]) -> Dict[str, ColumnFormatter]:
+        if not formatters:
+            return self.column_formatters
+
+        return {**self.column_formatters, **compile_formatters(formatters)}
+
+    def _format_rows_column(self, name: str, formatter: ColumnFormatter) -> None:
+        column_rows = [row for row in self.data_rows if name in row]
+        values = formatter.format_column([row[name] for row in column_rows])
+        for row, value in zip(column_rows, values):
+            row[name] = value
+
+    def _apply_formatters(self, formatters: Dict[str, ColumnFormatter]) -> None:
+        if not formatters:
+            return
+
+        is_debug = LOGGER.isEnabledFor(logging.DEBUG)
+        timings = []
+        for name, formatter in formatters.items():
+            started_at = time.perf_counter() if is_debug else 0.0
+            if self.data_columns is not None:
+                self.data_columns.apply(name, formatter)
+            else:
+                self._format_rows_column(name, formatter)
+
+            if is_debug:
+                timings.append(f"{name}={(time.perf_counter() - started_at) * 1000:.2f}ms")
+
+        if is_debug:
+            LOGGER.debug(f"MgrList {self.action_name} column formatting: {', '.join(timings)}")
 
     def set_parent_id_from_request(self, mgr_request):
         """Установить parent_id из параметров запроса"""
@@ -95,12 +300,15 @@ class MgrList(MgrUI):
         for name, message in self.messages.items():
             ET.SubElement(self.messages_element, "msg", attrib={"name": name}).text = str(message)
 
-        for row in self.data_rows:
-            row_element = Element("elem")
-            for name, value in row.items():
-                ET.SubElement(row_element, name).text = str(value)
+        if self.data_columns is not None:
+            self._append_column_rows(self.data_columns)
+        else:
+            for row in self.data_rows:
+                row_element = ET.Element("elem")
+                for name, value in row.items():
+                    ET.SubElement(row_element, name).text = str(value)
 
-            self.root.append(row_element)
+                self.root.append(row_element)
 
         if self.parent_id is not None:
             ET.SubElement(self.root, "plid").text = str(self.parent_id)
@@ -126,6 +334,15 @@ class MgrList(MgrUI):
         if self.sort_order is not None:
             ET.SubElement(self.root, "p_order").text = str(self.sort_order)
 
+    def _append_column_rows(self, data_columns: MgrListColumns) -> None:
+        names = list(data_columns.columns)
+        for values in zip(*data_columns.columns.values()):
+            row_element = ET.SubElement(self.root, "elem")
+            for name, value in zip(names, values):
+                if value is not _MISSING:
+                    ET.SubElement(row_element, name).text = str(value)
+
+
 class MgrToolbar:
     def __init__(
         self, mgr_list: MgrList = None, groups: dict = None, attributes: dict = None
@@ -137,7 +354,9 @@ class MgrToolbar:
             self.attributes = {**attributes}
 
     @classmethod
-    def from_element(cls, toolbar_element: Element, mgr_list: MgrList = None):
+    def from_element(
+        cls, toolbar_element: XmlElement, mgr_list: Optional[MgrList] = None
+    ) -> "MgrToolbar":
         group_elements = list(toolbar_element)
         groups = {
             el.attrib["name"]: MgrToolGroup.from_element(el, mgr_list=mgr_list)
@@ -148,7 +367,7 @@ class MgrToolbar:
 
     def to_xml(self):
         attributes = {**self.attributes}
-        toolbar_element = Element("toolbar", attrib=attributes)
+        toolbar_element = ET.Element("toolbar", attrib=attributes)
         for name, group in self.groups.items():
             toolbar_element.append(group.to_xml())
         return toolbar_element
@@ -170,7 +389,9 @@ class MgrToolGroup:
             self.attributes = {**attributes}
 
     @classmethod
-    def from_element(cls, group_element: Element, mgr_list: MgrList = None):
+    def from_element(
+        cls, group_element: XmlElement, mgr_list: Optional[MgrList] = None
+    ) -> "MgrToolGroup":
         name = group_element.get("name")
         button_elements = list(group_element)
 
@@ -185,15 +406,19 @@ class MgrToolGroup:
     def to_xml(self):
         attributes = {**self.attributes}
         attributes["name"] = self.name
-        group_element = Element("toolgrp", attrib=attributes)
+        group_element = ET.Element("toolgrp", attrib=attributes)
         for name, button in self.buttons.items():
             group_element.append(button.to_xml())
         return group_element
 
 
 # <toolbtn>
-class MgrToolButton:
+class MgrToolButton(MgrAttributedNode):
+    __slots__ = ("name", "type", "list", "conditions")
+
     class VisibilityCondition:
+        __slots__ = ("list", "condition_type", "column_name", "value")
+
         def __init__(
             self, condition_type: str, column_name: str, value: str, mgr_list: MgrList = None
         ):
@@ -208,16 +433,20 @@ class MgrToolButton:
             self.value = value
 
         @classmethod
-        def from_element(cls, field_element: Element, mgr_list: MgrList = None):
+        def from_element(
+            cls, field_element: XmlElement, mgr_list: Optional[MgrList] = None
+        ) -> "MgrToolButton.VisibilityCondition":
             condition_type = field_element.tag
             column_name = field_element.get("name")
             value = field_element.get("value")
             return cls(condition_type, column_name, value, mgr_list=mgr_list)
 
         def to_xml(self):
-            attributes = {"name": self.column_name, "value": self.value}
+            attributes = {"name": self.column_name}
+            if self.value is not None:
+                attributes["value"] = self.value
 
-            return Element(self.condition_type, attrib=attributes)
+            return ET.Element(self.condition_type, attrib=attributes)
 
     def __init__(
         self,
@@ -230,16 +459,16 @@ class MgrToolButton:
         self.name = name
         self.type = button_type
         self.list = mgr_list
-        self.attributes = {}
-        if attributes:
-            self.attributes = {**attributes}
+        self._init_attributes(attributes)
 
         self.conditions = []
         if conditions is not None:
             self.conditions = conditions
 
     @classmethod
-    def from_element(cls, button_element: Element, mgr_list: MgrList = None):
+    def from_element(
+        cls, button_element: XmlElement, mgr_list: Optional[MgrList] = None
+    ) -> "MgrToolButton":
         name = button_element.get("name")
         button_type = button_element.get("type")
 
@@ -259,10 +488,10 @@ class MgrToolButton:
         return instance
 
     def to_xml(self):
-        attributes = {**self.attributes}
-        attributes["name"] = self.name
-        attributes["type"] = self.type
-        button_element = Element("toolbtn", attrib=attributes)
+        # the same attribute order with both XML backends
+        button_element = ET.Element(
+            "toolbtn", attrib={**self._attributes, "name": self.name, "type": self.type}
+        )
         for condition in self.conditions:
             condition_element = condition.to_xml()
             button_element.append(condition_element)
@@ -271,7 +500,9 @@ class MgrToolButton:
 
 
 # <col>
-class MgrColumn:
+class MgrColumn(MgrAttributedNode):
+    __slots__ = ("name", "type", "list", "is_hidden")
+
     def __init__(
         self,
         name,
@@ -284,12 +515,12 @@ class MgrColumn:
         self.type = column_type
         self.list = mgr_list
         self.is_hidden = is_hidden
-        self.attributes = {}
-        if attributes:
-            self.attributes = {**attributes}
+        self._init_attributes(attributes)
 
     @classmethod
-    def from_element(cls, column_element: Element, mgr_list: MgrList = None):
+    def from_element(
+        cls, column_element: XmlElement, mgr_list: Optional[MgrList] = None
+    ) -> "MgrColumn":
         name = column_element.get("name")
         column_type = column_element.get("type")
         is_hidden = column_element.get("hidden") == "yes"
@@ -303,8 +534,12 @@ class MgrColumn:
         return instance
 
     def to_xml(self):
-        attributes = {**self.attributes}
-        attributes["name"] = self.name
-        attributes["type"] = self.type
-        attributes["hidden"] = "yes" if self.is_hidden else "no"
-        return Element("col", attrib=attributes)
+        return ET.Element(
+            "col",
+            attrib={
+                **self._attributes,
+                "name": self.name,
+                "type": self.type,
+                "hidden": "yes" if self.is_hidden else "no",
+            },
+        )
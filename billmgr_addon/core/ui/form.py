@@ -1,16 +1,15 @@
 # -*- coding: utf-8 -*-
 
 import re
-import xml.etree.ElementTree as ET
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from decimal import Decimal
 from enum import Enum
-from typing import List, NamedTuple, Optional, Union
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Type, Union
 from uuid import UUID
-from xml.etree.ElementTree import Element
 
-from .ui import MgrUI, MgrUnknownNode
+from ..xml_backend import ET, XmlElement
+from .ui import MgrAttributedNode, MgrUI, MgrUnknownNode
 
 
 class UuidOptionValueError(ValueError):
@@ -47,7 +46,7 @@ class MgrForm(MgrUI):
                 el.attrib["name"]: MgrFormPage.from_element(el, form=self) for el in page_elements
             }
         else:
-            hidden_page_element = Element("page")
+            hidden_page_element = ET.Element("page")
             form_group_elements = list(form_element)
             for form_group_element in form_group_elements:
                 hidden_page_element.append(form_group_element)
@@ -68,6 +67,9 @@ class MgrForm(MgrUI):
         self.parent_name = None
         self.updated_field = None
 
+        self._initial_field_data: Optional[Dict[str, Any]] = None
+        self._updated_options: Optional[Set[str]] = None
+
         for element in self.root:
             if element.tag == "slist":
                 list_name = element.get("name")
@@ -104,6 +106,36 @@ class MgrForm(MgrUI):
     def set_data(self, data: dict):
         self.field_data = {**data}
 
+    def track_changes(self) -> None:
+        """
+        Выводить в patch_xml только измененные данные
+
+        После вызова в документ попадают только значения, отличающиеся от текущих,
+        и списки опций, установленные через set_options. Используется для setvalues,
+        когда панель обновляет только пришедшие поля.
+        """
+        self._initial_field_data = {**self.field_data}
+        self._updated_options = set()
+
+    @property
+    def is_tracking_changes(self) -> bool:
+        return self._initial_field_data is not None
+
+    def is_value_changed(self, name: str) -> bool:
+        initial_field_data = self._initial_field_data
+        if initial_field_data is None:
+            return True
+
+        return name not in initial_field_data or (
+            initial_field_data[name] != self.field_data.get(name)
+        )
+
+    def is_options_changed(self, name: str) -> bool:
+        if self._updated_options is None:
+            return True
+
+        return name in self._updated_options
+
     def set_data_value(self, name, value):
         self.field_data[name] = value
 
@@ -137,6 +169,9 @@ class MgrForm(MgrUI):
     def set_options(
         self, name: str, options: list, key_name="key", label_name="label", keys_as_labels=False
     ):
+        if self._updated_options is not None:
+            self._updated_options.add(name)
+
         self.field_options[name] = []
         for option in options:
             NO_ORIGINAL_VALUE = object()
@@ -234,6 +269,9 @@ class MgrForm(MgrUI):
             ET.SubElement(self.messages_element, "msg", attrib={"name": name}).text = str(message)
 
         for name, value in self.field_data.items():
+            if not self.is_value_changed(name):
+                continue
+
             if isinstance(value, list):
                 list_element = ET.SubElement(self.root, "list", attrib={"name": name})
                 for data_row in value:
@@ -249,15 +287,18 @@ class MgrForm(MgrUI):
                 ET.SubElement(self.root, name).text = str(value)
 
         for key, options in self.field_options.items():
+            if not self.is_options_changed(key):
+                continue
+
             list_element = ET.SubElement(self.root, "slist", attrib={"name": key})
             for option in options:
                 option_key = option["key"]
                 option_element = None
                 if "label" in option:
-                    option_element = Element("val", attrib={"key": option_key})
+                    option_element = ET.Element("val", attrib={"key": option_key})
                     option_element.text = str(option["label"])
                 else:
-                    option_element = Element("msg")
+                    option_element = ET.Element("msg")
                     option_element.text = option_key
 
                 list_element.append(option_element)
@@ -331,7 +372,9 @@ class MgrFormPage:
             self.attributes = {**attributes}
 
     @classmethod
-    def from_element(cls, page_element: Element, form: MgrForm = None):
+    def from_element(
+        cls, page_element: XmlElement, form: Optional[MgrForm] = None
+    ) -> "MgrFormPage":
         name = page_element.get("name")
         form_group_elements = list(page_element)
         form_groups = {
@@ -343,8 +386,9 @@ class MgrFormPage:
 
     def to_xml(self):
         attributes = {**self.attributes}
-        attributes["name"] = self.name
-        page_element = Element("page", attrib=attributes)
+        if self.name is not None:
+            attributes["name"] = self.name
+        page_element = ET.Element("page", attrib=attributes)
         for name, form_group in self.form_groups.items():
             page_element.append(form_group.to_xml())
         return page_element
@@ -384,7 +428,9 @@ class MgrFormGroup:
             self.attributes = {**attributes}
 
     @classmethod
-    def from_element(cls, form_group_element: Element, form: MgrForm = None):
+    def from_element(
+        cls, form_group_element: XmlElement, form: Optional[MgrForm] = None
+    ) -> "MgrFormGroup":
         name = form_group_element.get("name")
         field_elements = list(form_group_element)
         # form_groups = {el['name']:MgrFormGroup.from_element(el, form=form) for el in field_elements}
@@ -400,38 +446,22 @@ class MgrFormGroup:
         return instance
 
     @classmethod
-    def get_form_field_from_element(cls, field_element: Element, form: MgrForm = None):
-        field = None
-        if field_element.tag == "list":
-            field = MgrListData.from_element(field_element, form=form)
-        elif field_element.tag == "textdata":
-            field = MgrTextData.from_element(field_element, form=form)
-        elif field_element.tag == "textarea":
-            field = MgrTextArea.from_element(field_element, form=form)
-        elif field_element.tag == "select":
-            field = MgrSelect.from_element(field_element, form=form)
-        elif field_element.tag == "slider":
-            field = MgrSlider.from_element(field_element, form=form)
-        elif field_element.tag == "input":
-            input_type = field_element.get("type")
-            if input_type == "text":
-                field = MgrText.from_element(field_element, form=form)
-            elif input_type == "checkbox":
-                field = MgrCheckbox.from_element(field_element, form=form)
-            elif input_type == "password":
-                field = MgrPassword.from_element(field_element, form=form)
-            elif input_type == "hidden":
-                field = MgrHidden.from_element(field_element, form=form)
-
-        elif field_element.tag == "button":
-            field = MgrFormButton.from_element(field_element, form=form)
+    def get_form_field_from_element(
+        cls, field_element: XmlElement, form: Optional[MgrForm] = None
+    ) -> Optional["MgrField"]:
+        if field_element.tag == "input":
+            field_class = _INPUT_FIELD_CLASSES.get(field_element.get("type"))
+        else:
+            field_class = _FIELD_CLASSES.get(field_element.tag)
 
-        return field
+        if field_class is None:
+            return None
+        return field_class.from_element(field_element, form=form)
 
     def to_xml(self):
         attributes = {**self.attributes}
         attributes["name"] = self.name
-        form_group_element = Element(self.__class__.element_name, attrib=attributes)
+        form_group_element = ET.Element(self.__class__.element_name, attrib=attributes)
         for name, field in self.fields.items():
             form_group_element.append(field.to_xml())
         return form_group_element
@@ -450,7 +480,9 @@ class MgrFormButtonsGroup(MgrFormGroup):
     element_name = "buttons"
 
     @classmethod
-    def get_form_field_from_element(cls, field_element: Element, form: MgrForm = None):
+    def get_form_field_from_element(
+        cls, field_element: XmlElement, form: Optional[MgrForm] = None
+    ) -> Optional["MgrField"]:
         field = None
         if field_element.tag == "button":
             field = MgrFormButton.from_element(field_element, form=form)
@@ -471,28 +503,28 @@ class MgrFormButtonsGroup(MgrFormGroup):
 
 
 # <input>, <select>, etc
-class MgrField:
+class MgrField(MgrAttributedNode):
+    __slots__ = ("form",)
+
     def __init__(self, name, form: MgrForm = None, attributes: dict = None) -> None:
         self.form = form
-        self.attributes = {}
-        if attributes:
-            self.attributes = {**attributes}
+        self._init_attributes(attributes)
 
         self.name = name
 
     @classmethod
-    def from_element(cls, field_element: Element, form: MgrForm = None):
+    def from_element(cls, field_element: XmlElement, form: Optional[MgrForm] = None) -> "MgrField":
         name = field_element.get("name")
         instance = cls(name, form=form, attributes=field_element.attrib)
         return instance
 
     @property
     def name(self):
-        return self.attributes.get("name")
+        return self._attributes.get("name")
 
     @name.setter
     def name(self, value: str):
-        self.attributes["name"] = value
+        self.set_attribute("name", value)
 
     def get_label(self) -> str:
         return self.form.get_message(self.name)
@@ -513,28 +545,36 @@ class MgrField:
 
 # <button>
 class MgrFormButton(MgrField):
+    __slots__ = ("button_type",)
+
     def __init__(self, button_type, name, form: MgrForm = None, attributes: dict = None):
         super().__init__(name, form=form, attributes=attributes)
         self.button_type = button_type
 
     @classmethod
-    def from_element(cls, button_element: Element, form: MgrForm = None):
+    def from_element(
+        cls, button_element: XmlElement, form: Optional[MgrForm] = None
+    ) -> "MgrFormButton":
         button_type = button_element.get("type")
         name = button_element.get("name")
         instance = cls(button_type, name, form=form, attributes=button_element.attrib)
         return instance
 
     def to_xml(self):
-        attributes = {**self.attributes}
-        attributes["name"] = self.name
-        attributes["type"] = self.button_type
-        return Element("button", attrib=attributes)
+        # the same attribute order with both XML backends
+        return ET.Element(
+            "button", attrib={**self._attributes, "name": self.name, "type": self.button_type}
+        )
 
 
 class MgrInputField(MgrField):
+    __slots__ = ("conditions",)
+
     input_type = "input"
 
     class Condition:
+        __slots__ = ("form", "condition_type", "value", "hide_field", "shadow", "empty")
+
         def __init__(
             self,
             condition_type: str,
@@ -556,7 +596,9 @@ class MgrInputField(MgrField):
             self.empty = empty
 
         @classmethod
-        def from_element(cls, field_element: Element, form: MgrForm = None):
+        def from_element(
+            cls, field_element: XmlElement, form: Optional[MgrForm] = None
+        ) -> "MgrInputField.Condition":
             condition_type = field_element.tag
             value = field_element.get("value")
             hide_field = field_element.get("hide")
@@ -580,9 +622,9 @@ class MgrInputField(MgrField):
             if self.shadow:
                 attributes["shadow"] = "yes"
             if self.empty:
-                attributes["empty"] = None
+                attributes["empty"] = "yes"
 
-            return Element(self.condition_type, attrib=attributes)
+            return ET.Element(self.condition_type, attrib=attributes)
 
     def __init__(
         self,
@@ -603,7 +645,9 @@ class MgrInputField(MgrField):
             self.conditions = conditions
 
     @classmethod
-    def from_element(cls, field_element: Element, form: MgrForm = None):
+    def from_element(
+        cls, field_element: XmlElement, form: Optional[MgrForm] = None
+    ) -> "MgrInputField":
         name = field_element.get("name")
         is_required = field_element.get("required") == "yes"
 
@@ -624,15 +668,14 @@ class MgrInputField(MgrField):
 
     @property
     def is_required(self):
-        return self.attributes.get("required") == "yes"
+        return self._attributes.get("required") == "yes"
 
     @is_required.setter
     def is_required(self, value: bool):
-        self.attributes["required"] = "yes" if value else "no"
+        self.set_attribute("required", "yes" if value else "no")
 
     def to_xml(self):
-        attributes = {**self.attributes}
-        field_element = Element(self.__class__.input_type, attrib=attributes)
+        field_element = ET.Element(self.__class__.input_type, self._attributes)
         for condition in self.conditions:
             condition_element = condition.to_xml()
             field_element.append(condition_element)
@@ -641,41 +684,48 @@ class MgrInputField(MgrField):
 
 
 class MgrOutputField(MgrField):
-    pass
+    __slots__ = ()
 
 
 class MgrText(MgrInputField):
-    pass
+    __slots__ = ()
 
 
 class MgrCheckbox(MgrInputField):
-    pass
+    __slots__ = ()
 
 
 class MgrPassword(MgrInputField):
-    pass
+    __slots__ = ()
 
 
 class MgrHidden(MgrInputField):
-    pass
+    __slots__ = ()
 
 
 class MgrSelect(MgrInputField):
+    __slots__ = ()
+
     input_type = "select"
 
 
 class MgrSlider(MgrInputField):
+    __slots__ = ()
+
     input_type = "slider"
 
 
 class MgrTextArea(MgrInputField):
+    __slots__ = ()
+
     input_type = "textarea"
 
 
 class MgrTextData(MgrOutputField):
+    __slots__ = ()
+
     def to_xml(self):
-        attributes = {**self.attributes}
-        return Element("textdata", attrib=attributes)
+        return ET.Element("textdata", self._attributes)
 
 
 class ColumnTypes(str, Enum):
@@ -708,6 +758,8 @@ class TextSizes(str, Enum):
 
 
 class MgrListData(MgrOutputField):
+    __slots__ = ("columns",)
+
     class Style(NamedTuple):
         align: ColumnAlignTypes = None
         width: str = None
@@ -716,11 +768,11 @@ class MgrListData(MgrOutputField):
         size: TextSizes = None
         color: str = None
 
-    class StylableNode:
+    class StylableNode(MgrAttributedNode):
+        __slots__ = ()
+
         def __init__(self, style: "MgrListData.Style" = None, attributes: dict = None):
-            self.attributes = {}
-            if attributes:
-                self.attributes = {**attributes}
+            self._init_attributes(attributes)
 
             if style:
                 # TODO - attrbutes can only be strings!
@@ -763,53 +815,55 @@ class MgrListData(MgrOutputField):
 
         @property
         def align(self):
-            return self.attributes.get("align")
+            return self._attributes.get("align")
 
         @align.setter
         def align(self, value: str):
-            self.attributes["align"] = value
+            self.set_attribute("align", value)
 
         @property
         def width(self):
-            return self.attributes.get("width")
+            return self._attributes.get("width")
 
         @width.setter
         def width(self, value: str):
-            self.attributes["width"] = value
+            self.set_attribute("width", value)
 
         @property
         def height(self):
-            return self.attributes.get("height")
+            return self._attributes.get("height")
 
         @height.setter
         def height(self, value: str):
-            self.attributes["height"] = value
+            self.set_attribute("height", value)
 
         @property
         def weight(self):
-            return self.attributes.get("weight")
+            return self._attributes.get("weight")
 
         @weight.setter
         def weight(self, value):
-            self.attributes["weight"] = value
+            self.set_attribute("weight", value)
 
         @property
         def size(self):
-            return self.attributes.get("size")
+            return self._attributes.get("size")
 
         @size.setter
         def size(self, value: str):
-            self.attributes["size"] = value
+            self.set_attribute("size", value)
 
         @property
         def color(self):
-            return self.attributes.get("color")
+            return self._attributes.get("color")
 
         @color.setter
         def color(self, value: str):
-            self.attributes["color"] = value
+            self.set_attribute("color", value)
 
     class ColumnValue(StylableNode, ABC):
+        __slots__ = ("form", "_name", "_value")
+
         def __init__(
             self,
             name,
@@ -825,12 +879,14 @@ class MgrListData(MgrOutputField):
             self.value = value
 
         @classmethod
-        def from_element(cls, column_value_element: Element, form: MgrForm = None):
+        def from_element(
+            cls, column_value_element: XmlElement, form: Optional[MgrForm] = None
+        ) -> "MgrListData.ColumnValue":
             return cls(column_value_element.tag, column_value_element.text, form=form)
 
         @abstractmethod
         def to_xml(self):
-            column_value_element = Element(self.name)
+            column_value_element = ET.Element(self.name)
             column_value_element.text = self.value
             return column_value_element
 
@@ -851,6 +907,8 @@ class MgrListData(MgrOutputField):
             self._value = value
 
     class PriceValue(ColumnValue):
+        __slots__ = ()
+
         class PriceTuple(NamedTuple):
             cost: Union[Decimal, float, int, str]
             currency: str
@@ -868,9 +926,11 @@ class MgrListData(MgrOutputField):
             super().__init__(name, value, style=style, attributes=attributes, form=form)
 
         @classmethod
-        def from_element(cls, column_value_element: Element, form: MgrForm = None):
+        def from_element(
+            cls, column_value_element: XmlElement, form: Optional[MgrForm] = None
+        ) -> "MgrListData.PriceValue":
             column_name = column_value_element.tag
-            price_element: Element = column_value_element.find("price")
+            price_element: XmlElement = column_value_element.find("price")
             cost, currency = None, None
             for element in list(price_element):
                 if element.tag == "cost":
@@ -880,14 +940,15 @@ class MgrListData(MgrOutputField):
             return cls(column_name, cost, currency, form=form, attributes=price_element.attrib)
 
         def to_xml(self):
-            attributes = {**self.attributes}
-            column_value_element = Element(self.name, attrib=attributes)
+            column_value_element = ET.Element(self.name, self._attributes)
             price_element = ET.SubElement(column_value_element, "price")
             ET.SubElement(price_element, "cost").text = str(self.value.cost)
             ET.SubElement(price_element, "currency").text = self.value.currency
             return column_value_element
 
     class Column(StylableNode, ABC):
+        __slots__ = ("form",)
+
         _type: ColumnTypes = None
 
         def __init__(
@@ -929,62 +990,85 @@ class MgrListData(MgrOutputField):
             self.column_type = self.__class__._type.value
 
         @classmethod
-        def from_element(cls, column_element: Element, form: MgrForm = None):
+        def from_element(
+            cls, column_element: XmlElement, form: Optional[MgrForm] = None
+        ) -> "MgrListData.Column":
             name = column_element.get("name")
             return cls(name, form=form, attributes=column_element.attrib)
 
+        @staticmethod
         @abstractmethod
-        def get_value_from_element(column_value_element: Element) -> "MgrListData.ColumnValue":
+        def get_value_from_element(
+            column_value_element: XmlElement,
+        ) -> Union["MgrListData.ColumnValue", str, None]:
             return MgrListData.ColumnValue.from_element(column_value_element)
 
         @property
         def name(self):
-            return self.attributes.get("name")
+            return self._attributes.get("name")
 
         @name.setter
         def name(self, value: str):
-            self.attributes["name"] = value
+            self.set_attribute("name", value)
 
         @property
         def column_type(self):
-            return self.attributes.get("type")
+            return self._attributes.get("type")
 
         @column_type.setter
         def column_type(self, value: str):
-            self.attributes["type"] = value
+            self.set_attribute("type", value)
 
         def to_xml(self):
-            attributes = {**self.attributes}
-            return Element("col", attrib=attributes)
+            return ET.Element("col", self._attributes)
 
     class DataColumn(Column):
+        __slots__ = ()
+
         _type: ColumnTypes = ColumnTypes.DATA
 
-        def get_value_from_element(column_value_element) -> str:
-            return super().get_value_from_element(column_value_element).value
+        @staticmethod
+        def get_value_from_element(column_value_element: XmlElement) -> Optional[str]:
+            text: Optional[str] = column_value_element.text
+            return text
 
     class MessageColumn(Column):
+        __slots__ = ()
+
         _type: ColumnTypes = ColumnTypes.MESSAGE
 
-        def get_value_from_element(column_value_element) -> str:
-            return super().get_value_from_element(column_value_element).value
+        @staticmethod
+        def get_value_from_element(column_value_element: XmlElement) -> Optional[str]:
+            text: Optional[str] = column_value_element.text
+            return text
 
     class ImageColumn(Column):
+        __slots__ = ()
+
         _type: ColumnTypes = ColumnTypes.IMAGE
 
-        def get_value_from_element(column_value_element) -> str:
-            return super().get_value_from_element(column_value_element).value
+        @staticmethod
+        def get_value_from_element(column_value_element: XmlElement) -> Optional[str]:
+            text: Optional[str] = column_value_element.text
+            return text
 
     class PriceColumn(Column):
+        __slots__ = ()
+
         _type: ColumnTypes = ColumnTypes.PRICE
 
+        @staticmethod
         def get_value_from_element(column_value_element) -> "MgrListData.PriceValue":
             return MgrListData.PriceValue.from_element(column_value_element)
 
     class ButtonColumn(Column):
+        __slots__ = ()
+
         _type: ColumnTypes = ColumnTypes.BUTTON
 
     class ControlColumn(Column):
+        __slots__ = ()
+
         _type: ColumnTypes = ColumnTypes.CONTROL
 
     def __init__(
@@ -996,7 +1080,9 @@ class MgrListData(MgrOutputField):
             self.columns = columns
 
     @classmethod
-    def create_column_from_element(cls, column_element: Element, form: MgrForm = None) -> Column:
+    def create_column_from_element(
+        cls, column_element: XmlElement, form: Optional[MgrForm] = None
+    ) -> Column:
         column_type = column_element.get("type")
         column_type = ColumnTypes(column_type)
         column = None
@@ -1027,17 +1113,17 @@ class MgrListData(MgrOutputField):
     def get_column(self, name: str) -> Column:
         return self.columns.get(name)
 
-    def to_xml(self) -> Element:
-        attributes = {**self.attributes}
-        list_element = Element("list", attrib=attributes)
+    def to_xml(self) -> XmlElement:
+        list_element = ET.Element("list", self._attributes)
         for name, column in self.columns.items():
-            # column_element = Element("col", attrib={"name": name, **column})
             list_element.append(column.to_xml())
 
         return list_element
 
     @classmethod
-    def from_element(cls, field_element: Element, form: MgrForm = None) -> "MgrListData":
+    def from_element(
+        cls, field_element: XmlElement, form: Optional[MgrForm] = None
+    ) -> "MgrListData":
         list_name = field_element.get("name")
         columns = {}
         column_elements = list(field_element)
@@ -1050,3 +1136,21 @@ class MgrListData(MgrOutputField):
 
         instance = cls(list_name, form=form, columns=columns, attributes=field_element.attrib)
         return instance
+
+
+# <input type="...">
+_INPUT_FIELD_CLASSES: Dict[Optional[str], Type[MgrField]] = {
+    "text": MgrText,
+    "checkbox": MgrCheckbox,
+    "password": MgrPassword,
+    "hidden": MgrHidden,
+}
+
+_FIELD_CLASSES: Dict[str, Type[MgrField]] = {
+    "list": MgrListData,
+    "textdata": MgrTextData,
+    "textarea": MgrTextArea,
+    "select": MgrSelect,
+    "slider": MgrSlider,
+    "button": MgrFormButton,
+}
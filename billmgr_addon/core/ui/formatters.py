@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+
+"""
+Форматтеры колонок списков
+
+Форматтер обрабатывает все значения колонки за один вызов, поэтому настройка
+(квантование, формат даты, таблица сообщений) выполняется один раз на колонку,
+а не на каждую строку.
+"""
+
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from ...fluentbillmgr import get_datetime_format, get_money_format
+
+
+class ColumnFormatter(ABC):
+    @abstractmethod
+    def format_column(self, values: List[Any]) -> List[Any]:
+        raise NotImplementedError
+
+    def __call__(self, values: List[Any]) -> List[Any]:
+        return self.format_column(values)
+
+
+class ValueFormatter(ColumnFormatter):
+    """Применяет функцию форматирования к каждому значению колонки"""
+
+    def __init__(self, func: Callable[[Any], Any]) -> None:
+        self.func = func
+
+    def format_column(self, values: List[Any]) -> List[Any]:
+        return list(map(self.func, values))
+
+
+class FormatterChain(ColumnFormatter):
+    """Последовательно применяет несколько форматтеров к колонке"""
+
+    def __init__(self, formatters: Iterable[ColumnFormatter]) -> None:
+        self.formatters = tuple(formatters)
+
+    def format_column(self, values: List[Any]) -> List[Any]:
+        for formatter in self.formatters:
+            values = formatter.format_column(values)
+        return values
+
+
+class MoneyFormatter(ColumnFormatter):
+    """
+    Decimal -> строка с фиксированным количеством знаков и, опционально, валютой
+
+    Нечисловые строки, NaN и бесконечность возвращаются без изменений.
+    """
+
+    def __init__(
+        self, places: int = 2, currency: Optional[str] = None, rounding: str = ROUND_HALF_UP
+    ) -> None:
+        self.quantum = Decimal(1).scaleb(-places)
+        self.currency = currency
+        self.rounding = rounding
+
+    def format_column(self, values: List[Any]) -> List[Any]:
+        quantum, rounding = self.quantum, self.rounding
+        suffix = f" {self.currency}" if self.currency else ""
+        result: List[Any] = []
+        append = result.append
+        for value in values:
+            if value is None or value == "":
+                append("")
+                continue
+            amount = value
+            if not isinstance(amount, Decimal):
+                try:
+                    amount = Decimal(str(value))
+                except InvalidOperation:
+                    append(value)
+                    continue
+            if not amount.is_finite():
+                append(value)
+                continue
+            append(f"{amount.quantize(quantum, rounding=rounding)}{suffix}")
+        return result
+
+
+class DateTimeFormatter(ColumnFormatter):
+    """datetime/date -> строка по формату strftime. Строки возвращаются без изменений"""
+
+    def __init__(self, datetime_format: str = "%Y-%m-%d %H:%M:%S") -> None:
+        self.datetime_format = datetime_format
+
+    def format_column(self, values: List[Any]) -> List[Any]:
+        datetime_format = self.datetime_format
+        result: List[Any] = []
+        append = result.append
+        for value in values:
+            if value is None:
+                append("")
+            elif isinstance(value, (datetime, date)):
+                append(value.strftime(datetime_format))
+            else:
+                append(value)
+        return result
+
+
+class LocaleMoneyFormatter(ColumnFormatter):
+    """
+    Decimal -> денежная сумма по правилам локали, как MoneyTransformer в сообщениях
+
+    Args:
+        locale: Локаль, обычно mgr_request.lang
+        currency: Код валюты ISO 4217
+        **options: Опции MoneyTransformer (currency_display, use_grouping, ...)
+    """
+
+    def __init__(self, locale: str, currency: str, **options: Any) -> None:
+        self.money_format = get_money_format(locale, currency, **options)
+
+    def format_column(self, values: List[Any]) -> List[Any]:
+        return self.money_format.format_many(values)
+
+
+class LocaleDateTimeFormatter(ColumnFormatter):
+    """
+    date/datetime -> строка по правилам локали, как DateTimeTransformer в сообщениях
+
+    Args:
+        locale: Локаль, обычно mgr_request.lang
+        date_style: Стиль даты (short, medium, long, full)
+        time_style: Стиль времени, None - без времени
+        time_zone: Часовой пояс для отображения, например "Europe/Moscow"
+    """
+
+    def __init__(
+        self,
+        locale: str,
+        date_style: Optional[str] = None,
+        time_style: Optional[str] = None,
+        time_zone: Optional[str] = None,
+    ) -> None:
+        self.datetime_format = get_datetime_format(locale, date_style, time_style, time_zone)
+
+    def format_column(self, values: List[Any]) -> List[Any]:
+        return self.datetime_format.format_many(values)
+
+
+class EnumMessageFormatter(ColumnFormatter):
+    """
+    Значение перечисления -> имя сообщения для колонок типа msg
+
+    Args:
+        prefix: Префикс имени сообщения, например "status_"
+        messages: Явное соответствие {значение: имя сообщения}
+    """
+
+    cache_size = 1024
+
+    def __init__(self, prefix: str = "", messages: Optional[Dict[Any, str]] = None) -> None:
+        self.prefix = prefix
+        self.messages = messages or {}
+        # True, 1 and 1.0 are equal dict keys, the type keeps them apart
+        self._typed_messages = {(type(key), key): name for key, name in self.messages.items()}
+        self._cache: Dict[Tuple[type, Any], str] = {}
+
+    def _get_message_key(self, value: Any) -> str:
+        try:
+            message_key = self._typed_messages.get((type(value), value))
+        except TypeError:
+            # unhashable values can't be in messages
+            message_key = None
+        if message_key is not None:
+            return message_key
+        if isinstance(value, Enum):
+            value = value.value
+        return f"{self.prefix}{value}"
+
+    def format_column(self, values: List[Any]) -> List[Any]:
+        cache = self._cache
+        if len(cache) > self.cache_size:
+            cache.clear()
+
+        result: List[Any] = []
+        append = result.append
+        for value in values:
+            # the type is a part of the key: True, 1 and 1.0 are equal but format differently
+            key = (type(value), value)
+            try:
+                message_key = cache.get(key)
+            except TypeError:
+                # unhashable values are not cached
+                append(self._get_message_key(value))
+                continue
+            if message_key is None:
+                message_key = cache[key] = self._get_message_key(value)
+            append(message_key)
+        return result
+
+
+class SwitchFormatter(ColumnFormatter):
+    """bool -> "on"/"off" """
+
+    false_values = (None, False, 0, "", "off", "no", "0")
+
+    def __init__(self, on: str = "on", off: str = "off") -> None:
+        self.on = on
+        self.off = off
+
+    def format_column(self, values: List[Any]) -> List[Any]:
+        on, off, false_values = self.on, self.off, self.false_values
+        return [off if value in false_values else on for value in values]
+
+
+FormatterSpec = Union[ColumnFormatter, Callable[[Any], Any], List[Any], Tuple[Any, ...]]
+
+
+def compile_formatter(formatter: FormatterSpec) -> ColumnFormatter:
+    if isinstance(formatter, ColumnFormatter):
+        return formatter
+    if isinstance(formatter, (list, tuple)):
+        return FormatterChain(compile_formatter(item) for item in formatter)
+    if callable(formatter):
+        return ValueFormatter(formatter)
+
+    raise TypeError(f"Unknown column formatter type '{type(formatter).__name__}'")
+
+
+def compile_formatters(
+    formatters: Optional[Dict[str, FormatterSpec]],
+) -> Dict[str, ColumnFormatter]:
+    """
+    Собрать словарь форматтеров колонок
+
+    Args:
+        formatters: Словарь {имя колонки: форматтер}. Форматтер - экземпляр
+            ColumnFormatter, функция форматирования одного значения или список
+            таких элементов, применяемых по порядку
+
+    Returns:
+        Словарь {имя колонки: ColumnFormatter}
+    """
+    if not formatters:
+        return {}
+
+    return {name: compile_formatter(formatter) for name, formatter in formatters.items()}
+
+
+__all__ = [
+    "ColumnFormatter",
+    "ValueFormatter",
+    "FormatterChain",
+    "MoneyFormatter",
+    "DateTimeFormatter",
+    "LocaleMoneyFormatter",
+    "LocaleDateTimeFormatter",
+    "EnumMessageFormatter",
+    "SwitchFormatter",
+    "compile_formatter",
+    "compile_formatters",
+]
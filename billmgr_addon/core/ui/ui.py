@@ -1,12 +1,15 @@
 # -*- coding: utf-8 -*-
 
-import xml.etree.ElementTree as ET
 from abc import ABC, abstractmethod
-from xml.etree.ElementTree import Element
+from typing import Any, Dict, Mapping, Optional, Type, TypeVar
 
 from billmgr_addon.utils.logging import LOGGER
+from billmgr_addon.utils.profiling import profile_phase
 
 from ..request_types import MgrRequest
+from ..xml_backend import ET, XmlElement
+
+_MgrUIType = TypeVar("_MgrUIType", bound="MgrUI")
 
 
 class MgrError(Exception):
@@ -20,7 +23,7 @@ class MgrNode(ABC):
     def __init__(self, name=None, level=8) -> None:
         self.name = name
         self.level = level
-        self.xml_element: Element = None
+        self.xml_element: XmlElement = None
 
     @property
     def level(self):
@@ -32,12 +35,12 @@ class MgrNode(ABC):
         self._level = value
 
     @abstractmethod
-    def to_xml_element(self) -> Element:
+    def to_xml_element(self) -> XmlElement:
         raise NotImplementedError
 
     @classmethod
     @abstractmethod
-    def from_xml_element(cls, xml_element: Element) -> "MgrNode":
+    def from_xml_element(cls, xml_element: XmlElement) -> "MgrNode":
         # for name, value in xml_element.attrib.items():
         raise NotImplementedError
 
@@ -47,23 +50,99 @@ class MgrNode(ABC):
     #         cls.attributes[name] = attribute_type()
 
 
+_MISSING = object()
+
+
+class MgrAttributedNode:
+    """
+    Базовый класс узлов UI с XML атрибутами
+
+    Словарь атрибутов разделяется с исходным элементом (copy-on-write) и копируется
+    только при первом изменении, поэтому разбор формы не создает лишних словарей.
+    Атрибуты lxml (_Attrib) копируются сразу: они держат весь разобранный документ.
+    """
+
+    __slots__ = ("_attributes", "_owns_attributes")
+
+    def _init_attributes(self, attributes: Optional[Mapping[str, Any]] = None) -> None:
+        if attributes and type(attributes) is dict:
+            self._attributes = attributes
+            self._owns_attributes = False
+        elif attributes:
+            self._attributes = dict(attributes)
+            self._owns_attributes = True
+        else:
+            self._attributes = {}
+            self._owns_attributes = True
+
+    @property
+    def attributes(self) -> Dict[str, Any]:
+        # the dict may be mutated by the caller, so detach it from the shared source first
+        if not self._owns_attributes:
+            self._attributes = {**self._attributes}
+            self._owns_attributes = True
+        return self._attributes
+
+    @attributes.setter
+    def attributes(self, value: Dict[str, Any]) -> None:
+        self._attributes = value
+        self._owns_attributes = True
+
+    def get_attribute(self, name: str, default: Any = None) -> Any:
+        return self._attributes.get(name, default)
+
+    def set_attribute(self, name: str, value: Any) -> None:
+        current_value = self._attributes.get(name, _MISSING)
+        if current_value is not _MISSING and current_value == value:
+            return
+
+        self.attributes[name] = value
+
+
 class MgrUnknownNode:
-    def __init__(self, xml_string: str, name):
+    """
+    Узел неизвестного типа, который передается в ответ без изменений
+
+    Хранит поддерево исходного элемента и возвращает его из to_xml, не сериализуя
+    и не разбирая XML заново. Исходный документ после разбора отбрасывается
+    (MgrUI._clear_doc), поэтому поддерево переносится в новый документ как есть.
+    """
+
+    __slots__ = ("name", "_xml_element", "_original_xml")
+
+    def __init__(
+        self,
+        xml_string: Optional[str] = None,
+        name: Optional[str] = None,
+        xml_element: XmlElement = None,
+    ) -> None:
         self.name = name
-        self.original_xml = xml_string
+        self._xml_element = xml_element
+        self._original_xml = xml_string
 
     @classmethod
-    def from_element(cls, xml_element: Element):
-        name = xml_element.get("name")
-        xml_string = ET.tostring(xml_element, encoding="unicode", method="xml")
-        return cls(xml_string, name)
+    def from_element(cls, xml_element: XmlElement) -> "MgrUnknownNode":
+        # the whitespace after the element belongs to the discarded source document
+        xml_element.tail = None
+        return cls(name=xml_element.get("name"), xml_element=xml_element)
 
-    def to_xml(self):
-        try:
-            return ET.fromstring(self.original_xml)
-        except ET.ParseError:
-            LOGGER.error("Could not parse XML from XML input string.")
-            raise
+    @property
+    def original_xml(self) -> str:
+        if self._original_xml is None:
+            self._original_xml = ET.tostring(self._xml_element, encoding="unicode", method="xml")
+        return self._original_xml
+
+    def to_xml(self) -> XmlElement:
+        if self._xml_element is None:
+            if self._original_xml is None:
+                raise ValueError("MgrUnknownNode requires xml_string or xml_element")
+            try:
+                self._xml_element = ET.fromstring(self._original_xml)
+            except ET.ParseError:
+                LOGGER.error("Could not parse XML from XML input string.")
+                raise
+
+        return self._xml_element
 
 
 class MgrUI(ABC):
@@ -78,10 +157,11 @@ class MgrUI(ABC):
         self._clear_doc()
 
     @classmethod
-    def from_request(cls, mgr_request: MgrRequest) -> "MgrUI":
-        return cls(mgr_request.xml_input)
+    def from_request(cls: Type[_MgrUIType], mgr_request: MgrRequest) -> _MgrUIType:
+        with profile_phase("parse"):
+            return cls(mgr_request.xml_input)
 
-    def _parse_xml(self, xml_input_string) -> Element:
+    def _parse_xml(self, xml_input_string: str) -> XmlElement:
         try:
             return ET.fromstring(xml_input_string)
         except ET.ParseError:
@@ -112,7 +192,7 @@ class MgrUI(ABC):
         raise NotImplementedError
 
     def _clear_doc(self):
-        new_root = Element(self.root.tag, attrib=self.root.attrib)
+        new_root = ET.Element(self.root.tag, attrib=self.root.attrib)
         new_metadata_element = ET.SubElement(
             new_root, "metadata", attrib=self.metadata_element.attrib
         )
@@ -127,13 +207,18 @@ class MgrUI(ABC):
         # self.patch_xml()
         return ET.tostring(self.root, encoding="unicode", method="xml")
 
+    def to_bytes(self) -> bytes:
+        """XML документа в UTF-8 без XML декларации"""
+        rendered: bytes = ET.tostring(self.root, encoding="utf-8", method="xml")
+        return rendered
+
     @abstractmethod
-    def patch_xml(self):
+    def patch_xml(self) -> None:
         raise NotImplementedError
 
     def _get_root_child_element_text(self, tag):
         element = self.root.find(tag)
-        if element:
+        if element is not None:
             return element.text
 
         return None
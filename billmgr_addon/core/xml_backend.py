@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+
+"""
+XML бэкенд UI слоя
+
+UI компоненты и ответы строят, разбирают и сериализуют XML через объект ET,
+совместимый по используемому подмножеству с xml.etree.ElementTree: Element,
+SubElement, fromstring, tostring, ParseError.
+
+По умолчанию (auto) используется lxml, если он установлен (pip install
+billmgr-addon[lxml]), иначе xml.etree.ElementTree. Бэкенд выбирается переменной
+окружения BILLMGR_ADDON_XML_BACKEND (auto, lxml, etree) или функцией set_xml_backend().
+
+Канонический XML (C14N) обоих бэкендов совпадает. В байтах ответа отличаются только
+пустые элементы: xml.etree пишет "<a />", lxml - "<a/>", а для элемента с текстом ""
+- "<a></a>".
+
+Элементы разных бэкендов несовместимы между собой: код плагина, который добавляет
+элементы в MgrUI.root или MgrResponse.root, должен использовать ET из этого модуля.
+"""
+
+import os
+import threading
+from typing import Any, Callable, Literal, Type, Union
+from xml.etree import ElementTree as _ElementTree
+
+try:
+    from lxml import etree as _lxml_etree
+
+    LXML_AVAILABLE = True
+except ImportError:
+    _lxml_etree = None
+    LXML_AVAILABLE = False
+
+
+XML_BACKEND_ENV = "BILLMGR_ADDON_XML_BACKEND"
+
+# element of the active backend (xml.etree.ElementTree.Element or lxml.etree._Element)
+XmlElement = Any
+
+SerializationMethod = Literal["xml", "html", "text", "c14n"]
+
+
+class XmlBackend:
+    """Набор функций XML бэкенда"""
+
+    __slots__ = ("name", "Element", "SubElement", "ParseError", "fromstring", "tostring")
+
+    def __init__(
+        self,
+        name: str,
+        element: Callable[..., XmlElement],
+        sub_element: Callable[..., XmlElement],
+        parse_error: Type[Exception],
+        fromstring: Callable[[Union[str, bytes]], XmlElement],
+        tostring: Callable[..., Any],
+    ) -> None:
+        self.name = name
+        self.Element = element
+        self.SubElement = sub_element
+        self.ParseError = parse_error
+        self.fromstring = fromstring
+        self.tostring = tostring
+
+    def __repr__(self) -> str:
+        return f"<XmlBackend {self.name}>"
+
+
+def _create_etree_backend() -> XmlBackend:
+    def fromstring(text: Union[str, bytes]) -> XmlElement:
+        # documents come from BILLmanager, not from the end user
+        return _ElementTree.fromstring(text)  # noqa: S314
+
+    def tostring(
+        element: XmlElement, encoding: str = "unicode", method: SerializationMethod = "xml"
+    ) -> Any:
+        return _ElementTree.tostring(element, encoding=encoding, method=method)
+
+    return XmlBackend(
+        "etree",
+        _ElementTree.Element,
+        _ElementTree.SubElement,
+        _ElementTree.ParseError,
+        fromstring,
+        tostring,
+    )
+
+
+def _create_lxml_backend() -> XmlBackend:
+    # lxml parsers must not be shared between threads
+    parsers = threading.local()
+
+    def get_parser() -> Any:
+        parser = getattr(parsers, "parser", None)
+        if parser is None:
+            # drop comments and processing instructions like xml.etree does
+            parser = _lxml_etree.XMLParser(
+                remove_comments=True, remove_pis=True, resolve_entities=False, no_network=True
+            )
+            parsers.parser = parser
+        return parser
+
+    def fromstring(text: Union[str, bytes]) -> XmlElement:
+        # lxml rejects str documents with an encoding declaration
+        if isinstance(text, str):
+            text = text.encode("utf-8")
+        return _lxml_etree.fromstring(text, get_parser())
+
+    def tostring(
+        element: XmlElement, encoding: str = "unicode", method: SerializationMethod = "xml"
+    ) -> Any:
+        return _lxml_etree.tostring(element, encoding=encoding, method=method)
+
+    return XmlBackend(
+        "lxml",
+        _lxml_etree.Element,
+        _lxml_etree.SubElement,
+        _lxml_etree.XMLSyntaxError,
+        fromstring,
+        tostring,
+    )
+
+
+def create_xml_backend(name: str = "auto") -> XmlBackend:
+    """
+    Создать XML бэкенд
+
+    Args:
+        name: auto - lxml, если установлен, иначе etree; lxml; etree
+    """
+    if name == "auto":
+        name = "lxml" if LXML_AVAILABLE else "etree"
+
+    if name == "lxml":
+        if not LXML_AVAILABLE:
+            raise ImportError(
+                "lxml is not available. Install with: pip install billmgr-addon[lxml]"
+            )
+        return _create_lxml_backend()
+    elif name == "etree":
+        return _create_etree_backend()
+
+    raise ValueError(f"Unknown XML backend '{name}'")
+
+
+ET = create_xml_backend(os.environ.get(XML_BACKEND_ENV, "auto"))
+
+
+def get_xml_backend() -> XmlBackend:
+    return ET
+
+
+def set_xml_backend(name: str) -> XmlBackend:
+    """
+    Переключить XML бэкенд
+
+    Должно вызываться до создания UI объектов: элементы, созданные прежним
+    бэкендом, нельзя смешивать с новыми.
+    """
+    backend = create_xml_backend(name)
+    for attribute in XmlBackend.__slots__:
+        setattr(ET, attribute, getattr(backend, attribute))
+    return ET
+
+
+__all__ = [
+    "ET",
+    "LXML_AVAILABLE",
+    "XML_BACKEND_ENV",
+    "XmlBackend",
+    "XmlElement",
+    "create_xml_backend",
+    "get_xml_backend",
+    "set_xml_backend",
+]
@@ -3,12 +3,13 @@
 Модуль для работы с бд
 """
 
-from .db import DB, DBConfig, DBResult, FlaskDbExtension, get_db
+from .db import DB, DBConfig, DBPool, DBResult, FlaskDbExtension, get_db
 
 __all__ = [
     "FlaskDbExtension",
     "DBConfig",
     "DB",
+    "DBPool",
     "DBResult",
     "get_db",
 ]
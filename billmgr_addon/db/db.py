@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
 
+import queue
 import re
-from typing import Union
+from typing import Any, Optional, Union
 
 try:
     import MySQLdb
@@ -22,6 +23,8 @@ from types import SimpleNamespace
 from flask import appcontext_pushed, g
 
 from billmgr_addon.utils.logging import LOGGER
+from billmgr_addon.utils.metrics import db_query_timer, track_db_connection
+from billmgr_addon.utils.profiling import profile_call
 
 
 def get_db(alias: str = None):
@@ -41,10 +44,54 @@ def get_db(alias: str = None):
     db_config = db_namespace.config
 
     if not db_namespace.instance:
-        db_namespace.instance = DB(db_config=db_config)
+        if db_namespace.pool is not None:
+            db_namespace.instance = db_namespace.pool.acquire()
+        else:
+            db_namespace.instance = DB(db_config=db_config)
     return db_namespace.instance
 
 
+class DBPool:
+    """
+    Пул открытых подключений для долго работающих процессов
+
+    Подключение возвращается в пул в конце контекста приложения вместо закрытия.
+    Перед выдачей подключение проверяется ping, оборванные создаются заново.
+    """
+
+    def __init__(self, db_config: "DBConfig", size: int = 4) -> None:
+        self.db_config = db_config
+        self.size = size
+        self._idle: "queue.LifoQueue[DB]" = queue.LifoQueue(maxsize=size)
+
+    def acquire(self) -> "DB":
+        while True:
+            try:
+                db = self._idle.get_nowait()
+            except queue.Empty:
+                return DB(db_config=self.db_config)
+            try:
+                db.connection.ping()
+                return db
+            except MySQLdb.Error:
+                db.close()
+
+    def release(self, db: "DB") -> None:
+        try:
+            # the next user must not see the snapshot of an unfinished transaction
+            db.connection.rollback()
+            self._idle.put_nowait(db)
+        except (MySQLdb.Error, queue.Full):
+            db.close()
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
 class FlaskDbExtension:
     """
     Расширение Flask для работы с базой данных
@@ -55,6 +102,7 @@ class FlaskDbExtension:
     def __init__(self):
         self.db_config = None
         self.namespace_id = None
+        self.pool: Optional[DBPool] = None
 
     def init_app(self, app, db_config=None, alias=None):
         """
@@ -75,6 +123,7 @@ class FlaskDbExtension:
 
         appcontext_pushed.connect(self.appcontext_pushed_handler, app)
         app.teardown_appcontext(self.teardown_appcontext_handler)
+        app.extensions.setdefault("billmgr_db", {})[self.namespace_id] = self
 
         LOGGER.debug(f'DB extension initialized with "{self.namespace_id}" namespace')
 
@@ -83,16 +132,33 @@ class FlaskDbExtension:
             db_namespace = SimpleNamespace()
             db_namespace.config = self.db_config
             db_namespace.instance = None
+            db_namespace.pool = self.pool
             setattr(g, self.namespace_id, db_namespace)
         except Exception as e:
             LOGGER.exception(e)
 
+    def enable_pool(self, size: int = 4) -> None:
+        """
+        Переиспользовать подключения между контекстами приложения
+
+        Args:
+            size: Сколько свободных подключений держать открытыми
+        """
+        if self.db_config is None:
+            raise RuntimeError("enable_pool() must be called after init_app()")
+        self.pool = DBPool(self.db_config, size=size)
+
     def teardown_appcontext_handler(self, error):
         db_namespace = getattr(g, self.namespace_id)
         if db_namespace.instance:
-            db_namespace.instance.close()
+            if db_namespace.pool is not None:
+                db_namespace.pool.release(db_namespace.instance)
+            else:
+                db_namespace.instance.close()
 
     def on_extension_close(self):
+        if self.pool is not None:
+            self.pool.close()
         LOGGER.debug(f'DB extension with "{self.namespace_id}" namespace is closed')
 
 
@@ -224,8 +290,8 @@ class DB:
     Предоставляет методы для выполнения SQL запросов и управления подключением.
     """
 
-    def __init__(self, **kwargs):
-        self.connection = None
+    def __init__(self, **kwargs: Any) -> None:
+        self.connection: Any = None
         self.connect(**kwargs)
         self.database = None
 
@@ -245,6 +311,7 @@ class DB:
 
         if self.connection:
             self.connection.close()
+            track_db_connection(-1)
 
         if not MYSQL_AVAILABLE:
             raise ImportError(
@@ -260,14 +327,16 @@ class DB:
                 charset="utf8",
                 use_unicode=db_config.use_unicode,
             )
+            track_db_connection(1)
             return self.connection
         except Exception:
             raise
 
-    def close(self):
+    def close(self) -> None:
         if self.connection:
             self.connection.close()
             self.connection = None
+            track_db_connection(-1)
 
     @property
     def cursor(self):
@@ -275,29 +344,34 @@ class DB:
 
     def select_query(self, sql, values: dict = None):
         cursor = self.connection.cursor(MySQLdb.cursors.DictCursor)
-        cursor.execute(sql, values)
+        with profile_call("db"), db_query_timer():
+            cursor.execute(sql, values)
         return DBResult(cursor)
 
     def insert_query(self, sql, values: dict = None):
         cursor = self.connection.cursor()
-        cursor.execute(sql, values)
+        with profile_call("db"), db_query_timer():
+            cursor.execute(sql, values)
         self.connection.commit()
         return cursor.lastrowid
 
     def update_query(self, sql, values: dict = None):
         cursor = self.connection.cursor()
-        cursor.execute(sql, values)
+        with profile_call("db"), db_query_timer():
+            cursor.execute(sql, values)
         self.connection.commit()
         return cursor.rowcount
 
     def delete_query(self, sql, values: dict = None):
         cursor = self.connection.cursor()
-        cursor.execute(sql, values)
+        with profile_call("db"), db_query_timer():
+            cursor.execute(sql, values)
         self.connection.commit()
         return cursor.rowcount
 
     def insert_many(self, sql, values_list: Union[list, tuple]):
         cursor = self.connection.cursor()
-        cursor.executemany(sql, values_list)
+        with profile_call("db"), db_query_timer():
+            cursor.executemany(sql, values_list)
         self.connection.commit()
         return cursor.rowcount
@@ -1,18 +1,32 @@
 # coding=utf-8
 from .src.impl import (
     AttribTracer,
+    DateTimeFormat,
     DateTimeTransformer,
+    FluentBundleCache,
     FluentTranslator,
+    MoneyFormat,
     MoneyTransformer,
+    TranslationKey,
+    TranslationKeyIndex,
     TranslatorHub,
     TranslatorRunner,
+    get_datetime_format,
+    get_money_format,
 )
 
 __all__ = [
     "AttribTracer",
+    "DateTimeFormat",
     "DateTimeTransformer",
+    "FluentBundleCache",
     "FluentTranslator",
+    "MoneyFormat",
     "MoneyTransformer",
+    "TranslationKey",
+    "TranslationKeyIndex",
     "TranslatorHub",
     "TranslatorRunner",
+    "get_datetime_format",
+    "get_money_format",
 ]
@@ -1,26 +1,117 @@
 import argparse
+import hashlib
+import os
+import threading
 import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Union
+from typing import Dict, List, Optional, Tuple, Union
 
-from watchdog.events import FileModifiedEvent, FileSystemEventHandler
+from watchdog.events import FileSystemEvent, FileSystemEventHandler
 from watchdog.observers import Observer
 
-from ..typing_generator import ParsedRawFTL, Stubs, Tree
+from ..typing_generator import ParsedFTLCache, ParsedRawFTL, Stubs, Translation, Tree
+from ..typing_generator.parsed_ftl import ReferenceNotExists
+
+DEBOUNCE_DELAY = 0.3
+# below this number of files to parse starting worker processes costs more than it saves
+PARALLEL_MIN_FILES = 8
+
+Messages = Dict[str, Translation]
+
+
+class FtlFileCache:
+    """Сообщения .ftl файлов, файл разбирается заново только при изменении содержимого"""
+
+    def __init__(self) -> None:
+        # path -> (mtime_ns, size, sha1, messages)
+        self._files: Dict[Path, Tuple[int, int, str, Messages]] = {}
+
+    def get_messages(self, ftl_path: Path) -> Messages:
+        stat = ftl_path.stat()
+        cached = self._files.get(ftl_path)
+        if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[3]
+
+        data = ftl_path.read_bytes()
+        # change detection, not security
+        digest = hashlib.sha1(data).hexdigest()  # noqa: S324
+        if cached is not None and cached[2] == digest:
+            messages = cached[3]
+        else:
+            messages = parse_ftl_text(data.decode("utf-8"))
+        self._files[ftl_path] = (stat.st_mtime_ns, stat.st_size, digest, messages)
+        return messages
+
+    def parse_dir(self, dir_path: str, *, recursive: bool = False) -> Messages:
+        messages: Messages = {}
+        files = find_ftl_files(dir_path, recursive=recursive)
+        for file in files:
+            messages.update(self.get_messages(file))
+        for removed in self._files.keys() - set(files):
+            del self._files[removed]
+        return messages
 
 
 class FtlFileEventHandler(FileSystemEventHandler):
-    def __init__(self, track_path: str, stub_path: str):
+    def __init__(
+        self,
+        track_path: str,
+        stub_path: str,
+        debounce: float = DEBOUNCE_DELAY,
+        *,
+        recursive: bool = False,
+    ) -> None:
         self.track_path = track_path
         self.stub_path = stub_path
+        self.debounce = debounce
+        self.recursive = recursive
+        self.cache = FtlFileCache()
+        self._messages: Optional[List[Tuple[str, Translation]]] = None
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
 
-    def on_modified(self, event: FileModifiedEvent):
+    def on_any_event(self, event: FileSystemEvent) -> None:
+        if event.is_directory or event.event_type in ("opened", "closed", "closed_no_write"):
+            return
+        paths = (event.src_path, getattr(event, "dest_path", ""))
+        if not any(str(path).endswith(".ftl") for path in paths):
+            return
         print("event type: %s, path: %s" % (event.event_type, event.src_path))
-        if not event.is_directory:
-            messages = parse_ftl_dir(self.track_path)
-            tree = Tree(messages)
-            stubs = Stubs(tree)
-            stubs.to_file(self.stub_path)
+        # an editor save fires several events, stubs are rebuilt once after the last one
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.debounce, self.try_regenerate)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def try_regenerate(self) -> bool:
+        """regenerate() без исключений: ошибка выводится одной строкой, наблюдение продолжается"""
+        try:
+            return self.regenerate()
+        except (OSError, ValueError, ReferenceNotExists) as e:
+            # the file may be half-saved or invalid, the next change triggers a new attempt
+            print("stubs not updated: %s: %s" % (type(e).__name__, str(e) or "invalid .ftl file"))
+            return False
+
+    def regenerate(self) -> bool:
+        """Пересобрать stubs, возвращает True, если файл stubs изменился"""
+        messages = self.cache.parse_dir(self.track_path, recursive=self.recursive)
+        # the order of messages defines the order of generated classes
+        items = list(messages.items())
+        if items == self._messages:
+            return False
+        self._messages = items
+
+        stubs = Stubs(Tree(messages))
+        if not self.stub_path:
+            print(stubs.echo())
+            return True
+        changed = stubs.to_file(self.stub_path)
+        if changed:
+            print("stubs updated: %s" % self.stub_path)
+        return changed
 
 
 def parse_ftl(ftl_path: Union[str, Path]) -> dict:
@@ -30,16 +121,75 @@ def parse_ftl(ftl_path: Union[str, Path]) -> dict:
     return messages
 
 
-def parse_ftl_dir(dir_path: str) -> dict:
-    messages = {}
-    for file in Path(dir_path).glob("*.ftl"):
-        messages.update(parse_ftl(file))
-    return messages
+def parse_ftl_text(ftl_data: str) -> Messages:
+    return ParsedRawFTL(ftl_data).get_messages()
+
+
+def find_ftl_files(dir_path: Union[str, Path], *, recursive: bool = False) -> List[Path]:
+    # sorted, so that messages redefined in several files always resolve the same way
+    return sorted(Path(dir_path).glob("**/*.ftl" if recursive else "*.ftl"))
+
+
+def parse_ftl_dir(
+    dir_path: Union[str, Path],
+    *,
+    recursive: bool = False,
+    workers: Optional[int] = None,
+    cache_path: Optional[Union[str, Path]] = None,
+) -> Messages:
+    """
+    Разобрать .ftl файлы папки
+
+    Файлы объединяются в порядке путей, при повторе сообщения побеждает последний файл.
+
+    Args:
+        dir_path: Папка локали
+        recursive: Искать .ftl файлы во вложенных папках
+        workers: Количество процессов, None - по числу CPU, 1 - без процессов
+        cache_path: Папка кэша ParsedFTLCache, None - без кэша
+    """
+    cache = ParsedFTLCache(cache_path) if cache_path is not None else None
+    results: List[Optional[Messages]] = []
+    to_parse: List[Tuple[int, bytes]] = []
+    for file in find_ftl_files(dir_path, recursive=recursive):
+        data = file.read_bytes()
+        messages = cache.get(data) if cache is not None else None
+        if messages is None:
+            to_parse.append((len(results), data))
+        results.append(messages)
+
+    texts = [data.decode("utf-8") for _, data in to_parse]
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(texts) >= PARALLEL_MIN_FILES:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(texts) // (workers * 4))
+            parsed = list(pool.map(parse_ftl_text, texts, chunksize=chunksize))
+    else:
+        parsed = [parse_ftl_text(text) for text in texts]
+
+    for (index, data), messages in zip(to_parse, parsed):
+        results[index] = messages
+        if cache is not None:
+            cache.set(data, messages)
+
+    merged: Messages = {}
+    for messages in results:
+        if messages is not None:
+            merged.update(messages)
+    return merged
 
 
-def watch_ftl_dir(track_path: str, stub_path: str) -> None:
+def watch_ftl_dir(
+    track_path: str,
+    stub_path: str,
+    debounce: float = DEBOUNCE_DELAY,
+    *,
+    recursive: bool = False,
+) -> None:
+    handler = FtlFileEventHandler(track_path, stub_path, debounce, recursive=recursive)
+    handler.try_regenerate()
     observer = Observer()
-    observer.schedule(FtlFileEventHandler(track_path, stub_path), track_path, recursive=True)
+    observer.schedule(handler, track_path, recursive=True)
     observer.start()
     try:
         while True:
@@ -55,6 +205,32 @@ def cli() -> None:
     parser.add_argument("-track-ftl", dest="track_path", required=False)
     parser.add_argument("-dir-ftl", dest="dir_path", required=False)
     parser.add_argument("-stub", dest="stub_path", required=False)
+    parser.add_argument(
+        "-debounce",
+        dest="debounce",
+        type=float,
+        default=DEBOUNCE_DELAY,
+        help="delay in seconds before stubs are rebuilt after the last change (-track-ftl)",
+    )
+    parser.add_argument(
+        "-recursive",
+        dest="recursive",
+        action="store_true",
+        help="include .ftl files from subdirectories (-dir-ftl, -track-ftl)",
+    )
+    parser.add_argument(
+        "-workers",
+        dest="workers",
+        type=int,
+        default=None,
+        help="parser processes for -dir-ftl, 1 disables them (default: CPU count)",
+    )
+    parser.add_argument(
+        "-cache",
+        dest="cache_path",
+        required=False,
+        help="directory for cached parse results of -dir-ftl",
+    )
 
     args = parser.parse_args()
 
@@ -64,11 +240,16 @@ def cli() -> None:
 
     if args.track_path:
         print("Watching for changes in %s" % args.track_path)
-        watch_ftl_dir(args.track_path, args.stub_path)
+        watch_ftl_dir(args.track_path, args.stub_path, args.debounce, recursive=args.recursive)
         return
 
     elif args.dir_path:
-        messages = parse_ftl_dir(args.dir_path)
+        messages = parse_ftl_dir(
+            args.dir_path,
+            recursive=args.recursive,
+            workers=args.workers,
+            cache_path=args.cache_path,
+        )
     else:
         messages = parse_ftl(args.ftl_path)
 
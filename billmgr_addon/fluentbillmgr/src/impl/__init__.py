@@ -1,15 +1,31 @@
 # coding=utf-8
 from .attrib_tracer import AttribTracer
-from .runner import TranslatorRunner
+from .bundle_cache import FluentBundleCache
+from .key_index import TranslationKeyIndex
+from .runner import TranslationKey, TranslatorRunner
 from .transator_hubs.translator_hub import TranslatorHub
-from .transformers import DateTimeTransformer, MoneyTransformer
+from .transformers import (
+    DateTimeFormat,
+    DateTimeTransformer,
+    MoneyFormat,
+    MoneyTransformer,
+    get_datetime_format,
+    get_money_format,
+)
 from .translator import FluentTranslator
 
 __all__ = [
     "AttribTracer",
+    "DateTimeFormat",
     "DateTimeTransformer",
+    "FluentBundleCache",
     "FluentTranslator",
+    "MoneyFormat",
     "MoneyTransformer",
+    "TranslationKey",
+    "TranslationKeyIndex",
     "TranslatorRunner",
     "TranslatorHub",
+    "get_datetime_format",
+    "get_money_format",
 ]
@@ -0,0 +1,254 @@
+# coding=utf-8
+import builtins
+import contextlib
+import hashlib
+import importlib.util
+import marshal
+import os
+import pickle
+import sys
+import tempfile
+from glob import escape as glob_escape
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import babel
+import babel.plural
+import fluent_compiler
+from fluent_compiler import compiler, runtime
+from fluent_compiler.bundle import FluentBundle
+from fluent_compiler.resource import FtlResource
+from fluent_compiler.utils import TERM_SIGIL
+
+CACHE_FORMAT_VERSION = 1
+
+Functions = Dict[str, Callable[..., Any]]
+
+
+def _make_plural_form_for_number(babel_locale: babel.Locale) -> Callable[[Any], Any]:
+    # the same wrapper as in fluent_compiler.compiler.messages_to_module
+    plural_form_for_number_main = babel.plural.to_python(babel_locale.plural_form)
+
+    def plural_form_for_number(number: Any) -> Any:
+        try:
+            return plural_form_for_number_main(number)
+        except TypeError:
+            return None
+
+    return plural_form_for_number
+
+
+def _make_module_globals(babel_locale: babel.Locale, functions: Functions) -> Dict[str, Any]:
+    module_globals = {k: getattr(runtime, k) for k in runtime.__all__}
+    module_globals.update(builtins.__dict__)
+    module_globals[compiler.LOCALE_NAME] = babel_locale
+    module_globals[compiler.PLURAL_FORM_FOR_NUMBER_NAME] = _make_plural_form_for_number(
+        babel_locale
+    )
+    module_globals.update(functions)
+    return module_globals
+
+
+def ftl_sources_hash(texts: Iterable[str]) -> str:
+    """Хэш содержимого .ftl файлов бандла"""
+    content = hashlib.sha256()
+    for text in texts:
+        content.update(text.encode("utf-8") + b"\0")
+    return content.hexdigest()
+
+
+def _make_bundle(locale: str, message_functions: Functions, errors: List[Any]) -> FluentBundle:
+    bundle = FluentBundle.__new__(FluentBundle)
+    bundle.locale = locale
+    bundle._compiled_messages = message_functions
+    bundle._compilation_errors = errors
+    return bundle
+
+
+class FluentBundleCache:
+    """
+    Кэш скомпилированных FluentBundle на диске
+
+    fluent_compiler генерирует и компилирует Python код для каждого сообщения, что
+    занимает заметное время на каждом старте процесса. Кэш хранит code objects
+    (marshal) вместе с картой сообщений, ключ - содержимое .ftl файлов, локаль,
+    параметры компиляции, версии fluent_compiler и Python.
+
+    Загрузка исполняет код из файлов кэша: каталог должен быть доверенным, то есть
+    доступным на запись только пользователю, от которого работает плагин.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+
+    def get_bundle(
+        self,
+        locale: str,
+        filenames: Iterable[Union[str, Path]],
+        functions: Optional[Functions] = None,
+        *,
+        use_isolating: bool = True,
+    ) -> FluentBundle:
+        """
+        Загрузить FluentBundle из кэша или скомпилировать и сохранить
+
+        Аргументы как у FluentBundle.from_files, escapers не поддерживаются.
+        """
+        resources = [FtlResource.from_file(str(filename)) for filename in filenames]
+        _functions = compiler.BUILTINS.copy()
+        if functions:
+            _functions.update(functions)
+
+        cache_file = self._get_cache_file(
+            locale, resources, _functions, use_isolating=use_isolating
+        )
+        bundle = self._load(cache_file, locale, _functions)
+        if bundle is None:
+            bundle, payload = self._compile(
+                locale, resources, _functions, use_isolating=use_isolating
+            )
+            self._save(cache_file, payload)
+        # lets TranslationKeyIndex detect that it was built from other sources
+        bundle.source_hash = ftl_sources_hash(resource.text for resource in resources)
+        return bundle
+
+    def clear(self) -> int:
+        """Удалить все файлы кэша, возвращает количество удаленных файлов"""
+        removed = 0
+        for cache_file in self.path.glob("*.cache"):
+            cache_file.unlink()
+            removed += 1
+        return removed
+
+    def _get_cache_file(
+        self,
+        locale: str,
+        resources: List[FtlResource],
+        functions: Functions,
+        *,
+        use_isolating: bool,
+    ) -> Path:
+        sources = hashlib.sha256()
+        content = hashlib.sha256()
+        for resource in resources:
+            sources.update(str(Path(resource.filename).absolute()).encode("utf-8") + b"\0")
+            content.update(resource.text.encode("utf-8") + b"\0")
+
+        content.update(
+            repr(
+                (
+                    CACHE_FORMAT_VERSION,
+                    fluent_compiler.__version__,
+                    importlib.util.MAGIC_NUMBER,
+                    sys.implementation.cache_tag,
+                    use_isolating,
+                    sorted(functions),
+                )
+            ).encode("utf-8")
+        )
+        # bundles built from the same files share the prefix, so stale versions can be removed
+        prefix = f"{locale}-{sources.hexdigest()[:12]}"
+        return self.path / f"{prefix}-{content.hexdigest()[:24]}.cache"
+
+    def _load(self, cache_file: Path, locale: str, functions: Functions) -> Optional[FluentBundle]:
+        # the cache directory is trusted, see the class docstring
+        try:
+            with cache_file.open("rb") as fh:
+                payload = pickle.load(fh)  # noqa: S301
+            code_objects = [marshal.loads(code) for code in payload["code"]]  # noqa: S302
+        except (pickle.UnpicklingError, EOFError, OSError, ValueError):
+            # a missing, truncated or broken file is rebuilt
+            return None
+
+        babel_locale = babel.Locale.parse(locale.replace("-", "_"))
+        bundle_functions = {
+            name: functions[function_name] for name, function_name in payload["functions"].items()
+        }
+        module_globals = _make_module_globals(babel_locale, bundle_functions)
+        for code in code_objects:
+            exec(code, module_globals)  # noqa: S102
+
+        message_functions = {
+            key: module_globals[name] for key, name in payload["message_mapping"].items()
+        }
+        return _make_bundle(locale, message_functions, payload["errors"])
+
+    def _compile(
+        self,
+        locale: str,
+        resources: List[FtlResource],
+        functions: Functions,
+        *,
+        use_isolating: bool,
+    ) -> Tuple[FluentBundle, Dict[str, Any]]:
+        # compiler.compile_messages split into steps to keep the compiled code objects
+        messages, parsing_issues = compiler._parse_resources(resources)
+        babel_locale = babel.Locale.parse(locale.replace("-", "_"))
+        module, message_mapping, module_globals, compilation_errors = compiler.messages_to_module(
+            messages,
+            babel_locale,
+            use_isolating=use_isolating,
+            functions=functions,
+        )
+
+        # user functions may have been renamed to avoid clashes with other globals
+        function_names = {}
+        for name, value in module_globals.items():
+            for function_name, function in functions.items():
+                if value is function:
+                    function_names[name] = function_name
+
+        code_objects = []
+        for module_ast in module.as_multiple_module_ast():
+            filename = getattr(module_ast.body[0], "filename", "<string>")
+            code_obj = compile(module_ast, filename, "exec")
+            exec(code_obj, module_globals)  # noqa: S102
+            code_objects.append(marshal.dumps(code_obj))
+
+        public_mapping = {
+            str(key): name
+            for key, name in message_mapping.items()
+            if not key.startswith(TERM_SIGIL)
+        }
+        errors = parsing_issues + compilation_errors
+        message_functions = {key: module_globals[name] for key, name in public_mapping.items()}
+        payload = {
+            "code": code_objects,
+            "message_mapping": public_mapping,
+            "functions": function_names,
+            "errors": errors,
+        }
+        return _make_bundle(locale, message_functions, errors), payload
+
+    def _save(self, cache_file: Path, payload: Dict[str, Any]) -> None:
+        try:
+            data = pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            # errors with unpicklable details, compiled on every start
+            return
+
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        except OSError:
+            return
+
+        replaced = False
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            # concurrent processes may write the same file, replace is atomic
+            Path(tmp_name).replace(cache_file)
+            replaced = True
+        except OSError:
+            return
+        finally:
+            if not replaced:
+                with contextlib.suppress(OSError):
+                    Path(tmp_name).unlink()
+
+        prefix = cache_file.name.rsplit("-", 1)[0]
+        for stale_file in self.path.glob(f"{glob_escape(prefix)}-*.cache"):
+            if stale_file != cache_file:
+                with contextlib.suppress(OSError):
+                    stale_file.unlink()
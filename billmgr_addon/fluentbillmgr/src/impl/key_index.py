@@ -0,0 +1,113 @@
+# coding=utf-8
+import json
+import os
+import tempfile
+from contextlib import suppress
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Union
+
+from ..abc import AbstractTranslator
+
+if TYPE_CHECKING:
+    from .transator_hubs.translator_hub import TranslatorHub
+
+INDEX_FORMAT_VERSION = 2
+
+
+class TranslationKeyIndex:
+    """
+    Индекс ключей переводов: для каждого языка - какая локаль цепочки дает ключ
+
+    Строится при сборке (billmgr-addon build-i18n-index) и передается в TranslatorHub,
+    тогда TranslatorRunner находит переводчик ключа одним обращением к словарю вместо
+    перебора переводчиков с KeyError. Ключи, которых нет в индексе, ищутся перебором.
+
+    Индекс хранит хэши .ftl файлов каждой локали (FluentTranslator.source_hash). Если
+    файлы изменились после сборки или хэш неизвестен (бандл создан не FluentBundleCache),
+    индекс для языка не используется.
+    """
+
+    def __init__(
+        self,
+        languages: Dict[str, Dict[str, List[str]]],
+        sources: Optional[Dict[str, Optional[str]]] = None,
+    ) -> None:
+        # language -> {locale: keys first provided by this locale of the language chain}
+        self.languages = languages
+        # locale -> hash of its .ftl files when the index was built
+        self.sources = sources or {}
+
+    @classmethod
+    def build(cls, hub: "TranslatorHub") -> "TranslationKeyIndex":
+        """Построить индекс по переводчикам хаба, загружает все локали"""
+        languages = {}
+        sources = {}
+        for lang in hub.locales_map:
+            seen = set()
+            locales: Dict[str, List[str]] = {}
+            for translator in hub.get_translator_by_locale(lang).translators:
+                message_ids = getattr(translator, "message_ids", None)
+                if message_ids is None:
+                    continue
+                keys = [key for key in message_ids() if key not in seen]
+                seen.update(keys)
+                locales[translator.locale] = sorted(keys)
+                sources[translator.locale] = getattr(translator, "source_hash", None)
+            languages[lang] = locales
+        return cls(languages, sources)
+
+    def keys(self, lang: str) -> List[str]:
+        return [key for keys in self.languages.get(lang, {}).values() for key in keys]
+
+    def get_key_map(
+        self, lang: str, translators: Iterable[AbstractTranslator]
+    ) -> Optional[Dict[str, AbstractTranslator]]:
+        """Ключ -> переводчик для языка, None если язык не проиндексирован или индекс устарел"""
+        locales = self.languages.get(lang)
+        if locales is None:
+            return None
+        by_locale = {translator.locale: translator for translator in translators}
+        for locale, translator in by_locale.items():
+            source_hash = getattr(translator, "source_hash", None)
+            if source_hash is None or self.sources.get(locale) != source_hash:
+                return None
+        key_map = {}
+        for locale, keys in locales.items():
+            locale_translator = by_locale.get(locale)
+            if locale_translator is not None:
+                key_map.update(dict.fromkeys(keys, locale_translator))
+        return key_map
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Атомарно записать индекс, при ошибке временный файл удаляется"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": INDEX_FORMAT_VERSION,
+            "languages": self.languages,
+            "sources": self.sources,
+        }
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        replaced = False
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(data, fh, ensure_ascii=False, separators=(",", ":"))
+            Path(tmp_name).replace(path)
+            replaced = True
+        finally:
+            if not replaced:
+                # a failed cleanup must not hide the original error
+                with suppress(OSError):
+                    Path(tmp_name).unlink()
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> Optional["TranslationKeyIndex"]:
+        """Загрузить индекс, None если файла нет или он другой версии"""
+        try:
+            with Path(path).open(encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != INDEX_FORMAT_VERSION:
+            return None
+        return cls(data["languages"], data.get("sources"))
@@ -1,10 +1,49 @@
 # coding=utf-8
-from typing import Iterable, Optional
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 
 from ..abc import AbstractTranslator
 from ..abc.runner import AbstractTranslatorRunner
 from .attrib_tracer import AttribTracer
 
+_MISSING = object()
+
+
+class TranslationKey:
+    """
+    Неизменяемый путь к ключу перевода: i18n.error.not_found -> "error-not_found"
+
+    Дочерние пути кэшируются, поэтому повторный доступ по той же цепочке атрибутов
+    не создает объектов и строк. Объект не хранит состояние запроса и может
+    использоваться из параллельных задач.
+    """
+
+    __slots__ = ("_runner", "_key", "_children")
+
+    def __init__(self, runner: "TranslatorRunner", key: str) -> None:
+        self._runner = runner
+        self._key = key
+        self._children: Dict[str, "TranslationKey"] = {}
+
+    def __getattr__(self, item: str) -> "TranslationKey":
+        if item.startswith("__"):
+            # protocol lookups (copy, pickle, __html__) are not translation keys
+            raise AttributeError(item)
+        child = self._children.get(item)
+        if child is None:
+            key = sys.intern(f"{self._key}{self._runner.separator}{item}")
+            child = self._children.setdefault(item, TranslationKey(self._runner, key))
+        return child
+
+    def __call__(self, **kwargs: Any) -> str:
+        return self._runner._get_translation(self._key, **kwargs)
+
+    def __str__(self) -> str:
+        return self._key
+
+    def __repr__(self) -> str:
+        return f"<TranslationKey {self._key!r}>"
+
 
 class TranslatorRunner(AbstractTranslatorRunner, AttribTracer):
     def __init__(
@@ -12,28 +51,82 @@ class TranslatorRunner(AbstractTranslatorRunner, AttribTracer):
         translators: Iterable[AbstractTranslator],
         separator: str = "-",
         locale: Optional[str] = None,
+        key_map: Optional[Dict[str, AbstractTranslator]] = None,
     ) -> None:
-        super().__init__()
+        """
+        Args:
+            translators: Переводчики в порядке поиска ключа
+            separator: Разделитель частей ключа
+            locale: Язык runner
+            key_map: Ключ -> переводчик из TranslationKeyIndex
+        """
+        # AttribTracer.__init__ is not called: keys are TranslationKey objects,
+        # the runner keeps no request_line state
         self.translators = translators
         self.separator = separator
-        self.request_line = ""
         self.locale = locale
+        self.key_map = key_map
+        self._keys: Dict[str, TranslationKey] = {}
 
-    def get(self, key: str, **kwargs) -> str:
+    def get(self, key: str, **kwargs: Any) -> str:
         return self._get_translation(key, **kwargs)
 
-    def _get_translation(self, key, **kwargs):
+    def format_many(
+        self, key: Union[str, TranslationKey], kwargs_list: Iterable[Dict[str, Any]]
+    ) -> List[str]:
+        """
+        Перевести один ключ для списка аргументов, например для всех строк списка
+
+        Одинаковые наборы hashable аргументов форматируются один раз.
+
+        Args:
+            key: Ключ перевода или TranslationKey (i18n.status.name)
+            kwargs_list: Аргументы для каждого значения
+
+        Returns:
+            Переводы в порядке kwargs_list
+        """
+        key = str(key)
+        formatted: Dict[Tuple[Any, ...], str] = {}
+        results: List[str] = []
+        for kwargs in kwargs_list:
+            items = tuple((name, type(value), value) for name, value in kwargs.items())
+            try:
+                text: Any = formatted.get(items, _MISSING)
+                if text is _MISSING:
+                    text = formatted[items] = self._get_translation(key, **kwargs)
+            except TypeError:
+                # unhashable arguments
+                text = self._get_translation(key, **kwargs)
+            results.append(text)
+        return results
+
+    def _get_translation(self, key: str, **kwargs: Any) -> str:
+        if self.key_map is not None:
+            translator = self.key_map.get(key)
+            if translator is not None:
+                try:
+                    return translator.get(key, **kwargs)
+                except KeyError:
+                    # the index was built before the key was removed from this locale
+                    pass
         for translator in self.translators:
             try:
                 return translator.get(key, **kwargs)
             except KeyError:
                 continue
+        # no locale has the key, callers have always got None here
+        return None  # type: ignore[return-value]
 
-    def __call__(self, **kwargs) -> str:
-        text = self._get_translation(self.request_line[:-1], **kwargs)
-        self.request_line = ""
-        return text
+    def __call__(self, **kwargs: Any) -> str:
+        return self._get_translation("", **kwargs)
 
-    def __getattr__(self, item: str) -> "TranslatorRunner":
-        self.request_line += f"{item}{self.separator}"
-        return self
+    def __getattr__(self, item: str) -> TranslationKey:  # type: ignore[override]
+        keys: Optional[Dict[str, TranslationKey]] = self.__dict__.get("_keys")
+        if keys is None or item.startswith("__"):
+            # not initialized yet (copy/pickle) or a protocol lookup
+            raise AttributeError(item)
+        key = keys.get(item)
+        if key is None:
+            key = keys.setdefault(item, TranslationKey(self, sys.intern(item)))
+        return key
@@ -1,18 +1,35 @@
 # coding=utf-8
-from typing import Dict, Iterable, List, Union
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
 
 from ....exceptions import NotImplementedRootLocaleTranslator
 from ...abc import AbstractTranslator, AbstractTranslatorsHub
 from ...impl import TranslatorRunner
+from ..key_index import TranslationKeyIndex
 
 
 class TranslatorHub(AbstractTranslatorsHub):
+    """
+    Хаб переводчиков по локалям
+
+    Переводчики передаются готовыми (translators) или фабриками (translator_factories):
+    фабрика вызывается при первом запросе локали, результат запоминается. Если задан
+    max_lazy_translators, в памяти остается не больше указанного количества переводчиков
+    из фабрик, давно не использованные выгружаются и при следующем запросе создаются заново.
+    Локали загружаемого языка не выгружаются, даже если его цепочка длиннее лимита.
+    С key_index runner находит переводчик ключа без перебора цепочки локалей.
+    """
+
     def __init__(
         self,
         locales_map: Dict[str, Union[str, Iterable[str]]],
-        translators: List[AbstractTranslator],
+        translators: Optional[List[AbstractTranslator]] = None,
         root_locale: str = "en",
         separator: str = "-",
+        translator_factories: Optional[Dict[str, Callable[[], AbstractTranslator]]] = None,
+        max_lazy_translators: Optional[int] = None,
+        key_index: Optional[TranslationKeyIndex] = None,
     ) -> None:
         self.locales_map = dict(
             zip(
@@ -23,25 +40,41 @@ class TranslatorHub(AbstractTranslatorsHub):
                 ),
             )
         )
-        self.translators = translators
+        self.translators = translators or []
         self.root_locale = root_locale
         self.separator = separator
         self.storage: Dict[str, AbstractTranslator] = dict(
-            zip([translator.locale for translator in translators], translators)
+            zip([translator.locale for translator in self.translators], self.translators)
         )
-        if not self.storage.get(root_locale):
+        self.translator_factories = {
+            locale: factory
+            for locale, factory in (translator_factories or {}).items()
+            if locale not in self.storage
+        }
+        if not self.storage.get(root_locale) and root_locale not in self.translator_factories:
             raise NotImplementedRootLocaleTranslator(self.root_locale)
-        self.translators_map: Dict[str, Iterable[AbstractTranslator]] = self._locales_map_parser(
-            self.locales_map
-        )
+
+        self.max_lazy_translators = max_lazy_translators
+        self.key_index = key_index
+        self._lazy_storage: "OrderedDict[str, AbstractTranslator]" = OrderedDict()
+        # locales from factories used by each language, to mark them as recently used
+        self._lazy_locales: Dict[str, Tuple[str, ...]] = {}
+        # one runner per language, runners are stateless and shared between requests
+        self._runners: Dict[str, TranslatorRunner] = {}
+        self._lock = threading.RLock()
+
+        if self.translator_factories:
+            self.translators_map: Dict[str, Tuple[AbstractTranslator, ...]] = {}
+        else:
+            self.translators_map = self._locales_map_parser(self.locales_map)
 
     def _locales_map_parser(
         self, locales_map: Dict[str, Union[str, Iterable[str]]]
-    ) -> Dict[str, Iterable[AbstractTranslator]]:
+    ) -> Dict[str, Tuple[AbstractTranslator, ...]]:
         return {
             lang: tuple(
                 [
-                    self.storage.get(locale)
+                    self.storage[locale]
                     for locale in translator_locales
                     if locale in self.storage.keys()
                 ]
@@ -49,9 +82,78 @@ class TranslatorHub(AbstractTranslatorsHub):
             for lang, translator_locales in locales_map.items()
         }
 
-    def get_translator_by_locale(self, locale: str) -> TranslatorRunner:
-        translator = self.translators_map.get(locale)
+    def _load_translators(self, lang: str) -> Tuple[AbstractTranslator, ...]:
+        with self._lock:
+            cached_translators = self.translators_map.get(lang)
+            if cached_translators is not None:
+                return cached_translators
+
+            translators: List[AbstractTranslator] = []
+            lazy_locales: List[str] = []
+            for locale in self.locales_map.get(lang, (lang,)):
+                if locale in self.storage:
+                    translators.append(self.storage[locale])
+                elif locale in self.translator_factories:
+                    translator = self._lazy_storage.get(locale)
+                    if translator is None:
+                        translator = self.translator_factories[locale]()
+                        self._lazy_storage[locale] = translator
+                    translators.append(translator)
+                    lazy_locales.append(locale)
+
+            loaded = tuple(translators)
+            self.translators_map[lang] = loaded
+            self._lazy_locales[lang] = tuple(lazy_locales)
+            self._touch(lang)
+            self._evict(keep=lang)
+            return loaded
+
+    def _touch(self, lang: str) -> None:
+        for locale in self._lazy_locales.get(lang, ()):
+            if locale in self._lazy_storage:
+                self._lazy_storage.move_to_end(locale)
+
+    def _evict(self, keep: str) -> None:
+        if self.max_lazy_translators is None:
+            return
+        # locales of the language being loaded stay even if the chain is longer than the limit
+        kept = set(self._lazy_locales.get(keep, ()))
+        candidates = [locale for locale in self._lazy_storage if locale not in kept]
+        excess = len(self._lazy_storage) - self.max_lazy_translators
+        for evicted in candidates[: max(excess, 0)]:
+            del self._lazy_storage[evicted]
+            for lang, lazy_locales in list(self._lazy_locales.items()):
+                if evicted in lazy_locales:
+                    del self._lazy_locales[lang]
+                    del self.translators_map[lang]
+                    self._runners.pop(lang, None)
+
+    def _create_runner(self, lang: str) -> TranslatorRunner:
+        translator = self.translators_map.get(lang)
         if translator is None:
-            locale = self.root_locale
-            translator = self.translators_map[self.root_locale]
-        return TranslatorRunner(translators=translator, separator=self.separator, locale=locale)
+            translator = self._load_translators(lang)
+        key_map = None
+        if self.key_index is not None:
+            key_map = self.key_index.get_key_map(lang, translator)
+        runner = TranslatorRunner(
+            translators=translator, separator=self.separator, locale=lang, key_map=key_map
+        )
+        with self._lock:
+            # the language may have been evicted right after loading
+            if self.translators_map.get(lang) is translator:
+                self._runners[lang] = runner
+        return runner
+
+    def get_translator_by_locale(self, locale: str) -> TranslatorRunner:
+        runner = self._runners.get(locale)
+        if runner is None:
+            if locale not in self.locales_map:
+                locale = self.root_locale
+                runner = self._runners.get(locale)
+            if runner is None:
+                return self._create_runner(locale)
+
+        if self.max_lazy_translators is not None and self._lazy_locales.get(locale):
+            with self._lock:
+                self._touch(locale)
+        return runner
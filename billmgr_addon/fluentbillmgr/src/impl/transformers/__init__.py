@@ -1,8 +1,13 @@
 # coding=utf-8
 from .datetime_transformer import DateTimeTransformer
+from .formats import DateTimeFormat, MoneyFormat, get_datetime_format, get_money_format
 from .money_transformer import MoneyTransformer
 
 __all__ = [
+    "DateTimeFormat",
     "DateTimeTransformer",
+    "MoneyFormat",
     "MoneyTransformer",
+    "get_datetime_format",
+    "get_money_format",
 ]
@@ -0,0 +1,250 @@
+# coding=utf-8
+import re
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Literal, Optional, Union
+
+import babel
+from babel import dates as babel_dates, numbers as babel_numbers
+from fluent_compiler.types import fluent_date, fluent_number
+
+FORMAT_CACHE_SIZE = 256
+
+_QUOTED_TEXT = re.compile(r"'([^']*)'")
+
+
+def _parse_locale(locale: str) -> babel.Locale:
+    return babel.Locale.parse(locale.replace("-", "_"))
+
+
+def _format_many(format_value: Callable[[Any], str], values: Iterable[Any]) -> List[str]:
+    # repeated values in a column are formatted once; values are compared by repr,
+    # because equal values may format differently (Decimal("-0") and 0, datetimes
+    # of the same instant in different time zones)
+    formatted: Dict[str, str] = {}
+    result: List[str] = []
+    append = result.append
+    for value in values:
+        key = repr(value)
+        text = formatted.get(key)
+        if text is None:
+            text = formatted[key] = format_value(value)
+        append(text)
+    return result
+
+
+class MoneyFormat:
+    """
+    Форматирование денежных сумм с настройками MoneyTransformer для одной локали и валюты
+
+    Результат совпадает с MoneyTransformer(...).format(locale) в сообщениях Fluent, но
+    шаблон babel, символы локали и валюты вычисляются один раз. Используйте
+    get_money_format, чтобы объекты переиспользовались между запросами.
+    """
+
+    def __init__(
+        self,
+        locale: str,
+        currency: str,
+        currency_display: Union[Literal["code"], Literal["symbol"], Literal["name"]] = "code",
+        *,
+        use_grouping: bool = False,
+        minimum_significant_digits: Optional[int] = None,
+        maximum_significant_digits: Optional[int] = None,
+        minimum_fraction_digits: Optional[int] = None,
+        maximum_fraction_digits: Optional[int] = None,
+    ) -> None:
+        self.locale = locale
+        self.currency = currency
+        self.babel_locale = _parse_locale(locale)
+        self.options: Dict[str, Any] = {
+            "style": "currency",
+            "currencyDisplay": currency_display,
+            "currency": currency,
+            "useGrouping": use_grouping,
+            "minimumSignificantDigits": minimum_significant_digits,
+            "maximumSignificantDigits": maximum_significant_digits,
+            "minimumFractionDigits": minimum_fraction_digits,
+            "maximumFractionDigits": maximum_fraction_digits,
+        }
+
+        # fluent_compiler builds the babel pattern from the options for every value
+        template = fluent_number(Decimal(0), **self.options)
+        pattern = template._apply_options(self.babel_locale.currency_formats["standard"])
+        self.pattern = pattern
+        # significant digits, scientific and long name formats use the generic path
+        self._fast = (
+            currency_display != "name"
+            and "@" not in pattern.pattern
+            and not pattern.exp_prec
+            and not pattern.scale
+            and pattern.number_pattern != ""
+        )
+        if not self._fast:
+            return
+
+        self._quantum = babel_numbers.get_decimal_quantum(pattern.frac_prec[1])
+        self._frac_prec = pattern.frac_prec
+        self._int_min = pattern.int_prec[0]
+        self._grouping = pattern.grouping
+        self._group_symbol = babel_numbers.get_group_symbol(self.babel_locale)
+        self._decimal_symbol = babel_numbers.get_decimal_symbol(self.babel_locale)
+        self._prefix = tuple(self._render_affix(affix) for affix in pattern.prefix)
+        self._suffix = tuple(self._render_affix(affix) for affix in pattern.suffix)
+
+    def _render_affix(self, affix: str) -> str:
+        # the same replacements as NumberPattern.apply does on the whole string
+        if "¤" in affix:
+            affix = affix.replace("¤¤", self.currency.upper())
+            symbol = babel_numbers.get_currency_symbol(self.currency, self.babel_locale)
+            affix = affix.replace("¤", symbol)
+        return _QUOTED_TEXT.sub(lambda m: m.group(1) or "'", affix)
+
+    def _format_int(self, value: str) -> str:
+        width = len(value)
+        if width < self._int_min:
+            value = "0" * (self._int_min - width) + value
+        gsize = self._grouping[0]
+        ret = ""
+        while len(value) > gsize:
+            ret = self._group_symbol + value[-gsize:] + ret
+            value = value[:-gsize]
+            gsize = self._grouping[1]
+        return value + ret
+
+    def _format_frac(self, value: str) -> str:
+        min_digits, max_digits = self._frac_prec
+        if len(value) < min_digits:
+            value += "0" * (min_digits - len(value))
+        if max_digits == 0 or (min_digits == 0 and int(value) == 0):
+            return ""
+        while len(value) > min_digits and value[-1] == "0":
+            value = value[:-1]
+        return self._decimal_symbol + value
+
+    def format(self, amount: Any) -> str:
+        """Отформатировать сумму, None и пустая строка -> пустая строка"""
+        if amount is None or amount == "":
+            return ""
+        if not isinstance(amount, Decimal):
+            amount = Decimal(str(amount))
+        if not self._fast or not amount.is_finite():
+            text: str = fluent_number(amount, **self.options).format(self.babel_locale)
+            return text
+        is_negative = int(amount.is_signed())
+        amount = abs(amount).normalize()
+
+        integer_part, _, frac_part = f"{amount.quantize(self._quantum):f}".partition(".")
+        number = self._format_int(integer_part) + self._format_frac(frac_part or "0")
+        return self._prefix[is_negative] + number + self._suffix[is_negative]
+
+    def format_many(self, amounts: Iterable[Any]) -> List[str]:
+        """Отформатировать колонку сумм"""
+        return _format_many(self.format, amounts)
+
+    def __call__(self, amount: Any) -> str:
+        return self.format(amount)
+
+
+class DateTimeFormat:
+    """
+    Форматирование дат с настройками DateTimeTransformer для одной локали
+
+    Результат совпадает с DateTimeTransformer(...).format(locale), шаблоны babel
+    вычисляются один раз. Используйте get_datetime_format.
+    """
+
+    def __init__(
+        self,
+        locale: str,
+        date_style: Optional[str] = None,
+        time_style: Optional[str] = None,
+        time_zone: Optional[str] = None,
+    ) -> None:
+        self.locale = locale
+        self.babel_locale = _parse_locale(locale)
+        self.date_style = date_style
+        self.time_style = time_style
+        self.time_zone = time_zone
+        self._tzinfo = babel_dates.get_timezone(time_zone) if time_zone is not None else None
+
+        # babel hints list only style names, patterns are accepted as well
+        self._date_pattern: Any = babel_dates.get_date_format(
+            date_style or "medium", self.babel_locale  # type: ignore[arg-type]
+        )
+        self._time_pattern: Any = None
+        self._datetime_format = ""
+        if time_style is not None:
+            self._time_pattern = babel_dates.get_time_format(
+                time_style, self.babel_locale  # type: ignore[arg-type]
+            )
+            if date_style is not None:
+                self._datetime_format = str(
+                    babel_dates.get_datetime_format(
+                        date_style, locale=self.babel_locale  # type: ignore[arg-type]
+                    )
+                ).replace("'", "")
+
+    def _localize(self, value: date) -> date:
+        if not isinstance(value, datetime):
+            return value
+        if value.tzinfo is None:
+            # fluent_compiler treats naive datetimes as UTC
+            value = value.replace(tzinfo=timezone.utc)
+        if self._tzinfo is not None:
+            value = value.astimezone(self._tzinfo)
+        return value
+
+    def format(self, value: Any) -> str:
+        """Отформатировать date/datetime, None -> пустая строка, строки без изменений"""
+        if value is None:
+            return ""
+        if isinstance(value, str):
+            return value
+        if not isinstance(value, date):
+            raise TypeError(f"Can't format object {value!r} of type {type(value)} as a date")
+        if self._time_pattern is not None and not isinstance(value, datetime):
+            # the same error as fluent_date(date, timeStyle=...)
+            fluent_date(value, timeStyle=self.time_style)
+
+        value = self._localize(value)
+        locale = self.babel_locale
+        if self._time_pattern is None:
+            return babel_dates.format_date(value, self._date_pattern, locale=locale)
+        if self.date_style is None:
+            return babel_dates.format_time(value, self._time_pattern, locale=locale)
+        return self._datetime_format.replace(
+            "{0}", babel_dates.format_time(value, self._time_pattern, tzinfo=None, locale=locale)
+        ).replace("{1}", babel_dates.format_date(value, self._date_pattern, locale=locale))
+
+    def format_many(self, values: Iterable[Any]) -> List[str]:
+        """Отформатировать колонку дат"""
+        return _format_many(self.format, values)
+
+    def __call__(self, value: Any) -> str:
+        return self.format(value)
+
+
+@lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def get_money_format(locale: str, currency: str, **options: Any) -> MoneyFormat:
+    """
+    Закэшированный MoneyFormat для (локаль, валюта, опции)
+
+    Args:
+        locale: Локаль, например "ru"
+        currency: Код валюты ISO 4217
+        **options: Опции MoneyTransformer (currency_display, use_grouping, ...)
+    """
+    return MoneyFormat(locale, currency, **options)
+
+
+@lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def get_datetime_format(
+    locale: str,
+    date_style: Optional[str] = None,
+    time_style: Optional[str] = None,
+    time_zone: Optional[str] = None,
+) -> DateTimeFormat:
+    """Закэшированный DateTimeFormat для (локаль, стили, часовой пояс)"""
+    return DateTimeFormat(locale, date_style, time_style, time_zone)
@@ -1,4 +1,6 @@
 # coding=utf-8
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
 from fluent_compiler.bundle import FluentBundle
 
@@ -6,12 +8,52 @@ from ..abc import AbstractTranslator
 
 
 class FluentTranslator(AbstractTranslator):
-    def __init__(self, locale: str, translator: FluentBundle, separator: str = "-"):
+    def __init__(
+        self, locale: str, translator: FluentBundle, separator: str = "-", cache_size: int = 0
+    ):
+        """
+        Args:
+            locale: Локаль
+            translator: FluentBundle с сообщениями локали
+            separator: Разделитель частей ключа
+            cache_size: Размер кэша отформатированных сообщений (0 - без кэша). Кэшируются
+                только вызовы с hashable аргументами
+        """
         self.locale = locale
         self.translator = translator
         self.separator = separator
+        self.cache_size = cache_size
+        if cache_size:
+            self._format_cached = lru_cache(maxsize=cache_size)(self._format_items)
 
     def get(self, key: str, **kwargs):
+        if self.cache_size:
+            # the type is a part of the key: 1, 1.0 and True are equal but format differently
+            items = tuple((name, type(value), value) for name, value in kwargs.items())
+            try:
+                return self._format_cached(key, items)
+            except TypeError:
+                # unhashable arguments
+                pass
+        return self._format(key, kwargs)
+
+    @property
+    def source_hash(self) -> Optional[str]:
+        """Хэш .ftl файлов бандла, None если бандл создан не FluentBundleCache"""
+        return getattr(self.translator, "source_hash", None)
+
+    def message_ids(self) -> List[str]:
+        """Ключи сообщений бандла, без термов и атрибутов"""
+        return [
+            message_id
+            for message_id in self.translator._compiled_messages
+            if self.translator.has_message(message_id)
+        ]
+
+    def _format_items(self, key: str, items: Tuple[Tuple[str, type, Any], ...]) -> str:
+        return self._format(key, {name: value for name, _, value in items})
+
+    def _format(self, key: str, kwargs: Dict[str, Any]) -> str:
         text, errors = self.translator.format(key, kwargs)
         if errors:
             raise errors.pop()
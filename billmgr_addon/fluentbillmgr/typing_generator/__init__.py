@@ -1,3 +1,4 @@
+from .parse_cache import ParsedFTLCache
 from .parsed_ftl import ParsedRawFTL
 from .renderable_items import InternalMethod, Knot, Method
 from .stubs import Stubs
@@ -8,6 +9,7 @@ __all__ = [
     "InternalMethod",
     "Knot",
     "Method",
+    "ParsedFTLCache",
     "ParsedRawFTL",
     "Stubs",
     "Translation",
@@ -0,0 +1,87 @@
+import contextlib
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from .translation_dto import Translation
+
+CACHE_FORMAT_VERSION = 1
+
+
+def _parser_version() -> str:
+    try:
+        from importlib.metadata import version
+
+        return version("fluent.syntax")
+    except ImportError:
+        # PackageNotFoundError is an ImportError as well
+        return "unknown"
+
+
+class ParsedFTLCache:
+    """
+    Кэш результатов ParsedRawFTL на диске
+
+    Ключ - sha1 содержимого .ftl файла, версия fluent.syntax и формата кэша, поэтому
+    одинаковые файлы разбираются один раз, а измененные получают новую запись.
+
+    Файлы кэша загружаются через pickle: каталог должен быть доверенным, то есть
+    доступным на запись только пользователю, который генерирует stubs.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self._salt = f"{CACHE_FORMAT_VERSION}:{_parser_version()}:{sys.version_info[:2]}"
+
+    def key(self, data: bytes) -> str:
+        digest = hashlib.sha1(self._salt.encode())  # noqa: S324
+        digest.update(data)
+        return digest.hexdigest()
+
+    def get(self, data: bytes) -> Optional[Dict[str, Translation]]:
+        # the cache directory is trusted, see the class docstring
+        try:
+            with (self.path / f"{self.key(data)}.cache").open("rb") as fh:
+                messages: Dict[str, Translation] = pickle.load(fh)  # noqa: S301
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            return None
+        return messages
+
+    def set(self, data: bytes, messages: Dict[str, Translation]) -> None:
+        try:
+            payload = pickle.dumps(messages, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            # unpicklable messages, the cache is optional: parsed again next time
+            return
+
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        except OSError:
+            return
+
+        replaced = False
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(payload)
+            # parallel CI jobs may write the same entry, replace is atomic
+            Path(tmp_name).replace(self.path / f"{self.key(data)}.cache")
+            replaced = True
+        except OSError:
+            return
+        finally:
+            if not replaced:
+                with contextlib.suppress(OSError):
+                    Path(tmp_name).unlink()
+
+    def clear(self) -> int:
+        """Удалить все файлы кэша, возвращает количество удаленных файлов"""
+        removed = 0
+        for cache_file in self.path.glob("*.cache"):
+            cache_file.unlink()
+            removed += 1
+        return removed
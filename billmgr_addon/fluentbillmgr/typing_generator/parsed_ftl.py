@@ -160,17 +160,24 @@ class ParsedRawFTL:
 
     def _parse_body(self) -> Dict[str, Node]:
         self.nodes: Dict[str, Node] = {}
-        for message in self.parsed_ftl.body:
-            if not isinstance(message, Message):
-                # TODO: other Entry
-                continue
-            if message.value is None:
-                continue
-            try:
-                self.nodes[message.id.name] = self._parse_message(message)
-            except ReferenceNotExists:
-                self.parsed_ftl.body.append(message)
-                continue
+        # TODO: other Entry
+        pending = [
+            message
+            for message in self.parsed_ftl.body
+            if isinstance(message, Message) and message.value is not None
+        ]
+        # messages referencing messages defined later are retried after each pass,
+        # references that never resolve (missing or cyclic) are skipped
+        while pending:
+            deferred = []
+            for message in pending:
+                try:
+                    self.nodes[message.id.name] = self._parse_message(message)
+                except ReferenceNotExists:
+                    deferred.append(message)
+            if len(deferred) == len(pending):
+                break
+            pending = deferred
         return self.nodes
 
     def get_messages(self) -> Dict[str, Translation]:
@@ -1,3 +1,4 @@
+from pathlib import Path
 from typing import Iterator
 
 from .renderable_items import InternalMethod, Knot, Method, Runner, Var
@@ -33,9 +34,16 @@ class Stubs:
                         knot.add_var(Var(name, sub_node.path))
             yield knot.render()
 
-    def to_file(self, file_name: str) -> None:
-        with open(file_name, "w", encoding="utf-8") as f:
-            f.write(self.content)
+    def to_file(self, file_name: str) -> bool:
+        # an unchanged file is not rewritten, so watchers and IDEs do not reload it
+        path = Path(file_name)
+        try:
+            if path.read_text(encoding="utf-8") == self.content:
+                return False
+        except FileNotFoundError:
+            pass
+        path.write_text(self.content, encoding="utf-8")
+        return True
 
     def echo(self) -> str:
         return self.content
@@ -191,6 +191,8 @@ config.toml
 deploy.toml
 xml/build.xml
 logs/
+app/i18n/.cache/
+processing_module.sock*
 """
 
     def _get_main_init_template(self) -> str:
@@ -552,8 +554,9 @@ def execute(
     def _get_processing_module_features_template(self) -> str:
         return '''# -*- coding: utf-8 -*-
 
-import xml.etree.ElementTree as ET
 from billmgr_addon import MgrResponse, ProcessingModuleResponse, LOGGER
+from billmgr_addon.core.processing_module import batched_command
+from billmgr_addon.core.xml_backend import ET
 
 
 class FeaturesResponse(MgrResponse):
@@ -683,17 +686,15 @@ def stop_command(item_id=None, runningoperation=None, **kwargs):
         return ProcessingModuleResponse("error")
 
 
-def stat_command(module_id=None, **kwargs):
-    """Команда stat - сбор статистики"""
-    LOGGER.info(f"Collecting stats for module {module_id} in project ${project_name}")
-    
-    try:
-        LOGGER.info(f"Stats collected successfully for module {module_id}")
-        return ProcessingModuleResponse("ok")
-        
-    except Exception as e:
-        LOGGER.exception(f"Error collecting stats for module {module_id}: {e}")
-        return ProcessingModuleResponse("error")
+def collect_stats(items):
+    """Сбор статистики пачки услуг, возвращает {item_id: результат или исключение}"""
+    item_ids = [item.id for item in items]
+    LOGGER.info(f"Collecting stats for items {item_ids} in project ${project_name}")
+    return {item.id: None for item in items}
+
+
+# Команда stat - услуги модуля загружаются одним запросом и обрабатываются пачками
+stat_command = batched_command(collect_stats)
 '''
 
     def _get_processing_module_cli_template(self) -> str:
@@ -1645,8 +1646,12 @@ class I18nEnum:
 '''
 
     def _get_i18n_factory_template(self) -> str:
-        return '''from fluent_compiler.bundle import FluentBundle
-from billmgr_addon.fluentbillmgr import FluentTranslator, TranslatorHub
+        return '''from billmgr_addon.fluentbillmgr import (
+    FluentBundleCache,
+    FluentTranslator,
+    TranslationKeyIndex,
+    TranslatorHub,
+)
 
 
 class Language:
@@ -1654,25 +1659,29 @@ class Language:
     EN: str = 'en'
 
 def i18n_factory(project_path: str) -> TranslatorHub:
+    # compiled bundles are cached in app/i18n/.cache, see billmgr-addon build-i18n-cache
+    cache = FluentBundleCache(f"{project_path}/app/i18n/.cache")
+
+    def translator_factory(locale: str):
+        # the bundle is loaded on the first request in this locale
+        return lambda: FluentTranslator(
+            locale=locale,
+            translator=cache.get_bundle(
+                locale=locale,
+                filenames=[f"{project_path}/app/i18n/locales/{locale}/LC_MESSAGES/txt.ftl"],
+            ),
+            cache_size=1024,
+        )
+
     return TranslatorHub(
         locales_map={Language.RU: (Language.RU, Language.EN), Language.EN: Language.EN},
-        translators=[
-            FluentTranslator(
-                locale=Language.RU,
-                translator=FluentBundle.from_files(
-                    locale=Language.RU,
-                    filenames=[f"{project_path}/app/i18n/locales/ru/LC_MESSAGES/txt.ftl"],
-                ),
-            ),
-            FluentTranslator(
-                locale=Language.EN,
-                translator=FluentBundle.from_files(
-                    locale=Language.EN,
-                    filenames=[f"{project_path}/app/i18n/locales/en/LC_MESSAGES/txt.ftl"],
-                ),
-            ),
-        ],
+        translator_factories={
+            Language.RU: translator_factory(Language.RU),
+            Language.EN: translator_factory(Language.EN),
+        },
         root_locale=Language.RU,
+        # built by billmgr-addon build-i18n-index, without it keys are searched in every locale
+        key_index=TranslationKeyIndex.load(f"{project_path}/app/i18n/.cache/keys.json"),
     )
 
 '''
@@ -4,6 +4,7 @@
 import ipaddress
 import json
 import ssl
+import threading
 from dataclasses import dataclass
 from typing import Optional, Union
 
@@ -12,9 +13,13 @@ from flask import current_app, request
 from flask_login import current_user
 
 from ..utils.logging import setup_logger
+from .metrics import api_request_timer
+from .profiling import profile_call
 
 logger = setup_logger(__name__)
 
+_shared_api_lock = threading.Lock()
+
 
 class BillmgrError(Exception):
     def __init__(self, message, original_exception=None):
@@ -59,9 +64,18 @@ def get_billmgr_api_as_config_user():
     """
     Получить API клиент для пользователя из конфигурации
 
+    С BILLMGR_API_KEEP_SESSION в конфиге приложения клиент и его HTTP соединения
+    общие для всех вызовов в процессе (резидентный processing module).
+
     Returns:
         BillmgrAPI: Клиент API для пользователя из конфига
     """
+    keep_session = bool(current_app.config.get("BILLMGR_API_KEEP_SESSION"))
+    if keep_session:
+        billmgr_api = current_app.extensions.get("billmgr_api_config_user")
+        if billmgr_api is not None:
+            return billmgr_api
+
     billmgr_api = BillmgrAPI(
         auth_info=[
             current_app.config.get("BILLMGR_API_USER"),
@@ -69,7 +83,13 @@ def get_billmgr_api_as_config_user():
         ],
         url=current_app.config.get("BILLMGR_API_URL"),
         interface=current_app.config.get("BILLMGR_API_USE_INTERFACE"),
+        keep_session=keep_session,
     )
+    if keep_session:
+        with _shared_api_lock:
+            shared = current_app.extensions.setdefault("billmgr_api_config_user", billmgr_api)
+            shared.start_session()
+        billmgr_api = shared
     return billmgr_api
 
 
@@ -198,7 +218,8 @@ class BillmgrAPI:
             )
 
             try:
-                response: httpx.Response = client.request_session.send(built_request)
+                with profile_call("api"), api_request_timer(self.__class__.func_name):
+                    response: httpx.Response = client.request_session.send(built_request)
             except httpx.NetworkError as e:
                 raise BillmgrRequestError("Network error occured", original_exception=e)
             except httpx.TimeoutException as e:
@@ -223,7 +244,10 @@ class BillmgrAPI:
             )
 
             try:
-                response: httpx.Response = await client.async_request_session.send(built_request)
+                with profile_call("api"), api_request_timer(self.__class__.func_name):
+                    response: httpx.Response = await client.async_request_session.send(
+                        built_request
+                    )
             except httpx.NetworkError as e:
                 raise BillmgrRequestError("Network error occured", original_exception=e)
             except httpx.TimeoutException as e:
@@ -245,6 +269,8 @@ class BillmgrAPI:
         headers: Optional[dict] = None,
         cookies: Optional[dict] = None,
         timeout: Optional[float] = None,
+        *,
+        keep_session: bool = False,
     ):
         """
         Инициализировать клиент API
@@ -258,6 +284,9 @@ class BillmgrAPI:
             headers: Дополнительные заголовки
             cookies: Cookies для авторизации
             timeout: Таймаут запросов
+            keep_session: Не закрывать сессию при выходе из with, закрывается только
+                close_session(force=True). Асинхронная сессия у каждого потока своя (она
+                привязана к event loop потока) и закрывается при выходе из внешнего async with
         """
         self.url = url
         self.interface = interface
@@ -277,8 +306,18 @@ class BillmgrAPI:
         if auth_info:
             self.auth_info = [*auth_info]
 
+        self.keep_session = keep_session
         self.request_session: httpx.Client = None
-        self.async_request_session: httpx.AsyncClient = None
+        # async clients can't be shared between the event loops of different threads
+        self._async_local = threading.local()
+
+    @property
+    def async_request_session(self) -> Optional[httpx.AsyncClient]:
+        return getattr(self._async_local, "session", None)
+
+    @async_request_session.setter
+    def async_request_session(self, session: Optional[httpx.AsyncClient]):
+        self._async_local.session = session
 
     def start_session(self):
         new_session = None
@@ -294,7 +333,9 @@ class BillmgrAPI:
             self.request_session = new_session
         return new_session
 
-    def close_session(self):
+    def close_session(self, *, force: bool = False):
+        if self.keep_session and not force:
+            return
         if self.request_session:
             self.request_session.close()
             self.request_session = None
@@ -313,7 +354,9 @@ class BillmgrAPI:
             self.async_request_session = new_session
         return new_session
 
-    async def close_async_session(self):
+    async def close_async_session(self, *, force: bool = False):
+        if self.keep_session and not force:
+            return
         if self.async_request_session:
             await self.async_request_session.aclose()
             self.async_request_session = None
@@ -326,11 +369,17 @@ class BillmgrAPI:
         self.close_session()
 
     async def __aenter__(self):
+        self._async_local.depth = getattr(self._async_local, "depth", 0) + 1
         self.start_async_session()
         return self
 
     async def __aexit__(self, exc_type, exc_value, traceback):
-        await self.close_async_session()
+        self._async_local.depth -= 1
+        if not self.keep_session:
+            await self.close_async_session()
+        elif self._async_local.depth == 0:
+            # the session of this thread is not shared, but it can't outlive its event loop
+            await self.close_async_session(force=True)
 
     @classmethod
     def _get_request_session(
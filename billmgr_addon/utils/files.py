@@ -33,6 +33,8 @@ cgi_app_path = cwd_path.joinpath("cgi.py")
 cli_app_path = cwd_path.joinpath("cli.py")
 xml_build_path = xml_path.joinpath("build.xml")
 processing_module_cli_path = cwd_path.joinpath("processing_module_cli.py")
+processing_module_socket_path = cwd_path.joinpath("processing_module.sock")
+processing_module_client_path = Path(__file__).resolve().parent / "processing_module_client.py"
 
 mgr_path = Path("/usr/local/mgr5")
 mgr_plugin_handlers_path = mgr_path.joinpath("addon")
@@ -154,7 +156,10 @@ def create_processing_module_xml_file(
 
 
 def _create_processing_module_script(
-    link_path: Union[Path, str], server_app_folder: Optional[Union[Path, str]] = None
+    link_path: Union[Path, str],
+    server_app_folder: Optional[Union[Path, str]] = None,
+    *,
+    resident: bool = False,
 ) -> None:
     """
     Создать bash-скрипт для processing module
@@ -162,48 +167,74 @@ def _create_processing_module_script(
     Args:
         link_path: Путь к создаваемому скрипту
         server_app_folder: Путь к папке приложения на сервере
+        resident: Выполнять команды через резидентный сервер processing module
     """
     if server_app_folder:
         server_app_folder = Path(server_app_folder)
         actual_interpreter = server_app_folder / "venv/bin/python3"
         actual_processing_cli = server_app_folder / "processing_module_cli.py"
         actual_project_path = server_app_folder
+        actual_socket = server_app_folder / "processing_module.sock"
     else:
         actual_interpreter = interpreter_path
         actual_processing_cli = processing_module_cli_path
         actual_project_path = cwd_path
+        actual_socket = processing_module_socket_path
+
+    if resident:
+        # the client imports only the standard library, site-packages are not needed
+        command = (
+            f"exec {actual_interpreter} -S {processing_module_client_path} "
+            f'--socket {actual_socket} --cli {actual_processing_cli} -- "$@"'
+        )
+    else:
+        command = f'{actual_interpreter} {actual_processing_cli} "$@"'
 
     file_content = f"""#!/bin/bash
 export PYTHONIOENCODING=utf-8
 export LANG=ru_RU.UTF-8
 cd {actual_project_path}
-{actual_interpreter} {actual_processing_cli} "$@"
+{command}
 """
     _create_executable_file(link_path, file_content)
 
 
 def create_plugin_processing_module_script(
-    plugin_name: str, server_app_folder: Optional[Union[Path, str]] = None
+    plugin_name: str,
+    server_app_folder: Optional[Union[Path, str]] = None,
+    *,
+    resident: bool = False,
 ) -> Path:
     """
     Создать processing module script для плагина
 
+    Запущенный резидентный сервер останавливается, чтобы следующая команда
+    выполнилась новой версией кода.
+
     Args:
         plugin_name: Имя плагина
         server_app_folder: Путь к папке приложения на сервере
+        resident: Выполнять команды через резидентный сервер processing module
 
     Returns:
         Путь к созданному скрипту
     """
+    from .processing_module_client import stop_server
+
     link_path = mgr_processing_path.joinpath(f"pm{plugin_name}")
-    _create_processing_module_script(link_path, server_app_folder)
+    _create_processing_module_script(link_path, server_app_folder, resident=resident)
+    project_path = Path(server_app_folder) if server_app_folder else cwd_path
+    stop_server(str(project_path / "processing_module.sock"))
     return link_path
 
 
 def create_plugin_symlinks(
     plugin_name: str, 
     server_app_folder: Optional[Union[Path, str]] = None,
-    install_processing_module: bool = False
+    # positional in earlier releases
+    install_processing_module: bool = False,  # noqa: FBT001, FBT002
+    *,
+    processing_module_server: bool = False,
 ) -> dict:
     """
     Создать все ссылки для плагина
@@ -212,6 +243,7 @@ def create_plugin_symlinks(
         plugin_name: Имя плагина
         server_app_folder: Путь к папке приложения на сервере
         install_processing_module: Устанавливать ли processing module script
+        processing_module_server: Выполнять команды processing module резидентным сервером
 
     Returns:
         Словарь с путями к созданным ссылкам
@@ -236,7 +268,9 @@ def create_plugin_symlinks(
         if processing_cli_exists:
             links["processing_module_xml"] = create_processing_module_xml_file(plugin_name, server_app_folder)
             
-            links["processing_module_script"] = create_plugin_processing_module_script(plugin_name, server_app_folder)
+            links["processing_module_script"] = create_plugin_processing_module_script(
+                plugin_name, server_app_folder, resident=processing_module_server
+            )
 
     return links
 
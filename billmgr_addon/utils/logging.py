@@ -1,15 +1,19 @@
 # -*- coding: utf-8 -*-
 
+import atexit
+import copy
 import logging
+import queue
+import random
 import sys
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, SysLogHandler
 from pathlib import Path
-from typing import Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from billmgr_addon.core.config import get_logs_path, get_project_root
 
 LOGGER_NAME = "billmgr_addon"
-LOGGER = None
+LOGGER: logging.Logger
 
 
 def _create_default_logger():
@@ -28,6 +32,50 @@ def _create_default_logger():
 
 LOGGER = _create_default_logger()
 
+_QUEUE_LISTENERS: Dict[str, QueueListener] = {}
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler, который передает запись в очередь без полного форматирования
+
+    Очередь живет в том же процессе, поэтому запись не нужно готовить к pickle.
+    Сообщение (msg % args) собирается в потоке запроса: изменяемые аргументы
+    попадают в лог в состоянии на момент вызова, ошибки форматирования видны у
+    вызывающего. Отложенными остаются только записи, все аргументы которых
+    PayloadPreview неизменяемых данных (str, bytes, числа), и форматирование
+    обработчиками (время, уровень, traceback).
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if not args:
+            return record
+        if isinstance(args, tuple) and all(
+            isinstance(arg, PayloadPreview) and arg.is_immutable() for arg in args
+        ):
+            return record
+        message = record.getMessage()
+        # other handlers of the logger must get the original record
+        record = copy.copy(record)
+        record.msg = message
+        record.args = None
+        return record
+
+
+def _stop_queue_listener(name: str) -> None:
+    listener = _QUEUE_LISTENERS.pop(name, None)
+    if listener is not None:
+        listener.stop()
+
+
+def _stop_queue_listeners() -> None:
+    for name in list(_QUEUE_LISTENERS):
+        _stop_queue_listener(name)
+
+
+atexit.register(_stop_queue_listeners)
+
 
 def setup_logger(
     name: Optional[str] = None,
@@ -40,6 +88,10 @@ def setup_logger(
     backup_count: int = 5,
     enable_console: bool = True,
     enable_file: bool = True,
+    *,
+    use_queue: bool = False,
+    syslog_address: Union[str, Tuple[str, int], None] = None,
+    syslog_facility: int = SysLogHandler.LOG_USER,
 ) -> logging.Logger:
     """
     Настроить логгер для плагина
@@ -55,6 +107,12 @@ def setup_logger(
         backup_count: Количество резервных файлов
         enable_console: Включить вывод в консоль
         enable_file: Включить вывод в файл
+        use_queue: Писать логи в фоновом потоке через QueueHandler/QueueListener,
+            обработчики не блокируют запрос, очередь сбрасывается при выходе
+        syslog_address: Адрес syslog (путь Unix сокета, например "/dev/log", или
+            (host, port)). Если указан, вместо файла логи отправляются в syslog,
+            что безопасно для одновременно работающих CGI процессов
+        syslog_facility: Facility для syslog
 
     Returns:
         logging.Logger: Настроенный логгер
@@ -66,7 +124,9 @@ def setup_logger(
     else:
         logger = logging.getLogger()
 
+    listener_name = name or ""
     if remove_default_handlers:
+        _stop_queue_listener(listener_name)
         for handler in list(logger.handlers):
             logger.removeHandler(handler)
 
@@ -76,8 +136,16 @@ def setup_logger(
     detailed_format = "%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]"
     simple_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     console_format = "%(levelname)s: %(message)s"
+    syslog_format = "%(name)s[%(process)d]: %(levelname)s: %(message)s"
+
+    handlers: List[logging.Handler] = []
 
-    if enable_file:
+    if enable_file and syslog_address is not None:
+        syslog_handler = SysLogHandler(address=syslog_address, facility=syslog_facility)
+        syslog_handler.setFormatter(logging.Formatter(syslog_format))
+        syslog_handler.setLevel(log_level)
+        handlers.append(syslog_handler)
+    elif enable_file:
         if path is None:
             try:
                 logs_path = get_logs_path()
@@ -107,7 +175,7 @@ def setup_logger(
         )
         file_handler.setFormatter(logging.Formatter(detailed_format))
         file_handler.setLevel(log_level)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
 
     if enable_console:
         console_handler = None
@@ -126,13 +194,119 @@ def setup_logger(
 
         if console_handler:
             console_handler.setLevel(log_level)
-            logger.addHandler(console_handler)
+            handlers.append(console_handler)
+
+    if use_queue and handlers:
+        previous_listener = _QUEUE_LISTENERS.pop(listener_name, None)
+        if previous_listener is not None:
+            # the logger already has a QueueHandler for this queue
+            previous_listener.stop()
+            log_queue = previous_listener.queue
+            handlers = list(previous_listener.handlers) + handlers
+        else:
+            log_queue = queue.SimpleQueue()
+            logger.addHandler(_DeferredQueueHandler(log_queue))
+
+        listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        listener.start()
+        _QUEUE_LISTENERS[listener_name] = listener
+    else:
+        for handler in handlers:
+            logger.addHandler(handler)
 
     return logger
 
 
+class PayloadPreview:
+    """
+    Отложенное представление данных для лога
+
+    Форматируется только при выводе записи обработчиком и укорачивается до
+    max_length символов, bytes декодируются только в пределах превью.
+    """
+
+    __slots__ = ("payload", "max_length")
+
+    _IMMUTABLE_TYPES = (str, bytes, int, float, type(None))
+
+    def __init__(self, payload: Any, max_length: int) -> None:
+        self.payload = payload
+        self.max_length = max_length
+
+    def is_immutable(self) -> bool:
+        """Превью можно отформатировать позже: данные не изменятся после записи в лог"""
+        return isinstance(self.payload, self._IMMUTABLE_TYPES)
+
+    def __str__(self) -> str:
+        payload, max_length = self.payload, self.max_length
+        if isinstance(payload, (bytes, bytearray)):
+            # a UTF-8 character takes at most 4 bytes
+            text = bytes(payload[: max_length * 4 + 1]).decode("utf-8", errors="replace")
+        elif isinstance(payload, str):
+            text = payload
+        else:
+            text = repr(payload)
+
+        if len(text) > max_length:
+            total = len(payload) if isinstance(payload, (bytes, bytearray, str)) else len(text)
+            return f"{text[:max_length]}... [{total} total]"
+        return text
+
+
+class _PayloadLogging:
+    max_length = 2048
+    sample_rate = 1.0
+
+
+def configure_payload_logging(
+    max_length: Optional[int] = None, sample_rate: Optional[float] = None
+) -> None:
+    """
+    Настроить отладочное логирование данных запросов и ответов
+
+    Args:
+        max_length: Максимальная длина превью каждого поля
+        sample_rate: Доля запросов, для которых пишутся данные (0.0 - 1.0)
+    """
+    if max_length is not None:
+        _PayloadLogging.max_length = max_length
+    if sample_rate is not None:
+        _PayloadLogging.sample_rate = sample_rate
+
+
+def log_debug_payload(event: str, logger: Optional[logging.Logger] = None, **fields: Any) -> None:
+    """
+    Записать событие с данными на уровне DEBUG
+
+    Сообщение форматируется отложенно, поля укорачиваются (см. PayloadPreview).
+    Исходные значения доступны обработчикам в атрибутах записи event и payload.
+
+    Args:
+        event: Имя события
+        logger: Логгер, по умолчанию LOGGER
+        **fields: Поля события
+    """
+    if logger is None:
+        logger = logging.getLogger(LOGGER_NAME)
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+
+    sample_rate = _PayloadLogging.sample_rate
+    # sampling, not security
+    if sample_rate < 1.0 and random.random() >= sample_rate:  # noqa: S311
+        return
+
+    max_length = _PayloadLogging.max_length
+    message = event + "".join(f" {name}=%s" for name in fields)
+    args = tuple(PayloadPreview(value, max_length) for value in fields.values())
+    logger.debug(message, *args, extra={"event": event, "payload": fields}, stacklevel=2)
+
+
 __all__ = [
     "setup_logger",
     "LOGGER",
     "LOGGER_NAME",
+    "PayloadPreview",
+    "configure_payload_logging",
+    "log_debug_payload",
 ]
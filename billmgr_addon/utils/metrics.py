@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+
+"""
+Метрики плагина в формате Prometheus
+
+Метрики собираются только после enable_metrics() (MgrRouter вызывает ее при
+METRICS_ENABLED = true в конфигурации) и требуют prometheus_client
+(pip install billmgr-addon[metrics]).
+
+Для gunicorn с несколькими воркерами метрики хранятся в mmap файлах, по файлу на
+процесс, в директории METRICS_MULTIPROC_DIR (переменная окружения
+PROMETHEUS_MULTIPROC_DIR). Директорию нужно очищать при старте сервера, а в
+gunicorn.conf.py вызывать mark_process_dead() из хука child_exit.
+
+Настройки Flask приложения (config.toml):
+    METRICS_ENABLED: Включить сбор метрик (по умолчанию False)
+    METRICS_MULTIPROC_DIR: Директория mmap файлов для нескольких процессов
+    METRICS_TOKEN: Токен доступа к MetricsEndpoint (Authorization: Bearer <token>)
+"""
+
+import os
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, ContextManager, Optional, Tuple, Union
+
+from .logging import LOGGER
+
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+# the action label of requests without a registered endpoint, keeps the label set bounded
+UNKNOWN_ACTION = "unknown"
+
+_NULL_TIMER = nullcontext()
+
+
+class PluginMetrics:
+    """Метрики запросов, ошибок, БД, BILLmanager API и i18n"""
+
+    def __init__(self, registry: Any = None) -> None:
+        from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+
+        if registry is None:
+            registry = REGISTRY
+
+        self.requests_total = Counter(
+            "billmgr_addon_requests_total",
+            "Plugin action requests",
+            ["action"],
+            registry=registry,
+        )
+        self.request_duration = Histogram(
+            "billmgr_addon_request_duration_seconds",
+            "Plugin action request duration",
+            ["action"],
+            registry=registry,
+        )
+        self.errors_total = Counter(
+            "billmgr_addon_errors_total",
+            "Plugin action errors",
+            ["action", "type"],
+            registry=registry,
+        )
+        self.db_query_duration = Histogram(
+            "billmgr_addon_db_query_duration_seconds",
+            "Database query duration",
+            registry=registry,
+        )
+        self.db_connections = Gauge(
+            "billmgr_addon_db_connections",
+            "Open database connections",
+            registry=registry,
+            multiprocess_mode="livesum",
+        )
+        self.api_request_duration = Histogram(
+            "billmgr_addon_api_request_duration_seconds",
+            "BILLmanager API request duration",
+            ["func"],
+            registry=registry,
+        )
+        self.i18n_lookups_total = Counter(
+            "billmgr_addon_i18n_lookups_total",
+            "Translator lookups",
+            ["locale"],
+            registry=registry,
+        )
+
+
+_metrics: Optional[PluginMetrics] = None
+
+
+def get_metrics() -> Optional[PluginMetrics]:
+    """Метрики плагина или None, если сбор метрик не включен"""
+    return _metrics
+
+
+def enable_metrics(multiprocess_dir: Union[Path, str, None] = None) -> PluginMetrics:
+    """
+    Включить сбор метрик
+
+    Args:
+        multiprocess_dir: Директория mmap файлов для режима нескольких процессов.
+            Должна быть задана до первого импорта prometheus_client
+
+    Returns:
+        PluginMetrics: Метрики плагина
+    """
+    global _metrics
+    if _metrics is not None:
+        return _metrics
+
+    if multiprocess_dir is not None:
+        Path(multiprocess_dir).mkdir(parents=True, exist_ok=True)
+        os.environ.setdefault(MULTIPROC_DIR_ENV, str(multiprocess_dir))
+
+    try:
+        import prometheus_client  # noqa: F401
+    except ImportError:
+        raise ImportError(
+            "prometheus_client is not available. Install with: pip install billmgr-addon[metrics]"
+        ) from None
+
+    _metrics = PluginMetrics()
+    LOGGER.debug(f"Metrics enabled, multiprocess dir: {os.environ.get(MULTIPROC_DIR_ENV)}")
+    return _metrics
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Метрики в текстовом формате Prometheus
+
+    Returns:
+        Тело ответа и его Content-Type
+    """
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+
+    registry = REGISTRY
+    if os.environ.get(MULTIPROC_DIR_ENV):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)  # type: ignore[no-untyped-call]
+
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int) -> None:
+    """Удалить live метрики завершенного воркера (хук child_exit gunicorn)"""
+    if os.environ.get(MULTIPROC_DIR_ENV):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(pid)  # type: ignore[no-untyped-call]
+
+
+def request_timer(action: Optional[str]) -> ContextManager[Any]:
+    """
+    Время обработки запроса
+
+    Args:
+        action: Имя зарегистрированного эндпоинта, None - запрос без эндпоинта
+    """
+    if _metrics is None:
+        return _NULL_TIMER
+    action = UNKNOWN_ACTION if action is None else action
+    _metrics.requests_total.labels(action=action).inc()
+    return _metrics.request_duration.labels(action=action).time()
+
+
+def count_error(action: Optional[str], error_type: str) -> None:
+    if _metrics is not None:
+        action = UNKNOWN_ACTION if action is None else action
+        _metrics.errors_total.labels(action=action, type=error_type).inc()
+
+
+def db_query_timer() -> ContextManager[Any]:
+    if _metrics is None:
+        return _NULL_TIMER
+    return _metrics.db_query_duration.time()
+
+
+def track_db_connection(delta: int) -> None:
+    if _metrics is not None:
+        _metrics.db_connections.inc(delta)
+
+
+def api_request_timer(func_name: str) -> ContextManager[Any]:
+    if _metrics is None:
+        return _NULL_TIMER
+    return _metrics.api_request_duration.labels(func=func_name).time()
+
+
+def count_i18n_lookup(locale: str) -> None:
+    if _metrics is not None:
+        _metrics.i18n_lookups_total.labels(locale=locale).inc()
+
+
+__all__ = [
+    "PluginMetrics",
+    "get_metrics",
+    "enable_metrics",
+    "render_metrics",
+    "mark_process_dead",
+    "request_timer",
+    "count_error",
+    "db_query_timer",
+    "track_db_connection",
+    "api_request_timer",
+    "count_i18n_lookup",
+]
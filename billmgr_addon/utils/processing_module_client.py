@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Тонкий клиент резидентного processing module
+
+Скрипт processing/pm<plugin> запускает этот файл по пути (python -S), поэтому
+импортируется только стандартная библиотека. Аргументы, переменные окружения и
+stdin команды передаются серверу (billmgr-addon processing-module-server) через Unix
+сокет, клиент печатает вывод команды и завершается с ее кодом. Если сервер не
+запущен, клиент запускает его в фоне и выполняет команду обычным
+processing_module_cli.py.
+"""
+
+import argparse
+import json
+import os
+import select
+import socket
+import subprocess
+import sys
+from typing import List
+
+CONNECT_TIMEOUT = 1
+# how long to wait for stdin data that a caller keeps open without writing
+STDIN_TIMEOUT = 1
+
+
+def _read_all(client: socket.socket) -> bytes:
+    chunks: List[bytes] = []
+    while True:
+        chunk = client.recv(65536)
+        if not chunk:
+            return b"".join(chunks)
+        chunks.append(chunk)
+
+
+def stop_server(socket_path: str, timeout: float = 5) -> bool:
+    """
+    Остановить сервер, например после деплоя новой версии
+
+    Returns:
+        True, если сервер был запущен
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(timeout)
+            client.connect(socket_path)
+            client.sendall(b'{"stop": true}\n')
+            _read_all(client)
+    except OSError:
+        return False
+    return True
+
+
+def _read_stdin() -> str:
+    # a terminal is not read, a pipe left open without data must not block the command
+    if sys.stdin is None or sys.stdin.isatty():
+        return ""
+    readable, _, _ = select.select([sys.stdin], [], [], STDIN_TIMEOUT)
+    return sys.stdin.read() if readable else ""
+
+
+def _spawn_server(socket_path: str) -> None:
+    # a second server started by a concurrent client exits on the socket lock
+    subprocess.Popen(  # noqa: S603
+        [
+            sys.executable,
+            "-c",
+            "from billmgr_addon.cli import main; main()",
+            "processing-module-server",
+            "--socket",
+            socket_path,
+        ],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--socket", required=True)
+    parser.add_argument("--cli", required=True, help="processing_module_cli.py")
+    parser.add_argument("--no-spawn", action="store_true")
+    parser.add_argument("argv", nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+    argv = args.argv[1:] if args.argv[:1] == ["--"] else args.argv
+
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(CONNECT_TIMEOUT)
+    try:
+        client.connect(args.socket)
+    except OSError:
+        client.close()
+        if not args.no_spawn:
+            _spawn_server(args.socket)
+        # the command has not been sent, it is safe to run it in this process
+        os.execv(sys.executable, [sys.executable, args.cli, *argv])  # noqa: S606
+
+    with client:
+        # commands may run as long as they need
+        client.settimeout(None)
+        request = {"argv": argv, "env": dict(os.environ), "stdin": _read_stdin()}
+        client.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        data = _read_all(client)
+
+    try:
+        response = json.loads(data)
+    except ValueError:
+        # the command may have been executed, running it again could repeat it
+        sys.stderr.write("Processing module server closed the connection\n")
+        return 1
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+    return int(response["code"])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
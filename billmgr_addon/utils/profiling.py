@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+
+"""
+Профилирование запросов плагина
+
+Для запроса к эндпоинту создается RequestProfile, доступный через contextvar.
+Фазы обработки (разбор XML, пресеты, обработчик, patch_xml, сериализация),
+запросы к БД и вызовы BILLmanager API записывают в него время и количество.
+Если обработка заняла больше порога, профиль пишется в лог одной JSON строкой.
+Для выборки запросов дополнительно сохраняется профиль cProfile или pyinstrument.
+
+Настройки Flask приложения (config.toml):
+    PROFILING_ENABLED: Включить профилирование (по умолчанию False)
+    PROFILING_SLOW_THRESHOLD: Порог записи в лог в секундах (по умолчанию 1.0)
+    PROFILING_SAMPLE_RATE: Доля запросов, для которых сохраняется профиль (0.0 - 1.0)
+    PROFILING_PROFILER: cprofile или pyinstrument
+    PROFILING_PATH: Директория профилей (по умолчанию logs/profiles)
+"""
+
+import cProfile
+import json
+import os
+import random
+import re
+import time
+from contextlib import asynccontextmanager, nullcontext
+from contextvars import ContextVar
+from pathlib import Path
+from types import TracebackType
+from typing import Any, AsyncIterator, ContextManager, Dict, Optional, Type, Union
+
+from flask import Flask
+
+from billmgr_addon.core.config import get_logs_path
+
+from .logging import LOGGER
+
+try:
+    from pyinstrument import Profiler as _PyinstrumentProfiler
+
+    PYINSTRUMENT_AVAILABLE = True
+except ImportError:
+    _PyinstrumentProfiler = None
+    PYINSTRUMENT_AVAILABLE = False
+
+
+class RequestProfile:
+    """
+    Время фаз и счетчики вызовов одного запроса
+
+    Время вложенных фаз входит в объемлющие: parse, presets, db и api
+    выполняются внутри handler.
+    """
+
+    __slots__ = ("name", "started_at", "duration", "timings", "counters")
+
+    def __init__(self, name: Optional[str]) -> None:
+        self.name = name
+        self.started_at = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.timings: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+
+    def add_timing(self, name: str, seconds: float) -> None:
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def count(self, name: str, value: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def finish(self) -> float:
+        self.duration = time.perf_counter() - self.started_at
+        return self.duration
+
+    def to_dict(self) -> Dict[str, Any]:
+        duration = self.duration
+        if duration is None:
+            duration = time.perf_counter() - self.started_at
+
+        record: Dict[str, Any] = {"action": self.name, "total_ms": round(duration * 1000, 2)}
+        for name, seconds in self.timings.items():
+            record[f"{name}_ms"] = round(seconds * 1000, 2)
+        for name, value in self.counters.items():
+            record[f"{name}_count"] = value
+        return record
+
+    def to_log_line(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False, separators=(",", ":"))
+
+
+class _ProfilePhase:
+    __slots__ = ("profile", "name", "counted", "started_at")
+
+    def __init__(self, profile: RequestProfile, name: str, *, counted: bool) -> None:
+        self.profile = profile
+        self.name = name
+        self.counted = counted
+
+    def __enter__(self) -> "_ProfilePhase":
+        if self.counted:
+            self.profile.count(self.name)
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.profile.add_timing(self.name, time.perf_counter() - self.started_at)
+
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar(
+    "billmgr_addon_request_profile", default=None
+)
+
+_NULL_PHASE: ContextManager[Any] = nullcontext()
+
+
+def get_request_profile() -> Optional[RequestProfile]:
+    """Профиль текущего запроса или None, если профилирование выключено"""
+    return _current_profile.get()
+
+
+def profile_phase(name: str) -> ContextManager[Any]:
+    """Контекстный менеджер, добавляющий время блока к фазе name текущего запроса"""
+    profile = _current_profile.get()
+    if profile is None:
+        return _NULL_PHASE
+    return _ProfilePhase(profile, name, counted=False)
+
+
+def profile_call(name: str) -> ContextManager[Any]:
+    """То же, что profile_phase, но еще и считает количество вызовов (db, api)"""
+    profile = _current_profile.get()
+    if profile is None:
+        return _NULL_PHASE
+    return _ProfilePhase(profile, name, counted=True)
+
+
+class RequestProfiler:
+    """
+    Профилировщик запросов роутера
+
+    Args:
+        enabled: Включить профилирование
+        slow_threshold: Порог в секундах, начиная с которого профиль пишется в лог
+        sample_rate: Доля запросов, для которых сохраняется профиль
+        profiler: cprofile или pyinstrument
+        profiles_path: Директория для профилей, по умолчанию logs/profiles
+    """
+
+    profilers = ("cprofile", "pyinstrument")
+
+    def __init__(
+        self,
+        *,
+        enabled: bool = False,
+        slow_threshold: float = 1.0,
+        sample_rate: float = 0.0,
+        profiler: str = "cprofile",
+        profiles_path: Union[Path, str, None] = None,
+    ) -> None:
+        if profiler not in self.__class__.profilers:
+            raise ValueError(f"Unknown profiler '{profiler}'")
+
+        self.enabled = enabled
+        self.slow_threshold = slow_threshold
+        self.sample_rate = sample_rate
+        self.profiler = profiler
+        self.profiles_path = profiles_path
+
+    @classmethod
+    def from_flask_app(cls, app: Flask, prefix: str = "PROFILING") -> "RequestProfiler":
+        return cls(
+            enabled=bool(app.config.get(f"{prefix}_ENABLED", False)),
+            slow_threshold=float(app.config.get(f"{prefix}_SLOW_THRESHOLD", 1.0)),
+            sample_rate=float(app.config.get(f"{prefix}_SAMPLE_RATE", 0.0)),
+            profiler=app.config.get(f"{prefix}_PROFILER", "cprofile"),
+            profiles_path=app.config.get(f"{prefix}_PATH", None),
+        )
+
+    @asynccontextmanager
+    async def profile(self, name: Optional[str]) -> AsyncIterator[Optional[RequestProfile]]:
+        if not self.enabled:
+            yield None
+            return
+
+        profile = RequestProfile(name)
+        token = _current_profile.set(profile)
+        sampler = None
+        # sampling decision only, not security sensitive
+        if self.sample_rate > 0 and random.random() < self.sample_rate:  # noqa: S311
+            sampler = self._start_sampler()
+
+        try:
+            yield profile
+        finally:
+            duration = profile.finish()
+            _current_profile.reset(token)
+            if sampler is not None:
+                self._save_sampler(sampler, profile)
+            if duration >= self.slow_threshold:
+                LOGGER.warning(f"Slow request profile {profile.to_log_line()}")
+
+    def _start_sampler(self) -> Any:
+        if self.profiler == "pyinstrument":
+            if not PYINSTRUMENT_AVAILABLE:
+                LOGGER.warning("pyinstrument is not available, request profile is not saved")
+                return None
+            sampler = _PyinstrumentProfiler(async_mode="enabled")
+            sampler.start()
+            return sampler
+
+        sampler = cProfile.Profile()
+        try:
+            sampler.enable()
+        except ValueError:
+            # another profiler is already active in this thread
+            return None
+        return sampler
+
+    def _get_profiles_path(self) -> Path:
+        if self.profiles_path is not None:
+            return Path(self.profiles_path)
+        return get_logs_path() / "profiles"
+
+    def _save_sampler(self, sampler: Any, profile: RequestProfile) -> None:
+        name = re.sub(r"[^\w.-]", "_", str(profile.name))
+        filename = f"{time.strftime('%Y%m%d-%H%M%S')}_{name}_{os.getpid()}"
+        try:
+            profiles_path = self._get_profiles_path()
+            profiles_path.mkdir(parents=True, exist_ok=True)
+            if isinstance(sampler, cProfile.Profile):
+                sampler.disable()
+                sampler.dump_stats(profiles_path / f"{filename}.prof")
+            else:
+                sampler.stop()
+                (profiles_path / f"{filename}.html").write_text(
+                    sampler.output_html(), encoding="utf-8"
+                )
+        except Exception as e:  # noqa: BLE001
+            # a profile that could not be saved must not fail the request
+            LOGGER.exception(f"Could not save request profile: {e}")
+
+
+__all__ = [
+    "RequestProfile",
+    "RequestProfiler",
+    "get_request_profile",
+    "profile_phase",
+    "profile_call",
+]
@@ -67,3 +67,10 @@
 
 # def worker_abort(worker):
 #     worker.log.info("Worker received SIGABRT signal")
+
+
+# # При METRICS_ENABLED и METRICS_MULTIPROC_DIR
+# def child_exit(server, worker):
+#     from billmgr_addon.utils.metrics import mark_process_dead
+
+#     mark_process_dead(worker.pid)
@@ -8,7 +8,7 @@ setup(
     version="0.1.0",
     description="Universal framework for creating BILLmanager plugins",
     author="billmgr",
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks", "benchmarks.*", "tests", "tests.*"]),
     python_requires=">=3.8",
     install_requires=[
         "Flask[async]>=3.0.3",
@@ -18,7 +18,7 @@ setup(
         "tomlkit>=0.13.2",
         "pydantic>=2.9.2",
         "pycryptodome>=3.21.0",
-        "fluent-compiler>=1.1",
+        "fluent-compiler==1.1",
         "ordered-set>=4.1.0",
         "watchdog>=4.0.2",
         "click>=8.1.7",
@@ -32,8 +32,15 @@ setup(
         "mysqlclient": [
             "mysqlclient>=2.2.4",
         ],
+        "lxml": [
+            "lxml>=4.9",
+        ],
+        "metrics": [
+            "prometheus-client>=0.16",
+        ],
         "dev": [
             "mypy>=1.15.0",
+            "pytest>=7.0",
             "ruff>=0.10.0",
         ],
         "celery": [
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+FORM_XML = (
+    '<doc lang="ru" func="test.edit">'
+    '<metadata name="test.edit" type="form">'
+    '<form title="name">'
+    '<field name="group_name">'
+    '<input type="text" name="name" required="yes" maxlength="64">'
+    '<if value="off" hide="comment"/>'
+    "</input></field>"
+    '<field name="group_comment"><textarea name="comment" rows="3"/></field>'
+    '<field name="tariff"><select name="tariff" required="yes"/></field>'
+    '<field name="active"><input type="checkbox" name="active"/></field>'
+    '<field name="note"><textdata name="note" type="msg"/></field>'
+    '<field name="items"><list name="items" type="block">'
+    '<col name="id" type="data"/>'
+    '<col name="cost" type="price"/>'
+    "</list></field>"
+    "</form>"
+    '<buttons><button name="ok" type="ok"/><button name="cancel" type="cancel"/></buttons>'
+    "</metadata>"
+    '<messages name="test.edit">'
+    '<msg name="name">Название</msg>'
+    '<msg name="comment">Комментарий</msg>'
+    '<msg name="note">Заметка &lt;b&gt;&amp;&lt;/b&gt;</msg>'
+    "</messages>"
+    "<name>Сервер &quot;1&quot;</name>"
+    "<tariff>2</tariff>"
+    '<slist name="tariff"><val key="1">Basic</val><val key="2">Pro</val></slist>'
+    '<list name="items">'
+    "<elem><id>1</id><cost><price><cost>10.50</cost><currency>RUB</currency></price></cost></elem>"
+    "<elem><id>2</id><cost><price><cost>0</cost><currency>USD</currency></price></cost></elem>"
+    "</list>"
+    "<tparams><out>xml</out><elid>1</elid></tparams>"
+    "</doc>"
+)
+
+LIST_XML = (
+    '<doc lang="ru" func="test.list">'
+    '<metadata name="test.list" type="list" key="id" keyname="name">'
+    "<toolbar>"
+    '<toolgrp name="new">'
+    '<toolbtn func="test.edit" name="new" type="new" img="t-new"/>'
+    '<toolbtn func="test.delete" name="delete" type="group" img="t-delete">'
+    '<hide name="status" value="deleted"/>'
+    "</toolbtn>"
+    "</toolgrp>"
+    "</toolbar>"
+    "<coldata>"
+    '<col name="id" type="data" hidden="yes"/>'
+    '<col name="name" type="data"/>'
+    '<col name="status" type="msg"/>'
+    "</coldata>"
+    "</metadata>"
+    '<messages name="test.list" key="id" keyname="name">'
+    '<msg name="title">Серверы</msg>'
+    '<msg name="status_active">Активен</msg>'
+    "</messages>"
+    "<p_num>1</p_num>"
+    "</doc>"
+)
+
+
+@pytest.fixture
+def form_xml():
+    return FORM_XML
+
+
+@pytest.fixture
+def list_xml():
+    return LIST_XML
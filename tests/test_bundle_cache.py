@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from click.testing import CliRunner
+
+from billmgr_addon.cli.main import main
+from billmgr_addon.fluentbillmgr import FluentBundleCache
+
+FTL = """
+hello = Привет, { $name }!
+items = { $count ->
+    [one] { $count } элемент
+    [few] { $count } элемента
+   *[many] { $count } элементов
+}
+"""
+
+
+def upper(value):
+    return str(value).upper()
+
+
+FACTORY_MODULE = """
+from pathlib import Path
+
+from billmgr_addon.fluentbillmgr import FluentBundleCache, FluentTranslator, TranslatorHub
+
+
+def i18n_factory(project_path):
+    cache = FluentBundleCache(Path(project_path) / "cache")
+    ftl_file = Path(project_path) / "txt.ftl"
+    return TranslatorHub(
+        {"ru": "ru"},
+        [FluentTranslator("ru", cache.get_bundle("ru", [ftl_file]))],
+        root_locale="ru",
+    )
+"""
+
+
+@pytest.fixture
+def ftl_file(tmp_path):
+    path = tmp_path / "txt.ftl"
+    path.write_text(FTL, encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return FluentBundleCache(tmp_path / "cache")
+
+
+def cache_files(cache):
+    return sorted(cache.path.glob("*.cache"))
+
+
+def test_cached_bundle_formats_like_compiled(cache, ftl_file):
+    compiled = cache.get_bundle("ru", [ftl_file])
+    files = cache_files(cache)
+    assert len(files) == 1
+
+    cached = cache.get_bundle("ru", [ftl_file])
+    assert cache_files(cache) == files
+    for key, args in [("hello", {"name": "мир"}), ("items", {"count": 3})]:
+        assert cached.format(key, args) == compiled.format(key, args)
+    assert cached.format("items", {"count": 5})[0] == "⁨5⁩ элементов"
+    assert cached.source_hash == compiled.source_hash
+
+
+def test_changed_sources_replace_stale_file(cache, ftl_file):
+    cache.get_bundle("ru", [ftl_file])
+    old_files = cache_files(cache)
+
+    ftl_file.write_text(FTL.replace("Привет", "Здравствуй"), encoding="utf-8")
+    bundle = cache.get_bundle("ru", [ftl_file])
+
+    new_files = cache_files(cache)
+    assert len(new_files) == 1
+    assert new_files != old_files
+    assert bundle.format("hello", {"name": "мир"})[0].startswith("Здравствуй")
+
+
+@pytest.mark.parametrize(
+    ("first", "second"),
+    [
+        ({"locale": "ru"}, {"locale": "en"}),
+        ({"use_isolating": True}, {"use_isolating": False}),
+        ({}, {"functions": {"UPPER": upper}}),
+    ],
+)
+def test_compile_options_are_part_of_key(cache, ftl_file, first, second):
+    first = {"locale": "ru", **first}
+    second = {"locale": "ru", **second}
+    cache.get_bundle(filenames=[ftl_file], **first)
+    first_files = cache_files(cache)
+    cache.get_bundle(filenames=[ftl_file], **second)
+    assert cache_files(cache) != first_files
+
+
+def test_compiler_version_is_part_of_key(cache, ftl_file, monkeypatch):
+    import fluent_compiler
+
+    cache.get_bundle("ru", [ftl_file])
+    old_files = cache_files(cache)
+    monkeypatch.setattr(fluent_compiler, "__version__", "0.0-test")
+    cache.get_bundle("ru", [ftl_file])
+    # stale files of the same sources are removed on save
+    new_files = cache_files(cache)
+    assert len(new_files) == 1
+    assert new_files != old_files
+    assert cache.get_bundle("ru", [ftl_file]).format("hello", {"name": "x"})[0]
+
+
+def test_custom_functions_are_restored(cache, tmp_path):
+    ftl_file = tmp_path / "functions.ftl"
+    ftl_file.write_text("shout = { UPPER($text) }\n", encoding="utf-8")
+    cache.get_bundle("ru", [ftl_file], functions={"UPPER": upper})
+
+    cached = cache.get_bundle("ru", [ftl_file], functions={"UPPER": upper})
+    assert cached.format("shout", {"text": "hi"})[0] == "HI"
+
+
+@pytest.mark.parametrize("content", [b"", b"broken", b"\x80\x05K"])
+def test_broken_file_is_rebuilt(cache, ftl_file, content):
+    cache.get_bundle("ru", [ftl_file])
+    (cache_file,) = cache_files(cache)
+    cache_file.write_bytes(content)
+
+    bundle = cache.get_bundle("ru", [ftl_file])
+    assert bundle.format("hello", {"name": "мир"})[0] == "Привет, ⁨мир⁩!"
+    assert cache_file.stat().st_size > len(content)
+
+
+def test_failed_write_leaves_no_temp_file(cache, ftl_file, monkeypatch):
+    def replace(self, target):
+        raise OSError("read-only")
+
+    monkeypatch.setattr("pathlib.Path.replace", replace)
+    bundle = cache.get_bundle("ru", [ftl_file])
+    assert bundle.format("hello", {"name": "мир"})[0]
+    assert list(cache.path.iterdir()) == []
+
+
+def test_clear(cache, ftl_file):
+    cache.get_bundle("ru", [ftl_file])
+    cache.get_bundle("en", [ftl_file])
+    assert cache.clear() == 2
+    assert cache_files(cache) == []
+
+
+def test_build_cache_command(tmp_path, ftl_file):
+    (tmp_path / "cache_factory.py").write_text(FACTORY_MODULE, encoding="utf-8")
+    args = [
+        "build-i18n-cache",
+        "--project-path",
+        str(tmp_path),
+        "--factory",
+        "cache_factory:i18n_factory",
+        "--cache-path",
+        "cache",
+    ]
+
+    result = CliRunner().invoke(main, args)
+    assert result.exit_code == 0, result.output
+    (cache_file,) = cache_files(FluentBundleCache(tmp_path / "cache"))
+    assert cache_file.name in result.output
+
+    result = CliRunner().invoke(main, [*args, "--clear"])
+    assert "Удалено файлов кэша: 1" in result.output
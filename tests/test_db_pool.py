@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+from types import SimpleNamespace
+
+import pytest
+
+from billmgr_addon.db import db
+from billmgr_addon.db.db import DBPool
+
+
+class DriverError(Exception):
+    pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.alive = True
+        self.rollbacks = 0
+
+    def ping(self):
+        if not self.alive:
+            raise DriverError("gone away")
+
+    def rollback(self):
+        if not self.alive:
+            raise DriverError("gone away")
+        self.rollbacks += 1
+
+
+class FakeDB:
+    def __init__(self, db_config):
+        self.connection = FakeConnection()
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def fake_driver(monkeypatch):
+    monkeypatch.setattr(db, "MySQLdb", SimpleNamespace(Error=DriverError))
+    monkeypatch.setattr(db, "DB", FakeDB)
+
+
+def test_connections_are_reused_and_rolled_back():
+    pool = DBPool(db_config=None, size=1)
+    first = pool.acquire()
+    pool.release(first)
+    assert first.connection.rollbacks == 1
+    assert pool.acquire() is first
+
+    # the pool is full, extra connections are closed
+    second = pool.acquire()
+    pool.release(first)
+    pool.release(second)
+    assert second.closed
+    assert not first.closed
+
+
+def test_broken_connections_are_dropped():
+    pool = DBPool(db_config=None)
+    broken = pool.acquire()
+    pool.release(broken)
+    broken.connection.alive = False
+    assert pool.acquire() is not broken
+    assert broken.closed
+
+    broken = pool.acquire()
+    broken.connection.alive = False
+    pool.release(broken)
+    assert broken.closed
+
+
+def test_driver_bugs_are_not_hidden():
+    pool = DBPool(db_config=None)
+    connection = pool.acquire()
+    connection.connection = None
+    with pytest.raises(AttributeError):
+        pool.release(connection)
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from enum import Enum
+
+import pytest
+
+from billmgr_addon.core.ui.formatters import (
+    DateTimeFormatter,
+    EnumMessageFormatter,
+    FormatterChain,
+    LocaleDateTimeFormatter,
+    LocaleMoneyFormatter,
+    MoneyFormatter,
+    SwitchFormatter,
+    ValueFormatter,
+    compile_formatters,
+)
+from billmgr_addon.fluentbillmgr import (
+    DateTimeFormat,
+    DateTimeTransformer,
+    MoneyFormat,
+    MoneyTransformer,
+    get_datetime_format,
+    get_money_format,
+)
+
+
+class Status(Enum):
+    ACTIVE = "active"
+    DELETED = "deleted"
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        (Decimal("10.005"), "10.01 RUB"),
+        (Decimal("-0.004"), "-0.00 RUB"),
+        (3, "3.00 RUB"),
+        (2.5, "2.50 RUB"),
+        ("7.1", "7.10 RUB"),
+        (None, ""),
+        ("", ""),
+        ("n/a", "n/a"),
+        (Decimal("NaN"), Decimal("NaN")),
+        ("Infinity", "Infinity"),
+    ],
+)
+def test_money_formatter(value, expected):
+    (result,) = MoneyFormatter(currency="RUB").format_column([value])
+    if isinstance(expected, Decimal):
+        assert result.is_nan()
+    else:
+        assert result == expected
+
+
+def test_money_formatter_passes_float_nan_through():
+    nan = float("nan")
+    assert MoneyFormatter(places=0).format_column([nan, 1.4]) == [nan, "1"]
+
+
+def test_datetime_formatter():
+    formatter = DateTimeFormatter("%d.%m.%Y %H:%M")
+    values = [datetime(2024, 2, 3, 4, 5), date(2024, 2, 3), None, "raw"]
+    assert formatter.format_column(values) == ["03.02.2024 04:05", "03.02.2024 00:00", "", "raw"]
+
+
+def test_enum_message_formatter():
+    formatter = EnumMessageFormatter("status_", {Status.DELETED: "msg_deleted"})
+    values = [Status.ACTIVE, Status.DELETED, "active", Status.ACTIVE]
+    assert formatter.format_column(values) == [
+        "status_active",
+        "msg_deleted",
+        "status_active",
+        "status_active",
+    ]
+
+
+def test_enum_message_formatter_keeps_equal_values_of_other_types_apart():
+    formatter = EnumMessageFormatter("value_", {True: "msg_true", 0: "msg_zero"})
+    values = [True, 1, 1.0, 0, False, 0.0, True]
+    assert formatter.format_column(values) == [
+        "msg_true",
+        "value_1",
+        "value_1.0",
+        "msg_zero",
+        "value_False",
+        "value_0.0",
+        "msg_true",
+    ]
+
+
+def test_enum_message_formatter_accepts_unhashable_values():
+    assert EnumMessageFormatter("v_").format_column([[1], {"a": 1}]) == ["v_[1]", "v_{'a': 1}"]
+
+
+def test_switch_formatter():
+    values = [True, False, None, 0, 1, "", "off", "no", "0", "yes"]
+    assert SwitchFormatter().format_column(values) == [
+        "on", "off", "off", "off", "on", "off", "off", "off", "off", "on"
+    ]  # fmt: skip
+
+
+def test_compile_formatters():
+    formatters = compile_formatters(
+        {
+            "name": str.upper,
+            "cost": [MoneyFormatter(places=1), lambda value: f"~{value}"],
+            "active": SwitchFormatter("yes", "no"),
+        }
+    )
+    assert isinstance(formatters["name"], ValueFormatter)
+    assert isinstance(formatters["cost"], FormatterChain)
+    assert formatters["name"](["a"]) == ["A"]
+    assert formatters["cost"]([Decimal("1.25")]) == ["~1.3"]
+    assert formatters["active"]([1, 0]) == ["yes", "no"]
+
+
+def test_compile_formatters_rejects_unknown_types():
+    with pytest.raises(TypeError, match="Unknown column formatter type"):
+        compile_formatters({"name": "upper"})
+
+
+def outcome(func, value):
+    # babel fails on some values (Infinity with significant digits), the fast
+    # path has to fail the same way
+    try:
+        return func(value)
+    except Exception as e:  # noqa: BLE001
+        return type(e)
+
+
+MONEY_OPTIONS = [
+    {},
+    {"currency_display": "symbol", "use_grouping": True},
+    {"minimum_fraction_digits": 0, "maximum_fraction_digits": 4},
+    {"maximum_significant_digits": 3},
+    {"currency_display": "name"},
+]
+AMOUNTS = [
+    Decimal("0"),
+    Decimal("-0"),
+    Decimal("1234567.891"),
+    Decimal("-0.005"),
+    Decimal("0.125"),
+    Decimal("1E+3"),
+    Decimal("Infinity"),
+    5,
+    -12.5,
+    "99.99",
+]
+
+
+@pytest.mark.parametrize("locale", ["ru", "en", "en-US", "de", "fr", "ar"])
+@pytest.mark.parametrize("currency", ["RUB", "USD", "JPY"])
+@pytest.mark.parametrize("options", MONEY_OPTIONS)
+def test_money_format_matches_transformer(locale, currency, options):
+    money_format = MoneyFormat(locale, currency, **options)
+    babel_locale = money_format.babel_locale
+    for amount in AMOUNTS:
+        transformer = MoneyTransformer(Decimal(str(amount)), currency, **options)
+        expected = outcome(transformer.format, babel_locale)
+        assert outcome(money_format.format, amount) == expected, amount
+    finite = [amount for amount in AMOUNTS if Decimal(str(amount)).is_finite()]
+    assert money_format.format_many(finite * 2) == [money_format.format(a) for a in finite] * 2
+    assert money_format.format(None) == ""
+    assert money_format.format("") == ""
+
+
+DATES = [
+    date(2024, 2, 29),
+    datetime(2024, 12, 31, 23, 30),
+    datetime(2024, 6, 1, 0, 5, tzinfo=timezone.utc),
+    datetime(2024, 6, 1, 3, 5, tzinfo=timezone(timedelta(hours=3))),
+]
+
+
+@pytest.mark.parametrize("locale", ["ru", "en", "de", "ja"])
+@pytest.mark.parametrize("date_style", [None, "short", "long", "full"])
+@pytest.mark.parametrize("time_zone", [None, "Europe/Moscow", "America/New_York"])
+def test_datetime_format_matches_transformer(locale, date_style, time_zone):
+    for time_style in (None, "short", "medium"):
+        datetime_format = DateTimeFormat(locale, date_style, time_style, time_zone)
+        options = {"dateStyle": date_style, "timeStyle": time_style, "timeZone": time_zone}
+        options = {name: value for name, value in options.items() if value is not None}
+        values = DATES if time_style is None else DATES[1:]
+        expected = [
+            DateTimeTransformer(value, **options).format(datetime_format.babel_locale)
+            for value in values
+        ]
+        assert datetime_format.format_many(values) == expected
+
+
+def test_datetime_format_passthrough_and_errors():
+    datetime_format = DateTimeFormat("ru", "short")
+    assert datetime_format.format(None) == ""
+    assert datetime_format.format("вчера") == "вчера"
+    with pytest.raises(TypeError):
+        datetime_format.format(1)
+
+
+def test_locale_formatters_are_cached():
+    assert get_money_format("ru", "RUB") is get_money_format("ru", "RUB")
+    assert get_datetime_format("ru", "short") is get_datetime_format("ru", "short")
+    formatter = LocaleMoneyFormatter("ru", "RUB", use_grouping=True)
+    assert formatter.money_format is get_money_format("ru", "RUB", use_grouping=True)
+    assert LocaleDateTimeFormatter("en", "short").format_column([None, date(2024, 1, 2)]) == [
+        "",
+        "1/2/24",
+    ]
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+
+from billmgr_addon.fluentbillmgr.cli.cli import FtlFileEventHandler
+
+
+def test_failed_regeneration_keeps_watching(tmp_path, capsys):
+    stub_path = tmp_path / "stub.pyi"
+    (tmp_path / "a.ftl").write_text("hello = Hi { $name }\n", encoding="utf-8")
+    handler = FtlFileEventHandler(str(tmp_path), str(stub_path))
+    assert handler.try_regenerate()
+
+    broken = tmp_path / "b.ftl"
+    broken.write_bytes(b"\xff\xfe")
+    assert not handler.try_regenerate()
+    assert "stubs not updated: UnicodeDecodeError" in capsys.readouterr().out
+
+    broken.write_text("bye = Bye\n", encoding="utf-8")
+    assert handler.try_regenerate()
+    assert "bye" in stub_path.read_text(encoding="utf-8")
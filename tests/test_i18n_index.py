@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from billmgr_addon.cli.i18n_index import build_report, collect_used_keys
+from billmgr_addon.cli.main import main
+
+SOURCE = """
+from billmgr_addon.fluentbillmgr import TranslatorRunner
+
+
+async def get(form, mgr_request):
+    form.title = mgr_request.i18n.form.title()
+    i18n = mgr_request.i18n
+    labels = i18n.status
+    i18n.get("error-plain")
+    i18n.get(f"status-{form.status}")
+    i18n.get(key_for(form))
+    return labels
+
+
+def render(runner: TranslatorRunner):
+    return runner.button.save(), runner.locale
+"""
+
+FTL = """
+form-title = Форма
+status-active = Активен
+button-save = Сохранить
+old-key = Старое
+"""
+
+FACTORY_MODULE = """
+from pathlib import Path
+
+from billmgr_addon.fluentbillmgr import FluentBundleCache, FluentTranslator, TranslatorHub
+
+
+def i18n_factory(project_path):
+    cache = FluentBundleCache(Path(project_path) / "cache")
+    ftl_file = Path(project_path) / "ru.ftl"
+    return TranslatorHub(
+        {"ru": "ru"},
+        [FluentTranslator("ru", cache.get_bundle("ru", [ftl_file]))],
+        root_locale="ru",
+    )
+"""
+
+
+@pytest.fixture
+def project_path(tmp_path):
+    (tmp_path / "app").mkdir()
+    (tmp_path / "app" / "endpoints.py").write_text(SOURCE, encoding="utf-8")
+    (tmp_path / "app" / "broken.py").write_text("def broken(:\n", encoding="utf-8")
+    (tmp_path / "ru.ftl").write_text(FTL, encoding="utf-8")
+    (tmp_path / "index_factory.py").write_text(FACTORY_MODULE, encoding="utf-8")
+    return tmp_path
+
+
+def test_collect_used_keys(project_path):
+    used = collect_used_keys([project_path / "app"])
+    assert {key: [called for _, called in usages] for key, usages in used["keys"].items()} == {
+        "form-title": [True],
+        "status": [False],
+        "error-plain": [True],
+        "button-save": [True],
+    }
+    assert sorted(used["dynamic"]) == ["", "status-"]
+    assert len(used["errors"]) == 1
+    assert "broken.py" in used["errors"][0]
+
+
+def test_build_report(project_path):
+    used = collect_used_keys([project_path / "app"])
+    available = {"form-title", "status-active", "button-save", "old-key"}
+    report = build_report(used, {"ru": available}, {"ru": available})
+
+    # "status" is a prefix of status-active and is not called
+    assert list(report["missing"]["ru"]) == ["error-plain"]
+    assert report["unused"] == {"ru": ["old-key"]}
+    assert list(report["dynamic"]) == ["", "status-"]
+
+
+def test_build_index_command(project_path):
+    args = [
+        "build-i18n-index",
+        "--project-path",
+        str(project_path),
+        "--factory",
+        "index_factory:i18n_factory",
+        "--index-path",
+        "keys.json",
+    ]
+    result = CliRunner().invoke(main, [*args, "--json"])
+    assert result.exit_code == 0, result.output
+    report = json.loads(result.output)
+    assert list(report["missing"]["ru"]) == ["error-plain"]
+    assert report["unused"] == {"ru": ["old-key"]}
+    assert (project_path / "keys.json").exists()
+
+    result = CliRunner().invoke(main, args)
+    assert "Нет в языке ru (1):" in result.output
+    assert "Не используются в коде, ru (1):" in result.output
+
+    result = CliRunner().invoke(main, [*args, "--strict"])
+    assert result.exit_code == 1
+
+
+def test_failing_factory_aborts(project_path):
+    result = CliRunner().invoke(
+        main,
+        ["build-i18n-index", "--project-path", str(project_path), "--factory", "index_factory:x"],
+    )
+    assert result.exit_code == 1
+    assert "Ошибка загрузки переводов" in result.output
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+import pytest
+
+from billmgr_addon.fluentbillmgr import (
+    FluentBundleCache,
+    FluentTranslator,
+    TranslationKeyIndex,
+    TranslatorHub,
+)
+from billmgr_addon.fluentbillmgr.src.impl import key_index
+
+EN_FTL = """
+hello = Hello
+bye = Bye
+"""
+
+RU_FTL = """
+hello = Привет
+"""
+
+
+@pytest.fixture
+def ftl_dir(tmp_path):
+    for locale, source in [("en", EN_FTL), ("ru", RU_FTL)]:
+        (tmp_path / locale).mkdir()
+        (tmp_path / locale / "txt.ftl").write_text(source, encoding="utf-8")
+    return tmp_path
+
+
+def make_hub(ftl_dir, index=None):
+    cache = FluentBundleCache(ftl_dir / "cache")
+    translators = [
+        FluentTranslator(locale, cache.get_bundle(locale, [ftl_dir / locale / "txt.ftl"]))
+        for locale in ("en", "ru")
+    ]
+    return TranslatorHub({"en": "en", "ru": ("ru", "en")}, translators, key_index=index)
+
+
+def test_build_save_load(ftl_dir, tmp_path):
+    index = TranslationKeyIndex.build(make_hub(ftl_dir))
+    assert index.languages["ru"] == {"ru": ["hello"], "en": ["bye"]}
+
+    path = tmp_path / "index" / "keys.json"
+    index.save(path)
+    loaded = TranslationKeyIndex.load(path)
+    assert loaded.languages == index.languages
+    assert loaded.sources == index.sources
+
+    hub = make_hub(ftl_dir, loaded)
+    key_map = loaded.get_key_map("ru", hub.get_translator_by_locale("ru").translators)
+    assert {key: translator.locale for key, translator in key_map.items()} == {
+        "hello": "ru",
+        "bye": "en",
+    }
+    runner = hub.get_translator_by_locale("ru")
+    assert runner.get("hello") == "Привет"
+    assert runner.get("bye") == "Bye"
+
+
+def test_changed_sources_make_index_stale(ftl_dir):
+    index = TranslationKeyIndex.build(make_hub(ftl_dir))
+
+    (ftl_dir / "ru" / "txt.ftl").write_text(RU_FTL + "bye = Пока\n", encoding="utf-8")
+    hub = make_hub(ftl_dir, index)
+    assert index.get_key_map("ru", hub.get_translator_by_locale("ru").translators) is None
+    # stale index is not used, keys are found in the locale chain
+    assert hub.get_translator_by_locale("ru").get("bye") == "Пока"
+
+
+def test_unknown_source_hash_is_not_trusted(ftl_dir):
+    index = TranslationKeyIndex.build(make_hub(ftl_dir))
+    translator = FluentTranslator("en", make_hub(ftl_dir).storage["en"].translator)
+    translator.translator = object()
+    assert index.get_key_map("en", [translator]) is None
+
+
+@pytest.mark.parametrize("content", ['{"version": 1, "languages": {}}', "[]", "not json"])
+def test_load_rejects_other_formats(tmp_path, content):
+    path = tmp_path / "keys.json"
+    path.write_text(content, encoding="utf-8")
+    assert TranslationKeyIndex.load(path) is None
+    assert TranslationKeyIndex.load(tmp_path / "missing.json") is None
+
+
+def test_failed_save_removes_temp_file(tmp_path):
+    path = tmp_path / "keys.json"
+    TranslationKeyIndex({"en": {"en": ["hello"]}}, {"en": "hash"}).save(path)
+
+    with pytest.raises(TypeError):
+        TranslationKeyIndex({"en": {"en": [object()]}}).save(path)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["keys.json"]
+    assert json.loads(path.read_text(encoding="utf-8"))["languages"] == {"en": {"en": ["hello"]}}
+
+
+def test_failed_cleanup_keeps_original_error(tmp_path, monkeypatch):
+    def fail_unlink(self, *args, **kwargs):
+        raise PermissionError("unlink")
+
+    monkeypatch.setattr(key_index.Path, "unlink", fail_unlink)
+    with pytest.raises(TypeError):
+        TranslationKeyIndex({"en": {"en": [object()]}}).save(tmp_path / "keys.json")
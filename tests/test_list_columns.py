@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+from decimal import Decimal
+
+import pytest
+
+from billmgr_addon.core.ui import MgrList
+from billmgr_addon.core.ui._list import MgrListColumns
+from billmgr_addon.core.ui.formatters import MoneyFormatter, SwitchFormatter
+
+FORMATTERS = {
+    "cost": MoneyFormatter(currency="RUB"),
+    "active": SwitchFormatter(),
+    "name": str.upper,
+}
+
+DICT_ROWS = [
+    {"id": 1, "name": "web", "cost": Decimal("10.5"), "active": True},
+    {"id": 2, "name": "db", "cost": None, "active": False},
+    {"id": 3, "name": "mail", "cost": "7", "active": 1},
+]
+
+# rows of a query result with different keys, e.g. optional joined columns
+SPARSE_ROWS = [
+    {"id": 1, "name": "web"},
+    {"id": 2, "cost": Decimal("3")},
+    {"id": 3, "name": "mail", "active": 0},
+]
+
+
+def render(list_xml, rows, **kwargs):
+    mgr_list = MgrList(list_xml)
+    mgr_list.set_data_rows(rows, **kwargs)
+    mgr_list.patch_xml()
+    return str(mgr_list)
+
+
+@pytest.mark.parametrize(
+    ("rows", "column_names"),
+    [
+        pytest.param(DICT_ROWS, None, id="dicts"),
+        pytest.param(SPARSE_ROWS, None, id="sparse-dicts"),
+        pytest.param(DICT_ROWS, {"id": "id", "name": "name", "extra": "extra"}, id="keys-map"),
+        pytest.param([tuple(row.values()) for row in DICT_ROWS], list(DICT_ROWS[0]), id="tuples"),
+        pytest.param([], ["id", "name"], id="empty"),
+    ],
+)
+@pytest.mark.parametrize("formatters", [None, FORMATTERS], ids=["raw", "formatted"])
+def test_columnar_renders_like_rows(list_xml, rows, column_names, formatters):
+    expected = render(list_xml, rows, column_names=column_names, formatters=formatters)
+    actual = render(list_xml, rows, column_names=column_names, formatters=formatters, columnar=True)
+    assert actual == expected
+
+
+def test_set_data_columns_renders_like_rows(list_xml):
+    columns = {name: [row[name] for row in DICT_ROWS] for name in DICT_ROWS[0]}
+    mgr_list = MgrList(list_xml)
+    mgr_list.set_data_columns(columns, formatters=FORMATTERS)
+    mgr_list.patch_xml()
+    assert str(mgr_list) == render(list_xml, DICT_ROWS, formatters=FORMATTERS)
+
+
+def test_formatting_does_not_change_caller_rows(list_xml):
+    rows = [dict(row) for row in DICT_ROWS]
+    render(list_xml, rows, formatters=FORMATTERS)
+    assert rows == DICT_ROWS
+
+
+def test_sparse_columns_keep_missing_cells():
+    columns = MgrListColumns.from_dicts(SPARSE_ROWS)
+    assert list(columns.columns) == ["id", "name", "cost", "active"]
+    assert columns.sparse_columns == {"name", "cost", "active"}
+    assert columns.to_rows() == SPARSE_ROWS
+
+
+@pytest.mark.parametrize(
+    "rows",
+    [
+        pytest.param([(1, "web"), (2,)], id="ragged"),
+        pytest.param([(1, "web", "extra")], id="too-long"),
+        pytest.param([{"id": 1, "name": "web"}], id="dict-rows"),
+    ],
+)
+def test_from_rows_rejects_rows_not_matching_names(rows):
+    with pytest.raises(TypeError):
+        MgrListColumns.from_rows(rows, ["id", "name"])
+
+
+@pytest.mark.parametrize("keys_map", [None, {"id": "id"}])
+def test_from_dicts_rejects_sequence_rows(keys_map):
+    with pytest.raises(TypeError, match="has to be dict"):
+        MgrListColumns.from_dicts([(1, "web")], keys_map=keys_map)
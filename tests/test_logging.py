@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import queue
+
+import pytest
+
+from billmgr_addon.utils.logging import PayloadPreview, _DeferredQueueHandler
+
+
+@pytest.fixture
+def records():
+    log_queue = queue.SimpleQueue()
+    logger = logging.getLogger("tests.deferred")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    handler = _DeferredQueueHandler(log_queue)
+    logger.addHandler(handler)
+    yield logger, log_queue
+    logger.removeHandler(handler)
+
+
+def test_mutable_arguments_are_rendered_at_call_time(records):
+    logger, log_queue = records
+    data = {"a": 1}
+    logger.debug("data=%s", data)
+    data["b"] = 2
+    assert log_queue.get().getMessage() == "data={'a': 1}"
+
+
+def test_preview_of_mutable_payload_is_rendered_at_call_time(records):
+    logger, log_queue = records
+    data = {"a": 1}
+    body = bytearray(b"abc")
+    logger.debug("data=%s body=%s", PayloadPreview(data, 100), PayloadPreview(body, 100))
+    data["b"] = 2
+    body[:] = b"xyz"
+    record = log_queue.get()
+    assert record.args is None
+    assert record.getMessage() == "data={'a': 1} body=abc"
+
+
+def test_preview_of_immutable_payload_stays_deferred(records):
+    logger, log_queue = records
+    logger.debug("body=%s", PayloadPreview(b"x" * 10, 4))
+    record = log_queue.get()
+    assert isinstance(record.args[0], PayloadPreview)
+    assert record.getMessage() == "body=xxxx... [10 total]"
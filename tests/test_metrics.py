@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from billmgr_addon.utils import metrics
+
+
+def test_exports_helpers():
+    for name in metrics.__all__:
+        assert callable(getattr(metrics, name))
+    assert {"request_timer", "count_error", "db_query_timer"} <= set(metrics.__all__)
+
+
+def test_helpers_without_metrics(monkeypatch):
+    monkeypatch.setattr(metrics, "_metrics", None)
+    with metrics.request_timer("tariff"), metrics.db_query_timer():
+        metrics.count_error("tariff", "mgr_error")
+        metrics.track_db_connection(1)
+        metrics.count_i18n_lookup("ru")
+    with metrics.api_request_timer("user.edit"):
+        pass
+
+
+def test_helpers_with_metrics(monkeypatch):
+    prometheus_client = pytest.importorskip("prometheus_client")
+    registry = prometheus_client.CollectorRegistry()
+    monkeypatch.setattr(metrics, "_metrics", metrics.PluginMetrics(registry))
+
+    with metrics.request_timer(None):
+        metrics.count_error(None, "unknown_error")
+    metrics.count_i18n_lookup("ru")
+
+    labels = {"action": metrics.UNKNOWN_ACTION}
+    assert registry.get_sample_value("billmgr_addon_requests_total", labels) == 1
+    assert (
+        registry.get_sample_value(
+            "billmgr_addon_errors_total", {**labels, "type": "unknown_error"}
+        )
+        == 1
+    )
+    assert registry.get_sample_value("billmgr_addon_request_duration_seconds_count", labels) == 1
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+import pytest
+
+from billmgr_addon.core.router import FormEndpoint
+
+
+class FakeForm:
+    def __init__(self):
+        self.options = {}
+
+    def set_options(self, name, options):
+        self.options[name] = options
+
+
+def load_presets(presets, timeout=30):
+    endpoint = type(
+        "Endpoint", (FormEndpoint,), {"option_presets": presets, "option_presets_timeout": timeout}
+    )
+    form = FakeForm()
+    asyncio.run(endpoint._load_option_presets(form, None))
+    return form.options
+
+
+async def slow_options(form, mgr_request):
+    await asyncio.sleep(0.2)
+    return [("slow", "Slow")]
+
+
+def test_plain_presets():
+    async def async_options(form, mgr_request):
+        return [("async", "Async")]
+
+    options = load_presets(
+        {
+            "list": [("1", "One")],
+            "sync": lambda form, mgr_request: [("sync", "Sync")],
+            "async": async_options,
+        }
+    )
+    assert options == {
+        "list": [("1", "One")],
+        "sync": [("sync", "Sync")],
+        "async": [("async", "Async")],
+    }
+
+
+def test_plain_sync_preset_raises_original_exception():
+    def broken(form, mgr_request):
+        raise LookupError("no tariffs")
+
+    with pytest.raises(LookupError, match="no tariffs"):
+        load_presets({"tariff": broken})
+
+
+def test_failed_preset_task():
+    async def broken(form, mgr_request):
+        raise LookupError("no tariffs")
+
+    with pytest.raises(FormEndpoint.PresetTaskError) as excinfo:
+        load_presets({"tariff": FormEndpoint.OptionPreset(broken)})
+    assert isinstance(excinfo.value.__cause__, LookupError)
+
+
+def test_preset_timeout_zero_is_respected():
+    preset = FormEndpoint.OptionPreset(slow_options, timeout=0)
+    with pytest.raises(FormEndpoint.PresetTimeoutError):
+        load_presets({"tariff": preset})
+
+
+def test_preset_timeout_overrides_default():
+    preset = FormEndpoint.OptionPreset(slow_options, timeout=5)
+    assert load_presets({"tariff": preset}, timeout=0.01) == {"tariff": [("slow", "Slow")]}
+
+
+def test_sync_preset_timeout_requires_thread():
+    def options(form, mgr_request):
+        return []
+
+    with pytest.raises(ValueError, match="run_in_thread"):
+        FormEndpoint.OptionPreset(options, timeout=1)
+    FormEndpoint.OptionPreset(options, timeout=1, run_in_thread=True)
+
+
+def test_invalid_preset_type():
+    with pytest.raises(FormEndpoint.PresetTypeError):
+        load_presets({"tariff": "not options"})
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+import importlib
+
+import pytest
+
+from billmgr_addon.fluentbillmgr.typing_generator import ParsedFTLCache, parse_cache
+from billmgr_addon.fluentbillmgr.typing_generator.stubs import Stubs
+from billmgr_addon.fluentbillmgr.typing_generator.tree import Tree
+
+# the package exports the click group under the same name as the module
+cli = importlib.import_module("billmgr_addon.fluentbillmgr.cli.cli")
+
+
+@pytest.fixture
+def ftl_dir(tmp_path):
+    ftl_dir = tmp_path / "ru"
+    (ftl_dir / "nested").mkdir(parents=True)
+    for i in range(cli.PARALLEL_MIN_FILES):
+        (ftl_dir / f"{i:02}.ftl").write_text(
+            f"msg-{i} = Сообщение {{ $count }}\nshared = Файл {i}\n", encoding="utf-8"
+        )
+    (ftl_dir / "nested" / "inner.ftl").write_text("inner = { $name }\n", encoding="utf-8")
+    return ftl_dir
+
+
+def cache_files(cache_path):
+    return sorted(cache_path.glob("*.cache"))
+
+
+def test_parallel_parse_matches_serial(ftl_dir):
+    serial = cli.parse_ftl_dir(ftl_dir, workers=1)
+    parallel = cli.parse_ftl_dir(ftl_dir, workers=2)
+    assert list(parallel.items()) == list(serial.items())
+    # files are merged in path order, the last one wins
+    assert serial["shared"].text == f"Файл {cli.PARALLEL_MIN_FILES - 1}"
+    assert "inner" not in serial
+    assert "inner" in cli.parse_ftl_dir(ftl_dir, recursive=True, workers=1)
+
+
+def test_cached_files_are_not_parsed_again(ftl_dir, tmp_path, monkeypatch):
+    cache_path = tmp_path / "cache"
+    parsed = cli.parse_ftl_dir(ftl_dir, workers=1, cache_path=cache_path)
+    assert len(cache_files(cache_path)) == cli.PARALLEL_MIN_FILES
+
+    def fail(text):
+        raise AssertionError("parsed again")
+
+    monkeypatch.setattr(cli, "parse_ftl_text", fail)
+    assert cli.parse_ftl_dir(ftl_dir, workers=1, cache_path=cache_path) == parsed
+
+
+def test_changed_file_gets_new_entry(ftl_dir, tmp_path):
+    cache_path = tmp_path / "cache"
+    cli.parse_ftl_dir(ftl_dir, workers=1, cache_path=cache_path)
+    old_files = cache_files(cache_path)
+
+    (ftl_dir / "00.ftl").write_text("msg-0 = Новое { $name }\n", encoding="utf-8")
+    messages = cli.parse_ftl_dir(ftl_dir, workers=1, cache_path=cache_path)
+    assert list(messages["msg-0"].args) == ["name"]
+    assert len(set(cache_files(cache_path)) - set(old_files)) == 1
+
+
+def test_broken_entry_is_ignored(tmp_path):
+    cache = ParsedFTLCache(tmp_path)
+    data = b"hello = Hi\n"
+    messages = cli.parse_ftl_text(data.decode())
+    cache.set(data, messages)
+    assert cache.get(data) == messages
+
+    (tmp_path / f"{cache.key(data)}.cache").write_bytes(b"\x80\x04broken")
+    assert cache.get(data) is None
+    assert cache.clear() == 1
+    assert cache.get(data) is None
+
+
+def test_failed_write_leaves_no_temp_files(tmp_path, monkeypatch):
+    cache = ParsedFTLCache(tmp_path)
+    cache.set(b"a", {"a": lambda: None})
+    assert list(tmp_path.iterdir()) == []
+
+    def fail_replace(self, target):
+        raise PermissionError("replace")
+
+    monkeypatch.setattr(type(tmp_path), "replace", fail_replace)
+    cache.set(b"b", cli.parse_ftl_text("b = B\n"))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_key_depends_on_content_and_salt(tmp_path, monkeypatch):
+    cache = ParsedFTLCache(tmp_path)
+    assert cache.key(b"a") == ParsedFTLCache(tmp_path / "other").key(b"a")
+    assert cache.key(b"a") != cache.key(b"b")
+
+    monkeypatch.setattr(parse_cache, "CACHE_FORMAT_VERSION", 0)
+    assert ParsedFTLCache(tmp_path).key(b"a") != cache.key(b"a")
+
+
+def test_unchanged_stubs_are_not_rewritten(tmp_path):
+    stub_path = tmp_path / "stub.pyi"
+    stubs = Stubs(Tree(cli.parse_ftl_text("hello = Hi { $name }\n")))
+    assert stubs.to_file(str(stub_path))
+    assert "def hello" in stub_path.read_text(encoding="utf-8")
+
+    mtime = stub_path.stat().st_mtime_ns
+    assert not stubs.to_file(str(stub_path))
+    assert stub_path.stat().st_mtime_ns == mtime
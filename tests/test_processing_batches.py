@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+
+import click
+import pytest
+from flask import Flask
+
+from billmgr_addon.core import processing_module
+from billmgr_addon.core.processing_module import (
+    ProcessingItem,
+    batched_command,
+    load_items,
+    load_module_items,
+    report_to_billmgr,
+    run_batched,
+)
+
+
+def make_items(count, groups=3):
+    return [ProcessingItem(i, 2, i % groups, 1, 7) for i in range(1, count + 1)]
+
+
+@pytest.fixture
+def app():
+    app = Flask("test")
+    app.config["PROCESSING_MODULE_CONCURRENCY"] = 4
+    with app.app_context():
+        yield app
+
+
+def test_batches_are_grouped_and_run_in_parallel(app):
+    lock = threading.Lock()
+    active = [0, 0]
+    batches = []
+
+    def handler(batch):
+        with lock:
+            active[0] += 1
+            active[1] = max(active)
+            batches.append([item.id for item in batch])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return {item.id: item.pricelist for item in batch}
+
+    items = make_items(30)
+    results = run_batched(items, handler, batch_size=4, group_by=lambda item: item.pricelist)
+
+    assert [result.item_id for result in results] == [item.id for item in items]
+    assert all(result.ok and result.value == result.item_id % 3 for result in results)
+    assert active[1] > 1
+    for batch in batches:
+        assert len(batch) <= 4
+        assert len({item_id % 3 for item_id in batch}) == 1
+
+
+def test_item_and_batch_errors(app):
+    def handler(batch):
+        if any(item.id == 7 for item in batch):
+            raise RuntimeError("batch failed")
+        return {
+            item.id: ValueError("bad item") if item.id == 2 else "done"
+            for item in batch
+            if item.id != 3
+        }
+
+    reported = []
+    results = run_batched(make_items(10), handler, batch_size=3, report=reported.append)
+    errors = {result.item_id: type(result.error) for result in results if not result.ok}
+
+    # 3 has no result, 7-9 are in the failed batch
+    assert errors == {
+        2: ValueError,
+        3: RuntimeError,
+        7: RuntimeError,
+        8: RuntimeError,
+        9: RuntimeError,
+    }
+    assert sorted(result.item_id for result in reported) == list(range(1, 11))
+
+
+def test_failing_report_does_not_stop_processing(app):
+    def report(result):
+        raise OSError("mgrctl failed")
+
+    results = run_batched(
+        make_items(5), lambda batch: {item.id: 1 for item in batch}, report=report
+    )
+    assert all(result.ok for result in results)
+
+
+def test_serial_run_in_caller_thread(app):
+    threads = set()
+
+    def handler(batch):
+        threads.add(threading.get_ident())
+        return {item.id: None for item in batch}
+
+    run_batched(make_items(6), handler, batch_size=2, concurrency=1)
+    assert threads == {threading.get_ident()}
+    assert run_batched([], handler) == []
+    with pytest.raises(ValueError, match="positive"):
+        run_batched(make_items(1), handler, batch_size=0)
+
+
+class FakeQuery:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+
+class FakeDb:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def select_query(self, query, values):
+        self.queries.append((query, values))
+        return FakeQuery(self.rows)
+
+
+ROWS = [
+    {"id": 1, "status": 2, "pricelist": 5, "account": 9, "processingmodule": 7,
+     "param_name": "ip", "param_value": "10.0.0.1"},
+    {"id": 1, "status": 2, "pricelist": 5, "account": 9, "processingmodule": 7,
+     "param_name": "server_id", "param_value": "3"},
+    {"id": 2, "status": 3, "pricelist": 5, "account": 9, "processingmodule": 7,
+     "param_name": None, "param_value": None},
+]  # fmt: skip
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = FakeDb(ROWS)
+    monkeypatch.setattr(processing_module, "get_db", lambda alias: db)
+    return db
+
+
+def test_load_module_items_in_one_query(fake_db):
+    items = load_module_items(7)
+    assert len(fake_db.queries) == 1
+    _, values = fake_db.queries[0]
+    assert values == {"module_id": 7, "status_0": 2, "status_1": 3}
+    assert [item.id for item in items] == [1, 2]
+    assert items[0].params == {"ip": "10.0.0.1", "server_id": "3"}
+    assert items[1].params == {}
+
+    assert load_module_items(7, statuses=()) == []
+    assert load_items([]) == []
+    assert len(fake_db.queries) == 1
+
+
+def test_batched_command(app, fake_db, monkeypatch):
+    calls = []
+    monkeypatch.setattr(processing_module, "mgrctl_exec", calls.append)
+
+    def handler(batch):
+        return {item.id: ValueError("bad") if item.id == 2 else "ok" for item in batch}
+
+    command = batched_command(handler, report=report_to_billmgr("stat"))
+    response = command(module_id=7)
+    assert response.root.text == "error"
+    assert calls == [["service.poststat", "elid=1", "sok=ok"]]
+
+    response = batched_command(lambda batch: {item.id: 1 for item in batch})(item_id=1)
+    assert response.root.text == "ok"
+    _, values = fake_db.queries[-1]
+    assert values == {"item_0": 1}
+
+    with pytest.raises(click.UsageError):
+        command()
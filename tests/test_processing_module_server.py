@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import click
+import pytest
+from flask import Blueprint, Flask
+
+from billmgr_addon.utils import processing_module_client
+from billmgr_addon.utils.processing_module_client import stop_server
+
+CLIENT = processing_module_client.__file__
+
+
+def create_app():
+    blueprint = Blueprint("processing_module", __name__)
+
+    @blueprint.cli.command("execute")
+    @click.option("--command", required=True)
+    @click.option("--item", "item_id", type=int)
+    def execute(command, item_id):
+        if command == "env":
+            click.echo(os.environ.get("PM_TEST_VALUE", "unset"))
+        elif command == "stdin":
+            click.echo(sys.stdin.read().upper(), nl=False)
+        elif command == "exit":
+            sys.exit(item_id)
+        elif command == "message":
+            sys.exit("bad config")
+        elif command == "crash":
+            raise RuntimeError("boom")
+        else:
+            click.echo(f"<doc><ok>{command} {item_id}</ok></doc>")
+
+    app = Flask("pm_test")
+    app.register_blueprint(blueprint, cli_group=None)
+    return app
+
+
+SERVER = (
+    "import sys; "
+    "from billmgr_addon.core.processing_module import serve_processing_module; "
+    "from tests.test_processing_module_server import create_app; "
+    "serve_processing_module(create_app(), sys.argv[1], idle_timeout=30)"
+)
+
+
+@pytest.fixture(scope="module")
+def socket_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("pm") / "pm.sock")
+    # the server replaces sys.stdout and os.environ, so it runs in its own process
+    server = subprocess.Popen(
+        [sys.executable, "-c", SERVER, path],
+        cwd=Path(__file__).parent.parent,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    for _ in range(200):
+        if Path(path).exists() or server.poll() is not None:
+            break
+        time.sleep(0.05)
+    yield path
+    stop_server(path)
+    assert server.wait(10) == 0
+
+
+def run_client(socket_path, *argv, env=None, stdin=None):
+    return subprocess.run(
+        [sys.executable, "-S", CLIENT, "--socket", socket_path, "--cli", "-", "--no-spawn", "--"]
+        + list(argv),
+        input=stdin,
+        stdin=None if stdin is not None else subprocess.DEVNULL,
+        capture_output=True,
+        text=True,
+        env={**os.environ, **(env or {})},
+        timeout=30,
+        check=False,
+    )
+
+
+def test_command_output(socket_path):
+    result = run_client(socket_path, "--command", "open", "--item", "7")
+    assert result.returncode == 0
+    assert result.stdout == "<doc><ok>open 7</ok></doc>\n"
+
+
+def test_client_environment_is_forwarded(socket_path):
+    result = run_client(socket_path, "--command", "env", env={"PM_TEST_VALUE": "from client"})
+    assert result.stdout == "from client\n"
+    assert "PM_TEST_VALUE" not in os.environ
+    assert run_client(socket_path, "--command", "env").stdout == "unset\n"
+
+
+def test_client_stdin_is_forwarded(socket_path):
+    result = run_client(socket_path, "--command", "stdin", stdin="<doc>check</doc>")
+    assert result.stdout == "<DOC>CHECK</DOC>"
+
+
+@pytest.mark.parametrize(
+    ("argv", "code", "stderr"),
+    [
+        (["--command", "exit", "--item", "3"], 3, ""),
+        (["--command", "message"], 1, "bad config\n"),
+        (["--command", "crash"], 1, ""),
+        (["--item", "1"], 2, "Missing option '--command'"),
+    ],
+)
+def test_exit_codes(socket_path, argv, code, stderr):
+    result = run_client(socket_path, *argv)
+    assert result.returncode == code
+    assert stderr in result.stderr
+
+
+def test_commands_run_concurrently(socket_path):
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda i=i: results.append(run_client(socket_path, "--command", f"c{i}"))
+        )
+        for i in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(result.stdout for result in results) == [
+        f"<doc><ok>c{i} None</ok></doc>\n" for i in range(8)
+    ]
+
+
+def test_client_falls_back_to_cli_without_server(tmp_path):
+    cli = tmp_path / "cli.py"
+    cli.write_text("import sys; print('local', *sys.argv[1:])", encoding="utf-8")
+    result = subprocess.run(
+        [sys.executable, "-S", CLIENT, "--socket", str(tmp_path / "none.sock"), "--cli", str(cli)]
+        + ["--no-spawn", "--", "--command", "open"],
+        capture_output=True,
+        text=True,
+        timeout=30,
+        check=False,
+    )
+    assert result.stdout == "local --command open\n"
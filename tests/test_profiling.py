@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import json
+
+import pytest
+
+from billmgr_addon.utils import profiling
+from billmgr_addon.utils.profiling import (
+    RequestProfiler,
+    get_request_profile,
+    profile_call,
+    profile_phase,
+)
+
+
+def run_profiled(profiler, name="tariff.edit"):
+    async def handle():
+        async with profiler.profile(name) as profile:
+            assert get_request_profile() is profile
+            with profile_phase("handler"), profile_call("db"), profile_call("db"):
+                pass
+            return profile
+
+    return asyncio.run(handle())
+
+
+def test_disabled_profiler_records_nothing():
+    profile = run_profiled(RequestProfiler())
+    assert profile is None
+    assert get_request_profile() is None
+    with profile_phase("handler"):
+        pass
+
+
+def test_phases_and_counters(monkeypatch):
+    warnings = []
+    monkeypatch.setattr(profiling.LOGGER, "warning", warnings.append)
+
+    profile = run_profiled(RequestProfiler(enabled=True, slow_threshold=0.0))
+    assert get_request_profile() is None
+    assert profile.counters == {"db": 2}
+    assert set(profile.timings) == {"handler", "db"}
+    assert profile.duration >= profile.timings["handler"]
+
+    assert len(warnings) == 1
+    record = json.loads(warnings[0].split(" ", 3)[3])
+    assert record["action"] == "tariff.edit"
+    assert record["db_count"] == 2
+
+
+def test_sampled_profile_is_saved(tmp_path):
+    profiler = RequestProfiler(enabled=True, sample_rate=1.0, profiles_path=tmp_path)
+    run_profiled(profiler, name="tariff/edit")
+    (saved,) = tmp_path.iterdir()
+    assert saved.suffix == ".prof"
+    assert "tariff_edit" in saved.name
+
+
+def test_failed_save_does_not_fail_request(tmp_path, monkeypatch):
+    errors = []
+    monkeypatch.setattr(profiling.LOGGER, "exception", errors.append)
+    profiles_path = tmp_path / "file"
+    profiles_path.write_text("", encoding="utf-8")
+
+    profiler = RequestProfiler(enabled=True, sample_rate=1.0, profiles_path=profiles_path)
+    assert run_profiled(profiler) is not None
+    assert len(errors) == 1
+
+
+def test_unknown_profiler():
+    with pytest.raises(ValueError, match="Unknown profiler"):
+        RequestProfiler(profiler="yappi")
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from click.testing import CliRunner
+
+from billmgr_addon.cli.main import main
+from billmgr_addon.cli.startup import StartupProbeError, _parse_importtime, build_report, run_probe
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       100 |        100 |   flask.json
+import time:       300 |        400 | flask
+noise
+import time:        50 |         50 | app
+"""
+
+APP_MODULE = """
+from flask import Flask
+
+
+def create_cgi_app():
+    return Flask("startup_test")
+"""
+
+
+def make_run(wall, phases, imports):
+    return {"wall": wall, "phases": phases, "errors": {}, "imports": imports}
+
+
+def test_parse_importtime():
+    assert _parse_importtime(IMPORTTIME) == [
+        ("flask.json", 100, 100),
+        ("flask", 300, 400),
+        ("app", 50, 50),
+    ]
+
+
+def test_build_report_takes_medians():
+    imports = _parse_importtime(IMPORTTIME)
+    runs = [
+        make_run(0.1, {"import": 0.05}, imports),
+        make_run(0.3, {"import": 0.07}, imports),
+        make_run(0.2, {"import": 0.06}, imports),
+    ]
+    report = build_report(runs, top=1)
+    assert report["runs"] == 3
+    assert report["wall"] == 0.2
+    assert report["phases"] == {"import": 0.06}
+    assert report["import_total_us"] == 450
+    assert report["packages"] == [("flask", 400)]
+    assert report["modules"] == [("flask", 400)]
+
+
+@pytest.fixture
+def project_path(tmp_path):
+    (tmp_path / "startup_app.py").write_text(APP_MODULE, encoding="utf-8")
+    return tmp_path
+
+
+def test_run_probe(project_path):
+    result = run_probe(project_path, "startup_app", "create_cgi_app")
+    assert {"import", "create_app", "db_connect"} <= set(result["phases"])
+    assert result["wall"] > 0
+    # imports of the application module are reported by the interpreter
+    assert any(name == "flask" for name, _, _ in result["imports"])
+
+    with pytest.raises(StartupProbeError, match="missing_factory"):
+        run_probe(project_path, "startup_app", "missing_factory")
+
+
+def test_cli_reports_probe_errors(project_path):
+    result = CliRunner().invoke(
+        main,
+        ["profile-startup", "--project-path", str(project_path), "--factory", "missing"],
+    )
+    assert result.exit_code == 1
+    assert "app.app.missing" in result.output
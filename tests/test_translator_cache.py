@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from billmgr_addon.fluentbillmgr import FluentBundleCache, FluentTranslator
+
+FTL = """
+hello = Привет, { $name }!
+items = { $count ->
+    [one] { $count } элемент
+   *[other] { $count } элементов
+}
+"""
+
+
+class UnhashableName(str):
+    __slots__ = ()
+    __hash__ = None  # type: ignore[assignment]
+
+
+class CountingBundle:
+    def __init__(self, bundle):
+        self.bundle = bundle
+        self.calls = 0
+
+    def format(self, key, kwargs):
+        self.calls += 1
+        return self.bundle.format(key, kwargs)
+
+
+@pytest.fixture
+def bundle(tmp_path):
+    path = tmp_path / "txt.ftl"
+    path.write_text(FTL, encoding="utf-8")
+    return CountingBundle(FluentBundleCache(tmp_path / "cache").get_bundle("ru", [path]))
+
+
+def test_repeated_calls_are_cached(bundle):
+    translator = FluentTranslator("ru", bundle, cache_size=16)
+    assert translator.get("hello", name="мир") == "Привет, ⁨мир⁩!"
+    assert translator.get("hello", name="мир") == "Привет, ⁨мир⁩!"
+    assert bundle.calls == 1
+    translator.get("hello", name="всем")
+    assert bundle.calls == 2
+
+
+def test_argument_types_are_part_of_the_key(bundle):
+    translator = FluentTranslator("ru", bundle, cache_size=16)
+    assert translator.get("items", count=1) != translator.get("items", count=1.5)
+    translator.get("items", count=True)
+    assert bundle.calls == 3
+
+
+def test_unhashable_arguments_and_disabled_cache(bundle):
+    translator = FluentTranslator("ru", bundle, cache_size=16)
+    assert translator.get("hello", name=UnhashableName("мир")) == "Привет, ⁨мир⁩!"
+    translator.get("hello", name=UnhashableName("мир"))
+    assert bundle.calls == 2
+
+    translator = FluentTranslator("ru", bundle, cache_size=0)
+    translator.get("hello", name="мир")
+    translator.get("hello", name="мир")
+    assert bundle.calls == 4
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+import copy
+import pickle
+
+import pytest
+
+from billmgr_addon.fluentbillmgr import TranslationKey, TranslatorRunner
+
+
+class DictTranslator:
+    def __init__(self, locale, messages):
+        self.locale = locale
+        self.messages = messages
+        self.calls = 0
+
+    def get(self, key, **kwargs):
+        self.calls += 1
+        return self.messages[key].format(**kwargs)
+
+
+@pytest.fixture
+def translators():
+    return [
+        DictTranslator("ru", {"error-not_found": "{name} не найден"}),
+        DictTranslator("en", {"error-not_found": "{name} not found", "bye": "Bye"}),
+    ]
+
+
+def test_attribute_keys(translators):
+    runner = TranslatorRunner(translators, locale="ru")
+    assert runner.error.not_found(name="Тариф") == "Тариф не найден"
+    assert runner.bye() == "Bye"
+    assert str(runner.error.not_found) == "error-not_found"
+    # key paths are cached
+    assert runner.error.not_found is runner.error.not_found
+    assert isinstance(runner.error, TranslationKey)
+
+
+def test_dunder_lookups_are_not_keys(translators):
+    runner = TranslatorRunner(translators)
+    for name in ("__html__", "__deepcopy__", "__getstate__"):
+        assert not isinstance(getattr(runner, name, None), TranslationKey)
+        assert not isinstance(getattr(runner.error, name, None), TranslationKey)
+    assert "request_line" not in vars(runner)
+
+
+def test_copy_and_pickle(translators):
+    runner = TranslatorRunner([DictTranslator("en", {"bye": "Bye"})])
+    assert copy.copy(runner).bye() == "Bye"
+    assert copy.deepcopy(runner).bye() == "Bye"
+    assert pickle.loads(pickle.dumps(runner)).bye() == "Bye"  # noqa: S301
+
+
+def test_key_map_and_stale_entries(translators):
+    ru, en = translators
+    runner = TranslatorRunner(translators, key_map={"bye": ru, "error-not_found": ru})
+    assert runner.error.not_found(name="Тариф") == "Тариф не найден"
+    assert ru.calls == 1
+    assert en.calls == 0
+    # the index points to a locale without the key, the chain is searched
+    assert runner.get("bye") == "Bye"
+
+
+def test_format_many(translators):
+    runner = TranslatorRunner(translators)
+    kwargs_list = [{"name": "A"}, {"name": "B"}, {"name": "A"}, {"name": ["A"]}]
+    assert runner.format_many(runner.error.not_found, kwargs_list) == [
+        "A не найден",
+        "B не найден",
+        "A не найден",
+        "['A'] не найден",
+    ]
+    assert translators[0].calls == 3
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+import re
+from xml.etree.ElementTree import canonicalize, fromstring
+
+import pytest
+
+from billmgr_addon.core.response import MgrErrorResponse, MgrOkResponse, MgrRedirectResponse
+from billmgr_addon.core.ui import MgrForm, MgrList
+from billmgr_addon.core.xml_backend import ET, LXML_AVAILABLE, set_xml_backend
+
+from .conftest import LIST_XML
+
+pytestmark = pytest.mark.skipif(not LXML_AVAILABLE, reason="lxml is not installed")
+
+
+def render_form(xml):
+    form = MgrForm(xml)
+    form.set_message("note", "Новая <заметка>")
+    form.set_data_value("active", "on")
+    form.add_button("func", "refresh", attributes={"func": "test.refresh", "color": "blue"})
+    form.patch_xml()
+    return str(form)
+
+
+def render_list(xml):
+    mgr_list = MgrList(xml)
+    mgr_list.set_data_rows(
+        [
+            {"id": 1, "name": "web & db", "status": "active"},
+            {"id": 2, "name": "<mail>", "status": None},
+        ]
+    )
+    mgr_list.patch_xml()
+    return str(mgr_list)
+
+
+def render_list_from_rows(xml):
+    mgr_list = MgrList(xml)
+    mgr_list.set_data_rows(
+        [(1, "web", "active"), (2, "", "")], column_names=["id", "name", "status"]
+    )
+    mgr_list.patch_xml()
+    return str(mgr_list)
+
+
+def render_responses():
+    responses = [
+        MgrOkResponse(),
+        MgrRedirectResponse("list", "test.list"),
+        MgrErrorResponse("ошибка <1>"),
+    ]
+    return "\n".join(str(response) for response in responses)
+
+
+def render_with(backend, render, *args):
+    previous = ET.name
+    set_xml_backend(backend)
+    try:
+        return render(*args)
+    finally:
+        set_xml_backend(previous)
+
+
+def short_empty_elements(xml):
+    # lxml writes elements with empty string text as <a></a>, xml.etree as <a />
+    return re.sub(r"<([\w.-]+)></\1>", r"<\1/>", xml)
+
+
+def attribute_order(xml):
+    return [(element.tag, list(element.attrib)) for element in fromstring(xml).iter()]
+
+
+@pytest.fixture(
+    params=[
+        pytest.param((render_form, "form_xml"), id="form"),
+        pytest.param((render_list, "list_xml"), id="list"),
+        pytest.param((render_list_from_rows, "list_xml"), id="list-rows"),
+    ]
+)
+def rendered(request):
+    render, fixture_name = request.param
+    xml = request.getfixturevalue(fixture_name)
+    return render_with("etree", render, xml), render_with("lxml", render, xml)
+
+
+def test_canonical_xml_is_equal(rendered):
+    etree_xml, lxml_xml = rendered
+    assert canonicalize(etree_xml) == canonicalize(lxml_xml)
+
+
+def test_only_empty_element_notation_differs(rendered):
+    etree_xml, lxml_xml = rendered
+    assert " />" in etree_xml
+    assert " />" not in lxml_xml
+    assert etree_xml.replace(" />", "/>") == short_empty_elements(lxml_xml)
+
+
+def test_attribute_order_is_equal(rendered):
+    etree_xml, lxml_xml = rendered
+    assert attribute_order(etree_xml) == attribute_order(lxml_xml)
+
+
+def test_empty_text_notation():
+    assert "<name></name>" not in render_with("etree", render_list_from_rows, LIST_XML)
+    assert "<name></name>" in render_with("lxml", render_list_from_rows, LIST_XML)
+
+
+def test_responses_differ_only_in_empty_element_notation():
+    etree_xml = render_with("etree", render_responses)
+    lxml_xml = render_with("lxml", render_responses)
+    assert etree_xml.replace(" />", "/>") == lxml_xml
+
+
+def test_comments_and_processing_instructions_are_dropped(form_xml):
+    xml = form_xml.replace("<tparams>", "<!-- comment --><?pi data?><tparams>")
+    for backend in ("etree", "lxml"):
+        rendered = render_with(backend, render_form, xml)
+        assert "<!--" not in rendered
+        assert "<?pi" not in rendered
+
+
+def test_lxml_parser_does_not_resolve_external_entities(tmp_path):
+    secret = tmp_path / "secret.txt"
+    secret.write_text("secret")
+    xml = f'<!DOCTYPE doc [<!ENTITY x SYSTEM "file://{secret}">]><doc><x>&x;</x></doc>'
+    assert "secret" not in render_with("lxml", lambda: ET.tostring(ET.fromstring(xml)))